@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Backend latency benchmark
+Fires concurrent requests at the product/status endpoints and reports p50/p95/p99
+
+Run once against the old build and once against the new one, e.g.:
+    python benchmarks/bench_latency.py --base-url http://localhost:8001 --concurrency 64
+
+/api/status counts and sorts the status collection, which has no index in
+the old build; --seed-status N first fills it (at MONGODB_URI) so that is a
+slow query. Without a mongod, benchmarks/fake_mongo.py is a seeded stand-in
+with a fixed read delay. Recorded runs are in benchmarks/README.md.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_PATHS = [
+    "/api/products?limit=50",
+    "/api/status",
+    "/api/",
+]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def seed_status(count):
+    """Insert count status documents so /api/status scans a large collection"""
+    from pymongo import MongoClient
+
+    mongo_url = os.getenv("MONGODB_URI", "mongodb://localhost:27017/pspk_store")
+    collection = MongoClient(mongo_url).get_default_database("pspk_store").status
+    now = datetime.utcnow()
+    for start in range(0, count, 10000):
+        collection.insert_many([
+            {"status": "ok", "message": f"bench {i}", "timestamp": now - timedelta(seconds=i)}
+            for i in range(start, min(count, start + 10000))
+        ])
+    print(f"🌱 Seeded {count} status documents at {mongo_url}")
+
+
+def run_benchmark(base_url, paths, total_requests, concurrency, timeout):
+    """Run the benchmark and return per-path latency samples in milliseconds"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    samples = {path: [] for path in paths}
+    errors = {path: 0 for path in paths}
+
+    def hit(i):
+        path = paths[i % len(paths)]
+        started = time.perf_counter()
+        try:
+            response = session.get(f"{base_url}{path}", timeout=timeout)
+            ok = response.status_code < 500
+        except requests.exceptions.RequestException:
+            ok = False
+        return path, (time.perf_counter() - started) * 1000, ok
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for path, elapsed_ms, ok in pool.map(hit, range(total_requests)):
+            samples[path].append(elapsed_ms)
+            if not ok:
+                errors[path] += 1
+    wall_elapsed = time.perf_counter() - wall_started
+
+    return samples, errors, wall_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent latency benchmark for the backend API")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--path", action="append", dest="paths", help="Endpoint path (repeatable)")
+    parser.add_argument("--seed-status", type=int, default=0,
+                        help="Insert this many status documents first (needs pymongo and MONGODB_URI)")
+    args = parser.parse_args()
+
+    if args.seed_status:
+        seed_status(args.seed_status)
+
+    paths = args.paths or DEFAULT_PATHS
+    print(f"🔗 Benchmarking {args.base_url} - {args.requests} requests, concurrency {args.concurrency}")
+    print("=" * 72)
+
+    samples, errors, wall_elapsed = run_benchmark(
+        args.base_url, paths, args.requests, args.concurrency, args.timeout
+    )
+
+    print(f"{'path':<32}{'p50':>9}{'p95':>9}{'p99':>9}{'mean':>9}{'errors':>8}")
+    all_samples = []
+    for path in paths:
+        values = samples[path]
+        all_samples.extend(values)
+        print(
+            f"{path:<32}"
+            f"{percentile(values, 50):>9.1f}"
+            f"{percentile(values, 95):>9.1f}"
+            f"{percentile(values, 99):>9.1f}"
+            f"{statistics.mean(values) if values else 0:>9.1f}"
+            f"{errors[path]:>8}"
+        )
+    print("-" * 72)
+    print(f"{'ALL (ms)':<32}"
+          f"{percentile(all_samples, 50):>9.1f}"
+          f"{percentile(all_samples, 95):>9.1f}"
+          f"{percentile(all_samples, 99):>9.1f}")
+    print(f"📊 Throughput: {len(all_samples) / wall_elapsed:.1f} req/s over {wall_elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
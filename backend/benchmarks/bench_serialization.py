@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Serialization microbenchmark
+Compares the old route path (ObjectId -> str loop + jsonable_encoder + json)
+with responses.dumps (orjson) on product payloads shaped like the real catalog
+
+    python benchmarks/bench_serialization.py --copies 20
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from responses import dumps  # noqa: E402
+
+CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'frontend', 'public', 'comprehensive_products.json'
+)
+
+
+def build_payload(copies):
+    """Build a listing payload of Mongo-style documents from comprehensive_products.json"""
+    with open(CATALOG_PATH) as f:
+        catalog = json.load(f)
+
+    products = []
+    for i in range(copies):
+        for product in catalog['products']:
+            doc = copy.deepcopy(product)
+            doc['_id'] = ObjectId()
+            doc['shopify_id'] = 8000000000 + len(products)
+            doc['updated_at'] = datetime.utcnow()
+            doc['sync_status'] = 'synced'
+            products.append(doc)
+    return {'products': products, 'limit': len(products), 'has_more': False, 'next_cursor': None}
+
+
+def old_path(payload):
+    """What the routes did before: stringify _id, jsonable_encoder, then json.dumps"""
+    from fastapi.encoders import jsonable_encoder
+
+    page = copy.copy(payload)
+    page['products'] = [dict(p) for p in payload['products']]
+    for product in page['products']:
+        if '_id' in product:
+            product['_id'] = str(product['_id'])
+    return json.dumps(jsonable_encoder(page), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def new_path(payload):
+    return dumps(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON serialization paths on catalog-sized payloads")
+    parser.add_argument('--copies', type=int, default=1, help='How many copies of the catalog to put in one payload')
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+
+    payload = build_payload(args.copies)
+    size = len(new_path(payload))
+    print(f"📦 Payload: {len(payload['products'])} products, {size / 1024:.1f} KB")
+    print("=" * 60)
+
+    results = {}
+    for name, fn in [('jsonable_encoder + json', old_path), ('orjson (responses.dumps)', new_path)]:
+        seconds = min(timeit.repeat(lambda: fn(payload), number=args.number, repeat=5)) / args.number
+        results[name] = seconds
+        print(f"{name:<28}{seconds * 1000:>10.3f} ms/payload")
+
+    old, new = results.values()
+    print("-" * 60)
+    print(f"⚡ Speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
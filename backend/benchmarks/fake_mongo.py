@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for MongoDB, for benchmarking where no mongod is available
+Speaks the wire protocol through mockupdb, keeps the data in mongomock and
+seeds products (fake_shopify's catalog) and status documents. Reads on the
+slow collections sleep --slow-ms first, like an unindexed query on a large
+collection, so blocking vs non-blocking drivers show up in tail latency.
+
+    pip install mockupdb mongomock
+    python benchmarks/fake_mongo.py --port 27018 --products 500 --status-docs 500 --slow-ms 50
+    MONGODB_URI=mongodb://localhost:27018/pspk_store ...
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import mongomock
+from bson import SON
+from mockupdb import Matcher, MockupDB
+
+from fake_shopify import build_products, to_rest
+
+READ_COMMANDS = {'find', 'aggregate', 'count', 'distinct'}
+IGNORED_COMMANDS = {'createIndexes', 'dropIndexes', 'endSessions', 'killCursors', 'ping', 'buildInfo', 'buildinfo'}
+HANDSHAKE_COMMANDS = {'hello', 'ismaster', 'isMaster'}
+# A standalone MongoDB 6.0 as far as the drivers are concerned
+HANDSHAKE_REPLY = {
+    'isWritablePrimary': True, 'ismaster': True, 'helloOk': True,
+    'minWireVersion': 0, 'maxWireVersion': 17,
+    'maxBsonObjectSize': 16 * 1024 * 1024, 'maxMessageSizeBytes': 48000000, 'maxWriteBatchSize': 100000,
+    'logicalSessionTimeoutMinutes': 30,
+}
+
+
+def seed(db, products, status_docs):
+    """Fill the products and status collections like a synced store"""
+    now = datetime.utcnow()
+    if products:
+        db.products.insert_many([
+            {**to_rest(p), 'shopify_id': 1000 + i, 'sync_status': 'synced', 'updated_at': now}
+            for i, p in enumerate(build_products(products), start=1)
+        ])
+    if status_docs:
+        db.status.insert_many([
+            {'status': 'ok', 'message': f'check {i}', 'timestamp': now - timedelta(seconds=i)}
+            for i in range(status_docs)
+        ])
+
+
+def _update(collection, spec):
+    """Apply one entry of an update command; returns (n, n_modified, upserted_id)"""
+    many = spec.get('multi', False)
+    method = collection.update_many if many else collection.update_one
+    result = method(spec['q'], spec['u'], upsert=spec.get('upsert', False))
+    return result.matched_count + (1 if result.upserted_id is not None else 0), result.modified_count, result.upserted_id
+
+
+def make_handler(server, db, slow_collections, slow_ms):
+    """mockupdb responder running each command against the mongomock database
+
+    mockupdb handles requests under one server-wide lock; the read delay
+    is slept outside it so concurrent slow queries overlap like they would
+    on a real server, while mongomock itself stays single-threaded.
+    """
+
+    def handle(request):
+        doc = request.doc
+        name = request.command_name
+        collection_name = doc.get(name) if isinstance(doc.get(name), str) else None
+        collection = db[collection_name] if collection_name else None
+
+        if name in READ_COMMANDS and collection_name in slow_collections:
+            with server._unlock():
+                time.sleep(slow_ms / 1000.0)
+
+        if name in HANDSHAKE_COMMANDS:
+            return request.ok(localTime=datetime.utcnow(), **HANDSHAKE_REPLY)
+        if name in IGNORED_COMMANDS:
+            return request.ok()
+        if name == 'find':
+            cursor = collection.find(doc.get('filter', {}), doc.get('projection'))
+            if doc.get('sort'):
+                cursor = cursor.sort(list(doc['sort'].items()))
+            cursor = cursor.skip(doc.get('skip', 0)).limit(abs(doc.get('limit', 0)))
+            return request.ok(cursor={'id': 0, 'ns': f"{request.namespace}.{collection_name}", 'firstBatch': list(cursor)})
+        if name == 'aggregate':
+            try:
+                batch = list(collection.aggregate(doc.get('pipeline', [])))
+            except NotImplementedError:
+                # e.g. $indexStats
+                batch = []
+            return request.ok(cursor={'id': 0, 'ns': f"{request.namespace}.{collection_name}", 'firstBatch': batch})
+        if name == 'count':
+            return request.ok(n=collection.count_documents(doc.get('query', {})))
+        if name == 'distinct':
+            return request.ok(values=collection.distinct(doc['key'], doc.get('query', {})))
+        if name == 'insert':
+            collection.insert_many(doc['documents'])
+            return request.ok(n=len(doc['documents']))
+        if name == 'update':
+            n = modified = 0
+            upserted = []
+            for index, spec in enumerate(doc['updates']):
+                matched, changed, upserted_id = _update(collection, spec)
+                n += matched
+                modified += changed
+                if upserted_id is not None:
+                    upserted.append({'index': index, '_id': upserted_id})
+            reply = {'n': n, 'nModified': modified}
+            if upserted:
+                reply['upserted'] = upserted
+            return request.ok(**reply)
+        if name == 'delete':
+            n = sum(
+                (collection.delete_many if spec.get('limit', 0) == 0 else collection.delete_one)(spec['q']).deleted_count
+                for spec in doc['deletes']
+            )
+            return request.ok(n=n)
+        if name == 'findAndModify':
+            value = collection.find_one_and_update(
+                doc.get('query', {}), doc['update'], projection=doc.get('fields'),
+                upsert=doc.get('upsert', False), return_document=doc.get('new', False)
+            )
+            return request.ok(value=value)
+        if name == 'listIndexes':
+            indexes = [
+                SON([('v', 2), ('key', SON(info['key'])), ('name', index_name)])
+                for index_name, info in collection.index_information().items()
+            ]
+            return request.ok(cursor={'id': 0, 'ns': f"{request.namespace}.{collection_name}", 'firstBatch': indexes})
+        return request.ok()
+
+    return handle
+
+
+def serve(port, products=500, status_docs=500, slow_collections=('products', 'status'), slow_ms=50.0):
+    """Start the stand-in (port 0 picks a free one, see server.uri); returns (server, mongomock db)"""
+    db = mongomock.MongoClient().pspk_store
+    seed(db, products, status_docs)
+    server = MockupDB(port=port)
+    server.autoresponds(Matcher(), make_handler(server, db, set(slow_collections), slow_ms))
+    server.run()
+    return server, db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for MongoDB")
+    parser.add_argument('--port', type=int, default=27018)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--status-docs', type=int, default=500)
+    parser.add_argument('--slow-ms', type=float, default=50.0, help="Delay before each read on a slow collection")
+    parser.add_argument('--slow-collection', action='append', dest='slow_collections',
+                        help="Collection whose reads are delayed (repeatable; default products and status)")
+    args = parser.parse_args()
+
+    server, _ = serve(args.port, args.products, args.status_docs,
+                      args.slow_collections or ('products', 'status'), args.slow_ms)
+    print(f"🧪 Fake MongoDB on {server.uri} with {args.products} products, {args.status_docs} status docs, "
+          f"{args.slow_ms:.0f}ms reads")
+    print(f"   MONGODB_URI=mongodb://localhost:{args.port}/pspk_store")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
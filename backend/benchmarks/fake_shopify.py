@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Shopify Admin API
+Serves canned products over REST (with Link pagination) and through a fake
+GraphQL bulk operation whose result is a JSONL file. Admin REST calls are
+metered by a leaky bucket with X-Shopify-Shop-Api-Call-Limit / 429 +
+Retry-After, like the real API.
+
+    python benchmarks/fake_shopify.py --port 8765 --products 1000
+    SHOPIFY_ADMIN_API_URL=http://localhost:8765/admin/api/2024-01 ...
+"""
+
+import argparse
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def build_products(count, variants_per_product=3, images_per_product=2):
+    """Generate Admin GraphQL-style product nodes"""
+    products = []
+    for i in range(1, count + 1):
+        products.append({
+            'id': f'gid://shopify/Product/{1000 + i}',
+            'title': f'OG Test Product {i}',
+            'handle': f'og-test-product-{i}',
+            'descriptionHtml': '<p>Stand-in product</p>',
+            'productType': 'Teeshirt',
+            'vendor': 'DVV Entertainment',
+            'tags': ['OG', 'Test'],
+            'status': 'ACTIVE',
+            'createdAt': '2025-01-01T00:00:00Z',
+            'updatedAt': f'2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z',
+            'publishedAt': '2025-01-01T00:00:00Z',
+            'variants': [
+                {
+                    'id': f'gid://shopify/ProductVariant/{100000 + i * 10 + v}',
+                    'title': size,
+                    'sku': f'OG-{i}-{size}',
+                    'price': '1299.00',
+                    'compareAtPrice': '1599.00',
+                    'inventoryQuantity': 50,
+                    'selectedOptions': [{'name': 'Size', 'value': size}],
+                }
+                for v, size in enumerate(['S', 'M', 'L', 'XL'][:variants_per_product])
+            ],
+            'images': [
+                {
+                    'id': f'gid://shopify/ProductImage/{200000 + i * 10 + m}',
+                    'url': f'https://cdn.example.com/og/{i}/{m}.jpg',
+                    'altText': None,
+                    'width': 1200,
+                    'height': 1500,
+                }
+                for m in range(images_per_product)
+            ],
+        })
+    return products
+
+
+def to_bulk_jsonl(products):
+    """Flatten products the way bulk operations do (children carry __parentId)"""
+    lines = []
+    for product in products:
+        parent = {k: v for k, v in product.items() if k not in ('variants', 'images')}
+        lines.append(json.dumps(parent))
+        for variant in product['variants']:
+            lines.append(json.dumps({**variant, '__parentId': product['id']}))
+        for image in product['images']:
+            lines.append(json.dumps({**image, '__parentId': product['id']}))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def to_rest(product):
+    """Admin REST shape for /products.json"""
+    numeric_id = int(product['id'].rsplit('/', 1)[-1])
+    return {
+        'id': numeric_id,
+        'title': product['title'],
+        'handle': product['handle'],
+        'body_html': product['descriptionHtml'],
+        'product_type': product['productType'],
+        'vendor': product['vendor'],
+        'tags': ', '.join(product['tags']),
+        'status': product['status'].lower(),
+        'updated_at': product['updatedAt'],
+        'variants': [
+            {'id': int(v['id'].rsplit('/', 1)[-1]), 'title': v['title'], 'price': v['price']}
+            for v in product['variants']
+        ],
+    }
+
+
+class FakeShopify:
+    """State shared by request handlers"""
+
+    def __init__(self, products, bucket_size=40, leak_rate=2.0):
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.bucket_level = 0.0
+        self.bucket_updated_at = time.monotonic()
+        self.throttled = 0
+        self.products = products
+        self.rest_products = [to_rest(p) for p in products]
+        self.jsonl = to_bulk_jsonl(products)
+        self.bulk_polls_until_done = 2
+        self.bulk_polls = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def take_rest_call(self):
+        """Meter one REST call; returns (allowed, used)"""
+        with self.lock:
+            now = time.monotonic()
+            self.bucket_level = max(0.0, self.bucket_level - (now - self.bucket_updated_at) * self.leak_rate)
+            self.bucket_updated_at = now
+            if self.bucket_level + 1 > self.bucket_size:
+                self.throttled += 1
+                return False, int(self.bucket_level)
+            self.bucket_level += 1
+            return True, int(self.bucket_level)
+
+
+def make_handler(state, base_url):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload, status=200, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _metered(self):
+            """Apply the REST bucket; sends the 429 itself and returns None when throttled"""
+            allowed, used = state.take_rest_call()
+            headers = {'X-Shopify-Shop-Api-Call-Limit': f"{used}/{int(state.bucket_size)}"}
+            if not allowed:
+                headers['Retry-After'] = '1.0'
+                self._send_json({'errors': 'Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service.'},
+                                status=429, headers=headers)
+                return None
+            return headers
+
+        def do_GET(self):
+            with state.lock:
+                state.requests += 1
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+
+            if parsed.path == '/bulk/products.jsonl':
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/jsonl')
+                self.send_header('Content-Length', str(len(state.jsonl)))
+                self.end_headers()
+                self.wfile.write(state.jsonl)
+                return
+
+            if parsed.path.startswith('/admin/'):
+                limit_headers = self._metered()
+                if limit_headers is None:
+                    return
+            else:
+                limit_headers = {}
+
+            if parsed.path.endswith('/products.json'):
+                limit = int(params.get('limit', ['50'])[0])
+                offset = int(params.get('page_info', ['0'])[0])
+                page = state.rest_products[offset:offset + limit]
+                fields = params.get('fields', [None])[0]
+                if fields:
+                    keep = fields.split(',')
+                    page = [{k: v for k, v in p.items() if k in keep} for p in page]
+                headers = dict(limit_headers)
+                if offset + limit < len(state.rest_products):
+                    next_url = f"{base_url}{parsed.path}?limit={limit}&page_info={offset + limit}"
+                    headers['Link'] = f'<{next_url}>; rel="next"'
+                self._send_json({'products': page}, headers=headers)
+                return
+
+            if parsed.path.endswith('/shop.json'):
+                self._send_json({'shop': {'name': 'Fake OG Store', 'domain': 'localhost'}}, headers=limit_headers)
+                return
+
+            self._send_json({'errors': 'Not Found'}, status=404, headers=limit_headers)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def _write(self, status, payload):
+            """REST product create/update/delete: metered, echoes the product back"""
+            limit_headers = self._metered()
+            if limit_headers is None:
+                return
+            product = payload.get('product') or {}
+            product.setdefault('id', 9000000 + state.requests)
+            self._send_json({'product': product}, status=status, headers=limit_headers)
+
+        def do_PUT(self):
+            with state.lock:
+                state.requests += 1
+            self._write(200, self._read_json())
+
+        def do_DELETE(self):
+            with state.lock:
+                state.requests += 1
+            self._write(200, {})
+
+        def do_POST(self):
+            with state.lock:
+                state.requests += 1
+            payload = self._read_json()
+            query = payload.get('query', '')
+
+            if self.path.endswith('.json') and not self.path.endswith('/graphql.json'):
+                self._write(201, payload)
+                return
+
+            if 'bulkOperationRunQuery' in query:
+                with state.lock:
+                    state.bulk_polls = 0
+                self._send_json({'data': {'bulkOperationRunQuery': {
+                    'bulkOperation': {'id': 'gid://shopify/BulkOperation/1', 'status': 'CREATED'},
+                    'userErrors': [],
+                }}})
+                return
+
+            if 'currentBulkOperation' in query:
+                with state.lock:
+                    state.bulk_polls += 1
+                    done = state.bulk_polls >= state.bulk_polls_until_done
+                self._send_json({'data': {'currentBulkOperation': {
+                    'id': 'gid://shopify/BulkOperation/1',
+                    'status': 'COMPLETED' if done else 'RUNNING',
+                    'errorCode': None,
+                    'objectCount': str(len(state.jsonl.splitlines())),
+                    'url': f"{base_url}/bulk/products.jsonl" if done else None,
+                    'partialDataUrl': None,
+                }}})
+                return
+
+            self._send_json({'errors': [{'message': 'Unsupported query'}]}, status=400)
+
+    return Handler
+
+
+def serve(port, products, bucket_size=40, leak_rate=2.0):
+    """Bind the stand-in (port 0 picks a free one, see server.server_address); call serve_forever to run"""
+    state = FakeShopify(build_products(products), bucket_size=bucket_size, leak_rate=leak_rate)
+    server = ThreadingHTTPServer(('localhost', port), BaseHTTPRequestHandler)
+    # The handler needs the bound port for Link and bulk result URLs
+    server.RequestHandlerClass = make_handler(state, f"http://localhost:{server.server_address[1]}")
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Shopify Admin API")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--bucket-size', type=float, default=40)
+    parser.add_argument('--leak-rate', type=float, default=2.0)
+    args = parser.parse_args()
+
+    server, _ = serve(args.port, args.products, args.bucket_size, args.leak_rate)
+    print(f"🧪 Fake Shopify on http://localhost:{args.port} with {args.products} products")
+    print(f"   SHOPIFY_ADMIN_API_URL=http://localhost:{args.port}/admin/api/2024-01")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Catalog version counter and ETag helpers
+Product writes and webhooks bump the version; catalog responses derive a
+strong ETag from it so unchanged polls can be answered with 304. The
+version lives in a Mongo counter document so every app instance agrees on
+it; each instance syncs it every CATALOG_VERSION_SYNC_SECONDS.
+"""
+
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import Request, Response
+from pymongo import ReturnDocument
+from repository import db
+from compression import identity_etag
+
+logger = logging.getLogger(__name__)
+
+# How often local bumps are pushed and other instances' bumps picked up
+CATALOG_VERSION_SYNC_SECONDS = float(os.getenv('CATALOG_VERSION_SYNC_SECONDS', '1'))
+CATALOG_VERSION_ID = 'catalog_version'
+
+
+class CatalogVersion:
+    """Catalog version shared through a Mongo counter document
+
+    bump() only counts locally (it is called from worker threads as well as
+    the event loop); sync() pushes those bumps with $inc and reads back the
+    shared value. Until a bump is pushed, this instance's ETags carry its
+    boot_id so no other instance can match them. Without a collection the
+    version is process-local, which is only correct for a single process.
+    """
+
+    def __init__(self, collection=None, sync_interval: float = CATALOG_VERSION_SYNC_SECONDS):
+        self.collection = collection
+        self.sync_interval = sync_interval
+        # Distinguishes versions of different processes/restarts sharing a client
+        self.boot_id = uuid.uuid4().hex[:8]
+        # Shared counter as last read, plus local bumps not yet pushed
+        self.epoch = self.boot_id
+        self.shared = 0
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.not_modified = 0
+        self.remote_changes = 0
+        self.sync_errors = 0
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self.shared + self.pending
+
+    def bump(self) -> int:
+        """Record a catalog change"""
+        with self._lock:
+            self.pending += 1
+            return self.shared + self.pending
+
+    def on_remote_change(self, listener: Callable[[], None]) -> None:
+        """Call listener when another instance changed the catalog (e.g. to drop local caches)"""
+        self._listeners.append(listener)
+
+    async def sync(self) -> None:
+        """Push pending bumps and pick up the shared version"""
+        if self.collection is None:
+            return
+        with self._lock:
+            pushed = self.pending
+        if pushed:
+            doc = await self.collection.find_one_and_update(
+                {'_id': CATALOG_VERSION_ID},
+                {'$inc': {'version': pushed}, '$setOnInsert': {'epoch': uuid.uuid4().hex[:8]}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        else:
+            doc = await self.collection.find_one({'_id': CATALOG_VERSION_ID})
+            if doc is None:
+                return
+
+        with self._lock:
+            # Anything beyond our own pushed bumps came from another instance
+            remote = doc['epoch'] != self.epoch or doc['version'] - pushed != self.shared
+            self.epoch = doc['epoch']
+            self.shared = doc['version']
+            self.pending -= pushed
+        if remote:
+            self.remote_changes += 1
+            for listener in self._listeners:
+                listener()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.sync_errors += 1
+                logger.error(f"Catalog version sync failed: {str(e)}")
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self) -> None:
+        if self.collection is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Don't lose bumps made since the last sync
+        try:
+            await self.sync()
+        except Exception as e:
+            logger.error(f"Final catalog version sync failed: {str(e)}")
+
+    def token(self) -> str:
+        """Version part of the ETag: shared once pushed, instance-specific before"""
+        with self._lock:
+            if self.pending:
+                return f"{self.epoch}-{self.shared}.{self.boot_id}.{self.pending}"
+            return f"{self.epoch}-{self.shared}"
+
+    def etag(self, request: Request) -> str:
+        """Strong ETag for the current version of this path + query"""
+        variant = request.url.path + '?' + '&'.join(sorted(
+            f"{k}={v}" for k, v in request.query_params.multi_items()
+        ))
+        digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()[:16]
+        return f'"{self.token()}-{digest}"'
+
+    def not_modified_response(self, request: Request, etag: str) -> Optional[Response]:
+        """Return a 304 response if If-None-Match matches etag, else None"""
+        header = request.headers.get('if-none-match')
+        if not header:
+            return None
+        candidates = [tag.strip() for tag in header.split(',')]
+        if '*' in candidates:
+            matched = etag
+        else:
+            # If-None-Match uses weak comparison, so ignore a W/ prefix; a
+            # compressed copy's tag (see compression.encoded_etag) also matches
+            matched = next((
+                tag for tag in (tag[2:] if tag.startswith('W/') else tag for tag in candidates)
+                if identity_etag(tag) == etag
+            ), None)
+        if matched is not None:
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers={'ETag': matched, 'Cache-Control': 'no-cache'})
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'shared': self.collection is not None,
+            'epoch': self.epoch,
+            'pending_bumps': self.pending,
+            'boot_id': self.boot_id,
+            'remote_changes': self.remote_changes,
+            'sync_errors': self.sync_errors,
+            'not_modified_responses': self.not_modified,
+        }
+
+
+# Global instance (process-local when MongoDB isn't configured)
+catalog_version = CatalogVersion(db.catalog_meta if db is not None else None)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Response compression with precompressed snapshots
+Negotiates br/gzip from Accept-Encoding and keeps compressed copies of hot
+catalog payloads, keyed by their ETag, so each version is compressed once
+"""
+
+import os
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+SNAPSHOT_MAX_ENTRIES = int(os.getenv('COMPRESSION_SNAPSHOT_MAX_ENTRIES', '256'))
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        pieces = part.strip().split(';')
+        coding = pieces[0].strip().lower()
+        q = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+
+    def allowed(coding):
+        return accepted.get(coding, accepted.get('*', 0.0)) > 0
+
+    if brotli is not None and allowed('br'):
+        return 'br'
+    if allowed('gzip'):
+        return 'gzip'
+    return None
+
+
+CONTENT_CODINGS = ('br', 'gzip')
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Distinct strong ETag for a content-coded copy of a representation (RFC 9110 8.8.3)"""
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def identity_etag(etag: str) -> str:
+    """Undo encoded_etag, so If-None-Match can carry any coding's tag"""
+    for coding in CONTENT_CODINGS:
+        suffix = f'-{coding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class SnapshotCache:
+    """LRU of compressed bodies keyed by (snapshot key, encoding)"""
+
+    def __init__(self, max_entries: int = SNAPSHOT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.compressions = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def get_or_compress(self, key: str, body: bytes, encoding: str) -> bytes:
+        cache_key = (key, encoding)
+        with self._lock:
+            compressed = self._entries.get(cache_key)
+            if compressed is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return compressed
+
+        compressed = compress(body, encoding)
+
+        with self._lock:
+            self._entries[cache_key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.compressions += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'snapshot_hits': self.hits,
+                'compressions': self.compressions,
+                'ratio': round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+                'brotli_available': brotli is not None,
+            }
+
+
+def compressed_json_response(request: Request, body: bytes, snapshot_key: Optional[str],
+                             headers: Optional[Dict[str, str]] = None) -> Response:
+    """Build a JSON response, compressed when the client accepts it
+
+    snapshot_key should change whenever body does (the ETag does); pass None
+    to compress without keeping a snapshot.
+    """
+    headers = dict(headers or {})
+    headers['Vary'] = 'Accept-Encoding'
+    encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+
+    if encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+        return Response(content=body, media_type='application/json', headers=headers)
+
+    if snapshot_key is not None:
+        payload = snapshot_cache.get_or_compress(snapshot_key, body, encoding)
+    else:
+        payload = compress(body, encoding)
+    headers['Content-Encoding'] = encoding
+    if 'ETag' in headers:
+        headers['ETag'] = encoded_etag(headers['ETag'], encoding)
+    return Response(content=payload, media_type='application/json', headers=headers)
+
+
+# Global instance
+snapshot_cache = SnapshotCache()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Product change detection
+A canonical content hash of the Shopify-owned part of a product, stored
+as content_hash on each products document, plus a field-level diff so
+outbound updates only send what actually changed.
+"""
+
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+# Bookkeeping fields we add to product documents; never part of the content
+LOCAL_FIELDS = {
+    '_id', 'shopify_id', 'content_hash', 'sync_status', 'shopify_updated_at',
+    'webhook_received_at', 'deleted_at',
+}
+
+# Shopify fields that change on every write without the product changing
+# (updated_at is also overwritten locally with our own write time)
+VOLATILE_FIELDS = {'updated_at'}
+
+
+def _canonical(value: Any) -> Any:
+    """Drop volatile keys at every level so equal products serialize equally"""
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def content_hash(product: Dict[str, Any]) -> str:
+    """sha256 of the product's Shopify content, independent of key order"""
+    content = {k: v for k, v in product.items() if k not in LOCAL_FIELDS}
+    raw = json.dumps(_canonical(content), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _matches(desired: Any, current: Any) -> bool:
+    """True if current already has everything desired sets
+
+    Dicts match when every desired key matches (extra stored keys are
+    fine); lists match element-wise, so a variant list with only id +
+    price matches the stored variants it describes.
+    """
+    if isinstance(desired, dict):
+        return isinstance(current, dict) and all(
+            key in current and _matches(value, current[key]) for key, value in desired.items()
+        )
+    if isinstance(desired, (list, tuple)):
+        return (isinstance(current, (list, tuple)) and len(desired) == len(current)
+                and all(_matches(d, c) for d, c in zip(desired, current)))
+    return desired == current
+
+
+def changed_fields(stored: Optional[Dict[str, Any]], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level payload fields that differ from the stored product (all of them if nothing is stored)"""
+    if not stored:
+        return dict(payload)
+    return {
+        key: value for key, value in payload.items()
+        if key != 'id' and not _matches(value, stored.get(key))
+    }
+
+
+class WriteStats:
+    """Counters for writes avoided by change detection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.outbound_updates = 0
+        self.outbound_skipped = 0
+        self.outbound_fields_sent = 0
+        self.outbound_fields_omitted = 0
+        self.inbound_writes = 0
+        self.inbound_skipped = 0
+
+    def record_outbound(self, requested: int, sent: int) -> None:
+        with self._lock:
+            self.outbound_updates += 1
+            if sent == 0:
+                self.outbound_skipped += 1
+            self.outbound_fields_sent += sent
+            self.outbound_fields_omitted += requested - sent
+
+    def record_inbound(self, changed: bool) -> None:
+        with self._lock:
+            self.inbound_writes += 1
+            if not changed:
+                self.inbound_skipped += 1
+
+    def record_inbound_batch(self, written: int, skipped: int) -> None:
+        with self._lock:
+            self.inbound_writes += written + skipped
+            self.inbound_skipped += skipped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'outbound_updates': self.outbound_updates,
+                'outbound_skipped': self.outbound_skipped,
+                'outbound_fields_sent': self.outbound_fields_sent,
+                'outbound_fields_omitted': self.outbound_fields_omitted,
+                'inbound_writes': self.inbound_writes,
+                'inbound_skipped': self.inbound_skipped,
+            }
+
+
+# Global instance
+write_stats = WriteStats()
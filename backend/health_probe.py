@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Background Shopify health probe
+Runs the health check on a fixed interval so /api/shopify/health can
+answer from memory instead of calling shop.json for every probe.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = float(os.getenv('SHOPIFY_HEALTH_INTERVAL_SECONDS', '30'))
+
+
+class HealthProbe:
+    """Periodically refreshed result of an async health check"""
+
+    def __init__(self, check: Callable[[], Awaitable[Dict[str, Any]]], interval: float = HEALTH_PROBE_INTERVAL):
+        self.check = check
+        self.interval = interval
+        self.result: Optional[Dict[str, Any]] = None
+        self.checked_at = 0.0
+        self.checks = 0
+        self.served = 0
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Run a live check now (sharing one already in progress) and cache it"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._run_check())
+        return await asyncio.shield(self._inflight)
+
+    async def _run_check(self) -> Dict[str, Any]:
+        try:
+            result = await self.check()
+        except Exception as e:
+            result = {'status': 'unhealthy', 'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+        self.result = result
+        self.checked_at = time.monotonic()
+        self.checks += 1
+        return result
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health probe failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def latest(self) -> Dict[str, Any]:
+        """Cached result with its age; checks live only if nothing has run yet"""
+        if self.result is None:
+            await self.refresh()
+        self.served += 1
+        age = time.monotonic() - self.checked_at
+        return {
+            **self.result,
+            'age_seconds': round(age, 1),
+            # More than two missed intervals means the probe itself is stuck
+            'stale': age > self.interval * 2 + 5,
+            'probe_interval_seconds': self.interval,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'interval_seconds': self.interval,
+            'running': self._task is not None and not self._task.done(),
+            'checks': self.checks,
+            'served_from_cache': self.served,
+            'last_status': (self.result or {}).get('status'),
+            'age_seconds': round(time.monotonic() - self.checked_at, 1) if self.result else None,
+        }
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+MongoDB index provisioning
+Declares the indexes the backend relies on and reconciles them at startup
+"""
+
+import logging
+from typing import Dict, List, Any
+from pymongo import ASCENDING, DESCENDING
+from repository import LISTED_SYNC_STATUSES
+from webhook_queue import WEBHOOK_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Declared indexes per collection. Each entry is (name, keys, options).
+# The partial listing index needs MongoDB 6.0+ ($in inside partialFilterExpression).
+REQUIRED_INDEXES: Dict[str, List[tuple]] = {
+    'products': [
+        ('shopify_id_unique', [('shopify_id', ASCENDING)], {'unique': True}),
+        ('listed_products_by_shopify_id', [('shopify_id', ASCENDING), ('sync_status', ASCENDING)], {
+            'partialFilterExpression': {'sync_status': {'$in': LISTED_SYNC_STATUSES}}
+        }),
+        # Handle lookups in products:batchGet
+        ('handle', [('handle', ASCENDING)], {}),
+    ],
+    'status': [
+        ('timestamp_desc', [('timestamp', DESCENDING)], {}),
+    ],
+    'webhook_events': [
+        ('status_by_received_at', [('status', ASCENDING), ('received_at', ASCENDING)], {}),
+        ('claim_token', [('claim_token', ASCENDING)], {'sparse': True}),
+        # Redeliveries of a stored X-Shopify-Webhook-Id are rejected on insert
+        ('webhook_id_unique', [('webhook_id', ASCENDING)], {
+            'unique': True,
+            'partialFilterExpression': {'webhook_id': {'$type': 'string'}}
+        }),
+        # Done and failed events are dropped after the retention window
+        ('processed_at_ttl', [('processed_at', ASCENDING)], {'expireAfterSeconds': WEBHOOK_RETENTION_SECONDS}),
+    ],
+}
+
+
+def _matches(existing: Dict[str, Any], keys: List[tuple], options: Dict[str, Any]) -> bool:
+    """Check whether an index_information() entry matches a declared index"""
+    if [tuple(k) for k in existing.get('key', [])] != [tuple(k) for k in keys]:
+        return False
+    for option, value in options.items():
+        if existing.get(option) != value:
+            return False
+    return True
+
+
+async def ensure_indexes(db) -> Dict[str, Any]:
+    """Create missing indexes and rebuild ones whose definition drifted"""
+    report = {'created': [], 'rebuilt': [], 'unchanged': [], 'failed': []}
+
+    for collection_name, declared in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+
+        for name, keys, options in declared:
+            qualified = f"{collection_name}.{name}"
+            try:
+                if name in existing:
+                    if _matches(existing[name], keys, options):
+                        report['unchanged'].append(qualified)
+                        continue
+                    await collection.drop_index(name)
+                    await collection.create_index(keys, name=name, **options)
+                    report['rebuilt'].append(qualified)
+                else:
+                    await collection.create_index(keys, name=name, **options)
+                    report['created'].append(qualified)
+            except Exception as e:
+                logger.error(f"Failed to provision index {qualified}: {str(e)}")
+                report['failed'].append({'index': qualified, 'error': str(e)})
+
+    logger.info(
+        f"Index reconciliation: {len(report['created'])} created, "
+        f"{len(report['rebuilt'])} rebuilt, {len(report['failed'])} failed"
+    )
+    return report
+
+
+async def index_report(db) -> Dict[str, Any]:
+    """Describe declared vs present indexes along with $indexStats usage counters"""
+    report = {}
+
+    for collection_name, declared in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+
+        usage = {}
+        async for stat in collection.aggregate([{'$indexStats': {}}]):
+            accesses = stat.get('accesses', {})
+            since = accesses.get('since')
+            usage[stat['name']] = {
+                'ops': accesses.get('ops', 0),
+                'since': since.isoformat() if since else None,
+            }
+
+        declared_names = {name for name, _, _ in declared}
+        report[collection_name] = {
+            'declared': [
+                {
+                    'name': name,
+                    'present': name in existing,
+                    'in_sync': name in existing and _matches(existing[name], keys, options),
+                    'usage': usage.get(name),
+                }
+                for name, keys, options in declared
+            ],
+            'undeclared': [
+                {'name': name, 'key': info.get('key'), 'usage': usage.get(name)}
+                for name, info in existing.items()
+                if name not in declared_names and name != '_id_'
+            ],
+        }
+
+    return report
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+In-process product response cache
+Bounded LRU with a TTL, invalidated by the product write paths
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv('PRODUCT_CACHE_MAX_ENTRIES', '1024'))
+PRODUCT_CACHE_TTL = float(os.getenv('PRODUCT_CACHE_TTL_SECONDS', '300'))
+
+
+class ProductCache:
+    """Bounded LRU/TTL cache for product and product-list responses"""
+
+    def __init__(self, max_entries: int = PRODUCT_CACHE_MAX_ENTRIES, ttl: float = PRODUCT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Written from async routes and from ShopifyService, which may run in a worker thread
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+        # Bumped by every invalidation; a fill that started under an older
+        # generation may hold data read before the write, so it is dropped
+        self.generation = 0
+
+    @staticmethod
+    def product_key(shopify_id: int, fields: Optional[str] = None) -> Tuple:
+        return ('product', shopify_id, fields)
+
+    @staticmethod
+    def list_key(*params: Hashable) -> Tuple:
+        return ('list',) + tuple(params)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a cached value, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Store a value, evicting the least recently used entries past max_entries
+
+        Pass the generation read before loading the value; if an
+        invalidation happened since, the value is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_fills += 1
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_product(self, shopify_id: Any) -> None:
+        """Drop every cached variant of one product plus every cached list page"""
+        try:
+            shopify_id = int(shopify_id)
+        except (TypeError, ValueError):
+            pass
+        with self._lock:
+            stale = [
+                k for k in self._entries
+                if k[0] == 'list' or (k[0] == 'product' and k[1] == shopify_id)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.generation += 1
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop everything, e.g. after a full sync"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'stale_fills_dropped': self.stale_fills,
+            }
+
+
+# Global instance
+product_cache = ProductCache()
@@ -0,0 +1,366 @@
+import os
+import re
+import time
+import json
+import base64
+import logging
+from typing import List, Dict, Optional, Any, Tuple
+from datetime import datetime, timezone
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+from content_hash import content_hash
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MONGO_URL = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/pspk_store')
+DB_NAME = os.getenv('MONGODB_DB_NAME', 'pspk_store')
+
+# Sync statuses of products that should be listed; anything else (deleted,
+# webhook_deleted) is hidden. Kept as an $in so the partial index in
+# indexes.py can match it.
+LISTED_SYNC_STATUSES = ['synced', 'webhook_created', 'webhook_updated']
+LISTED_PRODUCTS_FILTER = {"sync_status": {"$in": LISTED_SYNC_STATUSES}}
+
+DUPLICATE_KEY = 11000
+
+# How long a product total is reused before counting again
+PRODUCT_COUNT_TTL = float(os.getenv('PRODUCT_COUNT_TTL_SECONDS', '60'))
+
+# Named field presets for ?fields=; anything else is a comma-separated field list
+FIELD_PRESETS = {
+    'card': [
+        'shopify_id', 'title', 'handle', 'product_type', 'vendor', 'tags', 'status',
+        'image', 'variants.id', 'variants.price', 'variants.compare_at_price',
+    ],
+    'detail': [
+        'shopify_id', 'title', 'handle', 'body_html', 'product_type', 'vendor', 'tags',
+        'status', 'options', 'variants', 'images', 'image', 'published_at', 'updated_at',
+    ],
+}
+
+_FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+
+def build_projection(fields: Optional[str]) -> Optional[Dict[str, int]]:
+    """Turn a fields= value (preset name or comma list) into a Mongo projection"""
+    if not fields:
+        return None
+    if fields in FIELD_PRESETS:
+        names = FIELD_PRESETS[fields]
+    else:
+        names = [name.strip() for name in fields.split(',') if name.strip()]
+        invalid = [name for name in names if not _FIELD_NAME.match(name)]
+        if invalid or not names:
+            raise ValueError(f"Invalid fields: {', '.join(invalid) or fields}")
+    # Mongo rejects overlapping paths such as variants + variants.price
+    projection = {
+        name: 1 for name in names
+        if not any(name.startswith(other + '.') for other in names)
+    }
+    # Always keep the cursor key so pagination keeps working
+    projection['shopify_id'] = 1
+    return projection
+
+
+def encode_cursor(shopify_id: int) -> str:
+    """Encode the last seen shopify_id as an opaque page cursor"""
+    raw = json.dumps({'after': shopify_id}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a page cursor back into a shopify_id; raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return int(payload['after'])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_shopify_time(value: Any) -> Optional[datetime]:
+    """Parse a Shopify ISO 8601 timestamp into a naive UTC datetime"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+
+def newer_than_stored(shopify_updated_at: datetime, or_equal: bool = False) -> Dict[str, Any]:
+    """Filter matching products stored with an older (or no) shopify_updated_at
+
+    Webhook and sync writes both use it, so the write carrying the later
+    Shopify updated_at wins whichever arrives first.
+    """
+    return {'$or': [
+        {'shopify_updated_at': None},
+        {'shopify_updated_at': {'$lte' if or_equal else '$lt': shopify_updated_at}}
+    ]}
+
+
+def placeholder_upsert(shopify_id: int, sync_status: str) -> UpdateOne:
+    """Insert an unlisted stub for shopify_id only if no document exists
+
+    The real write is then a conditional update that never upserts, so a
+    stale write simply doesn't match instead of inserting a second
+    document, whether or not the shopify_id unique index is in place.
+    """
+    return UpdateOne(
+        {'shopify_id': shopify_id},
+        {'$setOnInsert': {'sync_status': sync_status}},
+        upsert=True
+    )
+
+class ProductRepository:
+    """Async data access for the products collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._count_cache = None
+        self._count_cached_at = 0.0
+
+    async def list_products(self, limit: int = 50, after: Optional[int] = None,
+                            projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Get a page of non-deleted products ordered by shopify_id (keyset pagination)"""
+        query = dict(LISTED_PRODUCTS_FILTER)
+        if after is not None:
+            query["shopify_id"] = {"$gt": after}
+        cursor = self.collection.find(query, projection).sort("shopify_id", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def iter_products(self, projection: Optional[Dict[str, int]] = None, batch_size: int = 500):
+        """Stream every listed product in shopify_id order straight off a cursor"""
+        cursor = self.collection.find(LISTED_PRODUCTS_FILTER, projection).sort("shopify_id", 1).batch_size(batch_size)
+        async for product in cursor:
+            yield product
+
+    async def count_products(self) -> int:
+        """Count non-deleted products, reusing the last count for PRODUCT_COUNT_TTL seconds"""
+        now = time.monotonic()
+        if self._count_cache is None or now - self._count_cached_at > PRODUCT_COUNT_TTL:
+            self._count_cache = await self.collection.count_documents(LISTED_PRODUCTS_FILTER)
+            self._count_cached_at = now
+        return self._count_cache
+
+    async def get_by_shopify_id(self, shopify_id: int,
+                                projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        """Get a single listed product by its Shopify ID"""
+        return await self.collection.find_one({**LISTED_PRODUCTS_FILTER, "shopify_id": shopify_id}, projection)
+
+    async def get_many(self, shopify_ids: List[int], handles: List[str],
+                       projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Fetch products by shopify_id and/or handle in a single $in query"""
+        clauses = []
+        if shopify_ids:
+            clauses.append({"shopify_id": {"$in": shopify_ids}})
+        if handles:
+            clauses.append({"handle": {"$in": handles}})
+        if not clauses:
+            return []
+        if projection is not None:
+            projection = {**projection, "handle": 1}
+        query = {**LISTED_PRODUCTS_FILTER, "$or": clauses}
+        return await self.collection.find(query, projection).to_list(length=None)
+
+    async def save_from_shopify(self, product: Dict[str, Any], upsert: bool = True):
+        """Store a product returned by an Admin API create/update"""
+        return await self.collection.update_one(
+            {'shopify_id': product['id']},
+            {'$set': {
+                **product,
+                'content_hash': content_hash(product),
+                'shopify_updated_at': parse_shopify_time(product.get('updated_at')),
+                'updated_at': datetime.utcnow(),
+                'sync_status': 'synced'
+            }},
+            upsert=upsert
+        )
+
+    async def mark_deleted(self, shopify_id: int):
+        """Mark a product as deleted after an Admin API delete"""
+        return await self.collection.update_one(
+            {'shopify_id': shopify_id},
+            {'$set': {
+                'deleted_at': datetime.utcnow(),
+                'sync_status': 'deleted'
+            }}
+        )
+
+    def _webhook_write(self, product_data: Dict[str, Any], sync_status: str) -> UpdateOne:
+        """Full webhook product write; only matches when the content changed and the payload is newer
+
+        Newer means an updated_at no earlier than the stored
+        shopify_updated_at: Shopify timestamps have one-second resolution,
+        so a later delivery in the same second wins, as it does within a
+        batch. Redeliveries don't match since their content_hash is equal.
+        Payloads without updated_at are compared by content_hash alone.
+        """
+        digest = content_hash(product_data)
+        shopify_updated_at = parse_shopify_time(product_data.get('updated_at'))
+        changed = {'$or': [
+            {'content_hash': {'$ne': digest}},
+            {'sync_status': {'$nin': LISTED_SYNC_STATUSES}}
+        ]}
+        query = {'shopify_id': product_data['id']}
+        if shopify_updated_at is not None:
+            query['$and'] = [newer_than_stored(shopify_updated_at, or_equal=True), changed]
+        else:
+            query.update(changed)
+        update = {
+            **product_data,
+            'content_hash': digest,
+            'webhook_received_at': datetime.utcnow(),
+            'sync_status': sync_status
+        }
+        if shopify_updated_at is not None:
+            update['shopify_updated_at'] = shopify_updated_at
+        return UpdateOne(query, {'$set': update})
+
+    def _webhook_touch(self, product_data: Dict[str, Any]) -> Optional[UpdateOne]:
+        """For a newer payload with unchanged content, only advance shopify_updated_at
+
+        Shopify bumps updated_at for inventory and metafield changes that
+        leave the stored fields alone; this keeps the ordering check current
+        without rewriting the document. Mutually exclusive with _webhook_write.
+        """
+        shopify_updated_at = parse_shopify_time(product_data.get('updated_at'))
+        if shopify_updated_at is None:
+            return None
+        return UpdateOne(
+            {
+                'shopify_id': product_data['id'],
+                'content_hash': content_hash(product_data),
+                'sync_status': {'$in': LISTED_SYNC_STATUSES},
+                **newer_than_stored(shopify_updated_at)
+            },
+            {'$set': {'shopify_updated_at': shopify_updated_at}}
+        )
+
+    @staticmethod
+    def _webhook_delete(shopify_id: int, deleted_at: Optional[datetime] = None) -> UpdateOne:
+        """Webhook delete; with deleted_at (when Shopify fired it), skipped if the stored product is newer"""
+        now = datetime.utcnow()
+        query = {'shopify_id': shopify_id}
+        update = {
+            'deleted_at': now,
+            'webhook_received_at': now,
+            'sync_status': 'webhook_deleted'
+        }
+        if deleted_at is not None:
+            query['$or'] = [
+                {'shopify_updated_at': None},
+                {'shopify_updated_at': {'$lte': deleted_at}}
+            ]
+            # Later-delivered updates from before the delete must not bring it back
+            update['shopify_updated_at'] = deleted_at
+        return UpdateOne(query, {'$set': update})
+
+    async def _bulk_write(self, operations: List[UpdateOne]) -> Tuple[int, Dict[int, str]]:
+        """Unordered bulk_write; returns (matched + upserted, {position: error})
+
+        Duplicate keys are ignored: they only come from two placeholder
+        upserts racing, and either way the document exists.
+        """
+        if not operations:
+            return 0, {}
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            return result.matched_count + result.upserted_count, {}
+        except BulkWriteError as e:
+            details = e.details
+            errors = {
+                error['index']: error.get('errmsg', 'write error')
+                for error in details.get('writeErrors', [])
+                if error.get('code') != DUPLICATE_KEY
+            }
+            return details.get('nMatched', 0) + details.get('nUpserted', 0), errors
+
+    async def apply_webhook_changes(self, changes: List[Tuple[str, Dict[str, Any], Optional[datetime]]]) -> Dict[str, Any]:
+        """Apply (topic, product, triggered_at) webhook changes with unordered bulk writes
+
+        Callers pass at most one change per product, since unordered
+        writes don't keep their relative order. Creates first get a
+        placeholder document, then every change is a conditional update.
+        Returns counts plus the positions of changes that failed; written
+        only counts full writes and deletes, anything else (unchanged,
+        stale, timestamp-only) is unchanged.
+        """
+        failed: Dict[int, str] = {}
+        creates = [i for i, (topic, _, _) in enumerate(changes) if topic == 'products/create']
+        if creates:
+            placeholders = [placeholder_upsert(changes[i][1]['id'], 'webhook_pending') for i in creates]
+            _, errors = await self._bulk_write(placeholders)
+            for position, message in errors.items():
+                failed[creates[position]] = message
+
+        writes, write_positions = [], []
+        touches, touch_positions = [], []
+        for i, (topic, product_data, triggered_at) in enumerate(changes):
+            if i in failed:
+                continue
+            if topic == 'products/delete':
+                writes.append(self._webhook_delete(product_data['id'], triggered_at))
+            else:
+                sync_status = 'webhook_created' if topic == 'products/create' else 'webhook_updated'
+                writes.append(self._webhook_write(product_data, sync_status))
+                touch = self._webhook_touch(product_data)
+                if touch is not None:
+                    touches.append(touch)
+                    touch_positions.append(i)
+            write_positions.append(i)
+
+        written, errors = await self._bulk_write(writes)
+        for position, message in errors.items():
+            failed[write_positions[position]] = message
+        _, errors = await self._bulk_write(touches)
+        for position, message in errors.items():
+            failed[touch_positions[position]] = message
+
+        return {'written': written, 'unchanged': len(changes) - written - len(failed), 'failed': failed}
+
+
+class StatusRepository:
+    """Async data access for the status collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def count(self) -> int:
+        """Count status entries"""
+        return await self.collection.count_documents({})
+
+    async def latest(self) -> Optional[Dict[str, Any]]:
+        """Get the most recent status entry"""
+        return await self.collection.find_one(sort=[("timestamp", -1)])
+
+    async def insert(self, data: Dict[str, Any]):
+        """Insert a status entry"""
+        return await self.collection.insert_one(data)
+
+
+# MongoDB connection (Motor connects lazily, so this only fails on a bad URI)
+try:
+    mongo_client = AsyncIOMotorClient(MONGO_URL)
+    db = mongo_client[DB_NAME]
+    product_repository = ProductRepository(db.products)
+    status_repository = StatusRepository(db.status)
+except Exception as e:
+    logger.error(f"MongoDB client setup failed: {str(e)}")
+    mongo_client = None
+    db = None
+    product_repository = None
+    status_repository = None
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Retry and circuit breaker primitives for upstream calls
+Library-agnostic: the Shopify sessions decide what counts as a failure
+and raise their own CircuitOpenError subclasses.
+"""
+
+import os
+import time
+import random
+import threading
+from typing import Any, Dict
+
+# Retries after the first attempt for idempotent calls
+RETRY_MAX_ATTEMPTS = int(os.getenv('SHOPIFY_RETRY_MAX_ATTEMPTS', '2'))
+RETRY_BASE_DELAY = float(os.getenv('SHOPIFY_RETRY_BASE_DELAY_SECONDS', '0.25'))
+RETRY_MAX_DELAY = float(os.getenv('SHOPIFY_RETRY_MAX_DELAY_SECONDS', '4'))
+
+# Consecutive failures that open a breaker, and how long it stays open before a trial call
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('SHOPIFY_BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RECOVERY_TIMEOUT = float(os.getenv('SHOPIFY_BREAKER_RECOVERY_SECONDS', '30'))
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+def backoff_delay(retry: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff for the given retry number (1-based)"""
+    return random.uniform(0, min(cap, base * (2 ** (retry - 1))))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit open for {name}; retrying in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open trial -> closed
+
+    While open, calls fail immediately instead of each waiting for its own
+    timeout; after recovery_timeout a single trial call is let through.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout: float = BREAKER_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow(self) -> float:
+        """0.0 if a call may proceed, else seconds until the next trial"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.recovery_timeout - now
+                if remaining > 0:
+                    self.rejected += 1
+                    return remaining
+                self.state = self.HALF_OPEN
+            # Half-open: exactly one trial call at a time
+            if self._trial_in_flight:
+                self.rejected += 1
+                return max(0.001, self.opened_at + self.recovery_timeout - now)
+            self._trial_in_flight = True
+            return 0.0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def cancel(self) -> None:
+        """A call ended without an outcome (e.g. cancelled); free the half-open trial slot"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_in_seconds': round(retry_in, 1),
+                'successes': self.successes,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'times_opened': self.times_opened,
+            }
+
+
+class BreakerRegistry:
+    """One breaker per upstream host, shared by the sync and async sessions"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name)
+            return breaker
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in breakers.items()}
+
+
+# Global instance
+circuit_breakers = BreakerRegistry()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Fast JSON response layer
+orjson-based serialization with native ObjectId and datetime support
+"""
+
+from typing import Any
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import JSONResponse
+
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Encode the BSON types orjson does not know about"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize Mongo documents (ObjectId, datetime, ...) to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=JSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson
+
+    Returning an instance directly from a route also skips FastAPI's
+    jsonable_encoder pass, which is where most of the time goes on large
+    Shopify documents.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        # Already-rendered bodies (e.g. from the product cache) pass straight through
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -1,12 +1,13 @@
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from responses import FastJSONResponse, dumps
 from pydantic import BaseModel
 from datetime import datetime
 import os
-from typing import Optional, List
-import pymongo
-from pymongo import MongoClient
+import zlib
+from typing import Optional, List, Dict, Any, Union
 import uvicorn
 from dotenv import load_dotenv
 
@@ -14,9 +15,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import webhook handlers
-from webhook_handlers import router as webhook_router
+from webhook_handlers import router as webhook_router, webhook_worker
+from webhook_queue import webhook_queue, recent_webhook_ids
 
-app = FastAPI(title="OG Armory Backend", version="1.0.0")
+app = FastAPI(title="OG Armory Backend", version="1.0.0", default_response_class=FastJSONResponse)
 
 # CORS configuration
 cors_origins = os.getenv("CORS_ORIGIN", "http://localhost:3010").split(",")
@@ -28,20 +30,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB connection
-try:
-    MONGO_URL = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/pspk_store')
-    DB_NAME = os.getenv('MONGODB_DB_NAME', 'pspk_store')
-    client = MongoClient(MONGO_URL)
-    db = client[DB_NAME]
-    collection = db.status
-    products_collection = db.products
-    print(f"✅ Connected to MongoDB: {MONGO_URL}")
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {str(e)}")
-    db = None
-    collection = None
-    products_collection = None
+# MongoDB connection (async, via Motor)
+from repository import MONGO_URL, db, product_repository, status_repository, encode_cursor, decode_cursor, build_projection
+from indexes import ensure_indexes, index_report
+from product_cache import product_cache
+from catalog_version import catalog_version
+from compression import compressed_json_response, snapshot_cache
+from shopify_rate_limiter import rate_limiter
+from content_hash import write_stats
+from resilience import circuit_breakers
+if product_repository is not None:
+    print(f"✅ MongoDB client configured: {MONGO_URL}")
+else:
+    print(f"❌ MongoDB client setup failed: {MONGO_URL}")
+
+@app.on_event("startup")
+async def provision_indexes():
+    """Declare and reconcile required MongoDB indexes"""
+    if db is None:
+        return
+    try:
+        report = await ensure_indexes(db)
+        print(f"✅ MongoDB indexes reconciled: {len(report['created'])} created, {len(report['rebuilt'])} rebuilt, {len(report['failed'])} failed")
+    except Exception as e:
+        print(f"❌ MongoDB index provisioning failed: {str(e)}")
+
+# Another instance's write may have made locally cached bodies stale
+catalog_version.on_remote_change(product_cache.clear)
+
+@app.on_event("startup")
+async def start_catalog_version_sync():
+    """Share the catalog version (and so ETags) with the other app instances"""
+    catalog_version.start()
+
+@app.on_event("shutdown")
+async def stop_catalog_version_sync():
+    await catalog_version.stop()
+
+@app.on_event("startup")
+async def start_webhook_worker():
+    """Apply queued product webhooks in the background"""
+    if webhook_worker is not None:
+        webhook_worker.start()
+        print("✅ Webhook worker started")
+
+@app.on_event("shutdown")
+async def stop_webhook_worker():
+    # An interrupted batch is handed back to the queue; if that fails (or the
+    # process dies), claim_batch retakes it after WEBHOOK_CLAIM_TIMEOUT_SECONDS
+    if webhook_worker is not None:
+        await webhook_worker.stop()
 
 # Include webhook routes
 app.include_router(webhook_router, prefix="/api")
@@ -61,23 +99,19 @@ async def root():
 async def get_status():
     """Get system status"""
     try:
-        if collection is not None:
-            count = collection.count_documents({})
-            latest = collection.find().sort("timestamp", -1).limit(1)
-            latest_doc = list(latest)
+        if status_repository is not None:
+            count = await status_repository.count()
+            latest_doc = await status_repository.latest()
             
-            # Convert ObjectId to string for JSON serialization
-            if latest_doc and '_id' in latest_doc[0]:
-                latest_doc[0]['_id'] = str(latest_doc[0]['_id'])
-            
-            return {
+            # Returned directly so ObjectId/datetime are encoded natively by orjson
+            return FastJSONResponse({
                 "status": "healthy", 
                 "mongodb": "connected",
                 "documents_count": count,
-                "latest": latest_doc[0] if latest_doc else None,
+                "latest": latest_doc,
                 "shopify_integration": "active",
                 "webhooks": "configured"
-            }
+            })
         else:
             return {"status": "degraded", "mongodb": "disconnected"}
     except Exception as e:
@@ -88,9 +122,9 @@ async def create_status(request: Request):
     """Create status entry"""
     try:
         data = await request.json()
-        if collection is not None:
+        if status_repository is not None:
             data["timestamp"] = datetime.now()
-            result = collection.insert_one(data)
+            result = await status_repository.insert(data)
             return {
                 "message": "Status created", 
                 "id": str(result.inserted_id),
@@ -101,70 +135,266 @@ async def create_status(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/admin/indexes")
+async def get_index_report():
+    """Report declared indexes, their presence and $indexStats usage"""
+    try:
+        if db is None:
+            raise HTTPException(status_code=500, detail="Database not connected")
+        return await index_report(db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get index report: {str(e)}")
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Expose in-process cache counters"""
+    webhook_metrics = None
+    if webhook_queue is not None:
+        try:
+            webhook_metrics = {**await webhook_queue.stats(), "worker": webhook_worker.stats(), "dedup": recent_webhook_ids.stats()}
+        except Exception as e:
+            webhook_metrics = {"error": str(e)}
+    return {
+        "product_cache": product_cache.stats(),
+        "catalog_version": catalog_version.stats(),
+        "compression": snapshot_cache.stats(),
+        "shopify_rate_limits": rate_limiter.stats(),
+        "shopify_http": get_async_session().stats(),
+        "storefront_cache": storefront_cache.stats(),
+        "change_detection": write_stats.stats(),
+        "circuit_breakers": circuit_breakers.stats(),
+        "shopify_health_probe": shopify_health_probe.stats(),
+        "webhook_queue": webhook_metrics
+    }
+
 # Product sync endpoint
 # Import Shopify service
-from shopify_service import shopify_service
+from shopify_service import shopify_service, async_shopify_service, EMPTY_STOREFRONT_PRODUCTS
+from storefront_cache import storefront_cache
+from storefront_queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DEFAULT_PROFILE, page_info as storefront_page_info
+from shopify_async_http import get_async_session, close_async_session
+from shopify_mutations import ProductMutation
+from health_probe import HealthProbe
+
+@app.on_event("shutdown")
+async def close_shopify_pool():
+    """Release pooled Shopify connections"""
+    await close_async_session()
+
+shopify_health_probe = HealthProbe(async_shopify_service.health_check)
+
+@app.on_event("startup")
+async def start_shopify_health_probe():
+    """Keep the Shopify health state fresh in the background"""
+    shopify_health_probe.start()
+
+@app.on_event("shutdown")
+async def stop_shopify_health_probe():
+    await shopify_health_probe.stop()
 
 @app.get("/api/shopify/health")
-async def shopify_health():
-    """Check Shopify API connectivity"""
-    return shopify_service.health_check()
+async def shopify_health(deep: bool = False):
+    """Shopify API connectivity from the background probe (age_seconds old); deep=1 checks live"""
+    if deep:
+        await shopify_health_probe.refresh()
+    result = await shopify_health_probe.latest()
+    # Breaker state is local, so always report it live
+    result["circuit_breakers"] = circuit_breakers.stats()
+    return result
 
 @app.post("/api/shopify/sync-products")
-async def sync_products():
-    """Sync all products from Shopify to MongoDB"""
+async def sync_products(full: bool = False):
+    """Sync products from Shopify to MongoDB (incremental unless full=true)"""
     try:
-        result = shopify_service.sync_all_products()
+        # Runs in a worker thread so a long paginated sync doesn't block the event loop
+        result = await run_in_threadpool(shopify_service.sync_all_products, full)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
 
+@app.post("/api/shopify/bulk-sync")
+async def bulk_sync_products():
+    """Full resync through a Shopify GraphQL bulk operation"""
+    try:
+        return await run_in_threadpool(shopify_service.bulk_sync_products)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk sync failed: {str(e)}")
+
+@app.post("/api/shopify/reconcile-deletions")
+async def reconcile_deletions():
+    """Soft-delete MongoDB products that no longer exist in Shopify"""
+    try:
+        return await run_in_threadpool(shopify_service.reconcile_deleted_products)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reconciliation failed: {str(e)}")
+
 @app.get("/api/products")
-async def get_products(limit: int = 50, skip: int = 0):
-    """Get products from MongoDB"""
+async def get_products(request: Request, limit: int = Query(50, ge=1, le=250), cursor: Optional[str] = None, include_total: bool = False, fields: Optional[str] = None):
+    """Get products from MongoDB using opaque keyset cursors"""
     try:
-        if not products_collection:
+        etag = catalog_version.etag(request)
+        not_modified = catalog_version.not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        
+        if product_repository is None:
             raise HTTPException(status_code=500, detail="Database not connected")
-            
-        products = list(products_collection.find(
-            {"sync_status": {"$ne": "deleted"}}
-        ).skip(skip).limit(limit))
         
-        # Convert ObjectId to string for JSON serialization
-        for product in products:
-            if '_id' in product:
-                product['_id'] = str(product['_id'])
-                
-        total_count = products_collection.count_documents(
-            {"sync_status": {"$ne": "deleted"}}
-        )
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        try:
+            projection = build_projection(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        cache_key = product_cache.list_key(limit, after, include_total, fields)
+        # Read before Mongo so a write landing mid-request can't leave this page cached
+        generation = product_cache.generation
+        cached = product_cache.get(cache_key)
+        if cached is not None:
+            return compressed_json_response(request, cached, etag, headers)
+            
+        # Fetch one extra row to know whether another page exists
+        products = await product_repository.list_products(limit=limit + 1, after=after, projection=projection)
+        has_more = len(products) > limit
+        products = products[:limit]
         
-        return {
+        page = {
             "products": products,
-            "total": total_count,
             "limit": limit,
-            "skip": skip
+            "has_more": has_more,
+            "next_cursor": encode_cursor(products[-1]["shopify_id"]) if has_more else None
         }
+        if include_total:
+            page["total"] = await product_repository.count_products()
+        
+        # Cache the rendered body so hits skip serialization entirely
+        body = dumps(page)
+        product_cache.set(cache_key, body, generation)
+        return compressed_json_response(request, body, etag, headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get products: {str(e)}")
 
+@app.get("/api/products/export")
+async def export_products(fields: Optional[str] = None, gzip: bool = False):
+    """Stream the whole listed catalog as NDJSON straight from a Mongo cursor"""
+    if product_repository is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    try:
+        projection = build_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def ndjson_lines():
+        # wbits=31 writes a gzip header/trailer; the compressor keeps memory constant
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+        buffer = []
+        async for product in product_repository.iter_products(projection=projection):
+            buffer.append(dumps(product))
+            if len(buffer) >= 200:
+                chunk = b"\n".join(buffer) + b"\n"
+                buffer = []
+                yield compressor.compress(chunk) if compressor else chunk
+        if buffer:
+            chunk = b"\n".join(buffer) + b"\n"
+            yield compressor.compress(chunk) if compressor else chunk
+        if compressor:
+            yield compressor.flush()
+    
+    headers = {"Content-Disposition": 'attachment; filename="products.ndjson"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson", headers=headers)
+
+class BatchGetRequest(BaseModel):
+    # Shopify product ids (numbers or numeric strings) and/or handles
+    ids: List[Union[int, str]] = []
+    fields: Optional[str] = None
+
+MAX_BATCH_GET_IDS = 250
+
+@app.post("/api/products:batchGet")
+async def batch_get_products(batch: BatchGetRequest):
+    """Resolve many products (by shopify_id or handle) with one query, in request order"""
+    try:
+        if product_repository is None:
+            raise HTTPException(status_code=500, detail="Database not connected")
+        if len(batch.ids) > MAX_BATCH_GET_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_GET_IDS} ids per request")
+        try:
+            projection = build_projection(batch.fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Numeric ids are Shopify product ids, anything else is treated as a handle
+        keys = [str(i) for i in batch.ids]
+        shopify_ids = [int(key) for key in keys if key.isdigit()]
+        handles = [key for key in keys if not key.isdigit()]
+        docs = await product_repository.get_many(shopify_ids, handles, projection=projection)
+        
+        by_key = {}
+        for doc in docs:
+            by_key[str(doc.get("shopify_id"))] = doc
+            if doc.get("handle"):
+                by_key[doc["handle"]] = doc
+        
+        products = []
+        not_found = []
+        for requested, key in zip(batch.ids, keys):
+            doc = by_key.get(key)
+            if doc is None:
+                not_found.append(requested)
+            else:
+                products.append(doc)
+        
+        return FastJSONResponse({"products": products, "not_found": not_found})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to batch get products: {str(e)}")
+
 @app.get("/api/products/{product_id}")
-async def get_product(product_id: str):
+async def get_product(product_id: str, request: Request, fields: Optional[str] = None):
     """Get a specific product by Shopify ID"""
     try:
-        if not products_collection:
+        etag = catalog_version.etag(request)
+        not_modified = catalog_version.not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        
+        if product_repository is None:
             raise HTTPException(status_code=500, detail="Database not connected")
             
-        product = products_collection.find_one({"shopify_id": int(product_id)})
+        shopify_id = int(product_id)
+        try:
+            projection = build_projection(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        cache_key = product_cache.product_key(shopify_id, fields)
+        generation = product_cache.generation
+        cached = product_cache.get(cache_key)
+        if cached is not None:
+            return compressed_json_response(request, cached, etag, headers)
+            
+        product = await product_repository.get_by_shopify_id(shopify_id, projection=projection)
         
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
             
-        # Convert ObjectId to string
-        if '_id' in product:
-            product['_id'] = str(product['_id'])
-            
-        return product
+        body = dumps(product)
+        product_cache.set(cache_key, body, generation)
+        return compressed_json_response(request, body, etag, headers)
+    except HTTPException:
+        raise
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid product ID")
     except Exception as e:
@@ -174,7 +404,7 @@ async def get_product(product_id: str):
 async def create_shopify_product(product_data: dict):
     """Create a new product in Shopify"""
     try:
-        result = shopify_service.create_product(product_data)
+        result = await async_shopify_service.create_product(product_data)
         if result:
             return {"status": "success", "product": result}
         else:
@@ -186,7 +416,7 @@ async def create_shopify_product(product_data: dict):
 async def update_shopify_product(product_id: str, product_data: dict):
     """Update a product in Shopify"""
     try:
-        result = shopify_service.update_product(product_id, product_data)
+        result = await async_shopify_service.update_product(product_id, product_data)
         if result:
             return {"status": "success", "product": result}
         else:
@@ -198,7 +428,7 @@ async def update_shopify_product(product_id: str, product_data: dict):
 async def delete_shopify_product(product_id: str):
     """Delete a product from Shopify"""
     try:
-        result = shopify_service.delete_product(product_id)
+        result = await async_shopify_service.delete_product(product_id)
         if result:
             return {"status": "success", "message": "Product deleted"}
         else:
@@ -206,12 +436,69 @@ async def delete_shopify_product(product_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete product: {str(e)}")
 
+class BatchMutationRequest(BaseModel):
+    products: List[Dict[str, Any]] = []
+
+MAX_BATCH_MUTATIONS = 250
+
+@app.post("/api/shopify/products:batch")
+async def batch_write_shopify_products(payload: BatchMutationRequest):
+    """Create (no id) or update (with id) many products concurrently
+    
+    Streams one NDJSON result per product in completion order; index
+    points back into the request's products list.
+    """
+    if not payload.products:
+        raise HTTPException(status_code=400, detail="No products given")
+    if len(payload.products) > MAX_BATCH_MUTATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_MUTATIONS} products per batch")
+    
+    mutations = [ProductMutation.from_payload(product) for product in payload.products]
+    
+    async def ndjson_results():
+        async for result in async_shopify_service.mutate_products(mutations):
+            yield dumps(result.to_dict()) + b"\n"
+    
+    return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
+
 @app.get("/api/storefront/products")
-async def get_storefront_products(query: str = None):
-    """Get products for frontend display using Storefront API"""
+async def get_storefront_products(
+    request: Request,
+    query: str = None,
+    first: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="pageInfo.endCursor / next_cursor of the previous page"),
+    profile: str = Query(DEFAULT_PROFILE, description="listing, detail or full")
+):
+    """Get a page of products for frontend display using Storefront API (stale-while-revalidate cached)"""
     try:
-        result = shopify_service.get_storefront_products(query)
-        return result
+        try:
+            cached = await async_shopify_service.get_storefront_products_cached(query, first, after, profile)
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"❌ Storefront fetch failed with nothing cached: {str(e)}")
+            return FastJSONResponse(EMPTY_STOREFRONT_PRODUCTS, headers={"Cache-Control": "no-store"})
+        
+        # The entry version changes on every refresh, so it identifies the body
+        etag = f'"{catalog_version.boot_id}-sf{cached.version}"'
+        not_modified = catalog_version.not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Age": str(int(cached.age)),
+            "X-Cache": cached.state
+        }
+        
+        info = storefront_page_info(cached.value)
+        body = {
+            **cached.value,
+            "next_cursor": info.get("endCursor") if info.get("hasNextPage") else None
+        }
+        return compressed_json_response(request, dumps(body), etag, headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get storefront products: {str(e)}")
 
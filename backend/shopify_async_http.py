@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Shared async HTTP client for Shopify calls
+The httpx.AsyncClient counterpart of shopify_http.ShopifySession for code
+running on the FastAPI event loop: one connection pool per process, the
+same timeouts, adaptive rate limiting and circuit breakers, plus a cap on
+calls in flight.
+"""
+
+import os
+import asyncio
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+import httpx
+from shopify_http import CONNECT_TIMEOUT, READ_TIMEOUT, POOL_MAXSIZE, MAX_THROTTLE_RETRIES
+from shopify_rate_limiter import rate_limiter
+from resilience import (
+    CircuitOpenError, circuit_breakers, backoff_delay, RETRY_MAX_ATTEMPTS, IDEMPOTENT_METHODS
+)
+
+# Shopify calls allowed in flight at once; the rest queue here rather than in the pool
+MAX_CONCURRENCY = int(os.getenv('SHOPIFY_HTTP_MAX_CONCURRENCY', '10'))
+
+
+class AsyncShopifyCircuitOpenError(CircuitOpenError, httpx.TransportError):
+    """Circuit open; a TransportError so existing httpx.HTTPError handlers catch it"""
+
+    def __init__(self, name: str, retry_in: float):
+        CircuitOpenError.__init__(self, name, retry_in)
+
+
+class AsyncShopifySession:
+    """Pooled httpx.AsyncClient that paces Admin API calls
+
+    Admin API calls wait for room in their store's leaky bucket before taking
+    a concurrency slot, so a throttled store doesn't hold slots that
+    Storefront calls could use. Throttled calls are resent after the
+    advertised delay, as in ShopifySession.
+    """
+
+    def __init__(self, pool_maxsize: int = POOL_MAXSIZE, max_concurrency: int = MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.requests = 0
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            self.requests += 1
+            return await self.client.request(method, url, **kwargs)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        """Send through the host's circuit breaker, retrying idempotent calls on transient failures
+
+        retries works as in ShopifySession.request.
+        """
+        breaker = circuit_breakers.get(urlparse(url).netloc)
+        if retries is None:
+            retries = RETRY_MAX_ATTEMPTS if method.upper() in IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            retry_in = breaker.allow()
+            if retry_in:
+                raise AsyncShopifyCircuitOpenError(breaker.name, retry_in)
+            try:
+                response = await self._send_paced(method, url, **kwargs)
+            except httpx.TransportError:
+                breaker.record_failure()
+                if attempt < retries:
+                    attempt += 1
+                    await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                raise
+            except Exception:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelled: no verdict on the upstream
+                breaker.cancel()
+                raise
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+                if attempt < retries:
+                    attempt += 1
+                    await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                return response
+            breaker.record_success()
+            return response
+
+    async def _send_paced(self, method: str, url: str, **kwargs) -> httpx.Response:
+        bucket = rate_limiter.bucket(url)
+        if bucket is None:
+            return await self._send(method, url, **kwargs)
+
+        is_graphql = rate_limiter.classify(url) == 'graphql'
+        attempts = 0
+        while True:
+            await bucket.acquire_async(rate_limiter.request_cost(url))
+            response = await self._send(method, url, **kwargs)
+
+            payload = None
+            if is_graphql and response.is_success:
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+
+            retry_after = rate_limiter.observe_response(url, response.status_code, response.headers, payload)
+            if retry_after is None or attempts >= MAX_THROTTLE_RETRIES:
+                return response
+            attempts += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('PUT', url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('DELETE', url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'requests': self.requests,
+        }
+
+
+_async_session: Optional[AsyncShopifySession] = None
+
+
+def get_async_session() -> AsyncShopifySession:
+    """Process-wide shared async session, created on first use inside the event loop"""
+    global _async_session
+    if _async_session is None:
+        _async_session = AsyncShopifySession()
+    return _async_session
+
+
+async def close_async_session() -> None:
+    """Close the shared pool (app shutdown)"""
+    global _async_session
+    if _async_session is not None:
+        await _async_session.aclose()
+        _async_session = None
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Shopify GraphQL Bulk Operations helpers
+Query text and streaming reassembly of bulk JSONL results into Admin
+REST-shaped product documents
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BULK_PRODUCTS_QUERY = """
+{
+    products {
+        edges {
+            node {
+                id
+                title
+                handle
+                descriptionHtml
+                productType
+                vendor
+                tags
+                status
+                createdAt
+                updatedAt
+                publishedAt
+                variants {
+                    edges {
+                        node {
+                            id
+                            title
+                            sku
+                            price
+                            compareAtPrice
+                            inventoryQuantity
+                            selectedOptions {
+                                name
+                                value
+                            }
+                        }
+                    }
+                }
+                images {
+                    edges {
+                        node {
+                            id
+                            url
+                            altText
+                            width
+                            height
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
+RUN_BULK_QUERY_MUTATION = """
+mutation runBulkQuery($query: String!) {
+    bulkOperationRunQuery(query: $query) {
+        bulkOperation {
+            id
+            status
+            createdAt
+        }
+        userErrors {
+            field
+            message
+        }
+    }
+}
+"""
+
+CURRENT_BULK_OPERATION_QUERY = """
+{
+    currentBulkOperation {
+        id
+        status
+        errorCode
+        objectCount
+        url
+        partialDataUrl
+    }
+}
+"""
+
+
+def gid_to_id(gid: Optional[str]) -> Optional[int]:
+    """gid://shopify/Product/123 -> 123"""
+    if not gid:
+        return None
+    try:
+        return int(str(gid).rsplit('/', 1)[-1])
+    except ValueError:
+        return None
+
+
+def _gid_type(gid: str) -> str:
+    """gid://shopify/ProductVariant/1 -> ProductVariant"""
+    parts = str(gid).split('/')
+    return parts[-2] if len(parts) >= 2 else ''
+
+
+def _to_admin_variant(node: Dict[str, Any]) -> Dict[str, Any]:
+    options = node.get('selectedOptions') or []
+    variant = {
+        'id': gid_to_id(node.get('id')),
+        'admin_graphql_api_id': node.get('id'),
+        'title': node.get('title'),
+        'sku': node.get('sku'),
+        'price': node.get('price'),
+        'compare_at_price': node.get('compareAtPrice'),
+        'inventory_quantity': node.get('inventoryQuantity'),
+    }
+    for index, option in enumerate(options[:3], start=1):
+        variant[f'option{index}'] = option.get('value')
+    return variant
+
+
+def _to_admin_image(node: Dict[str, Any], position: int) -> Dict[str, Any]:
+    return {
+        'id': gid_to_id(node.get('id')),
+        'admin_graphql_api_id': node.get('id'),
+        'src': node.get('url'),
+        'alt': node.get('altText'),
+        'width': node.get('width'),
+        'height': node.get('height'),
+        'position': position,
+    }
+
+
+def _to_admin_product(node: Dict[str, Any]) -> Dict[str, Any]:
+    status = node.get('status')
+    return {
+        'id': gid_to_id(node.get('id')),
+        'admin_graphql_api_id': node.get('id'),
+        'title': node.get('title'),
+        'handle': node.get('handle'),
+        'body_html': node.get('descriptionHtml'),
+        'product_type': node.get('productType'),
+        'vendor': node.get('vendor'),
+        'tags': ', '.join(node.get('tags') or []),
+        'status': status.lower() if status else None,
+        'created_at': node.get('createdAt'),
+        'updated_at': node.get('updatedAt'),
+        'published_at': node.get('publishedAt'),
+        'variants': [],
+        'images': [],
+    }
+
+
+def _finish(product: Dict[str, Any]) -> Dict[str, Any]:
+    # REST payloads carry the featured image separately
+    product['image'] = product['images'][0] if product['images'] else None
+    return product
+
+
+def iter_bulk_products(lines: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """Reassemble bulk JSONL lines into products, one product in memory at a time
+
+    Bulk results are flattened: children (variants, images) carry a
+    __parentId and follow their parent, so a product is complete as soon as
+    the next product line (or the end of the file) arrives.
+    """
+    current = None
+    orphans = 0
+
+    for raw in lines:
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        raw = raw.strip()
+        if not raw:
+            continue
+        node = json.loads(raw)
+        parent_id = node.get('__parentId')
+
+        if parent_id is None:
+            if current is not None:
+                yield _finish(current)
+            current = _to_admin_product(node)
+            continue
+
+        if current is None or current['admin_graphql_api_id'] != parent_id:
+            orphans += 1
+            continue
+
+        kind = _gid_type(node.get('id', ''))
+        if kind == 'ProductVariant':
+            current['variants'].append(_to_admin_variant(node))
+        elif kind in ('ProductImage', 'MediaImage', 'Image'):
+            current['images'].append(_to_admin_image(node, len(current['images']) + 1))
+
+    if current is not None:
+        yield _finish(current)
+
+    if orphans:
+        logger.warning(f"Skipped {orphans} bulk rows whose parent was not the current product")
+
+
+def batched(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group an iterator into lists of at most size items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
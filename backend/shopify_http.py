@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for Shopify calls
+One pooled, keep-alive requests.Session with connect/read timeouts
+configured in one place, paced by the adaptive rate limiter and guarded
+by a circuit breaker with retries for idempotent calls. Used by
+ShopifyService and the store scripts.
+"""
+
+import os
+import time
+import threading
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from shopify_rate_limiter import rate_limiter
+from resilience import (
+    CircuitOpenError, circuit_breakers, backoff_delay, RETRY_MAX_ATTEMPTS, IDEMPOTENT_METHODS
+)
+
+# (connect, read) timeouts in seconds
+CONNECT_TIMEOUT = float(os.getenv('SHOPIFY_HTTP_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('SHOPIFY_HTTP_READ_TIMEOUT', '30'))
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Connections kept alive per host
+POOL_MAXSIZE = int(os.getenv('SHOPIFY_HTTP_POOL_MAXSIZE', '20'))
+
+# Throttled (429 / GraphQL THROTTLED) calls are never processed by Shopify, so they are safe to resend
+MAX_THROTTLE_RETRIES = int(os.getenv('SHOPIFY_MAX_THROTTLE_RETRIES', '5'))
+
+
+class ShopifyCircuitOpenError(CircuitOpenError, requests.exceptions.ConnectionError):
+    """Circuit open; a ConnectionError so existing RequestException handlers catch it"""
+
+
+class ShopifySession(requests.Session):
+    """requests.Session that applies DEFAULT_TIMEOUT and paces Admin API calls
+
+    Every Admin API call waits for room in its store's leaky bucket, feeds
+    the response's call-limit/cost data back into it, and is resent after
+    the advertised delay if Shopify throttled it. Calls also go through
+    the host's circuit breaker (see resilience).
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_maxsize: int = POOL_MAXSIZE):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, retries=None, **kwargs):
+        """Send through the host's circuit breaker, retrying idempotent calls on transient failures
+
+        retries overrides the default (RETRY_MAX_ATTEMPTS for idempotent
+        methods, 0 otherwise), e.g. retries=1 for a read-only GraphQL POST
+        or retries=0 for callers with their own retry policy.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        breaker = circuit_breakers.get(urlparse(url).netloc)
+        if retries is None:
+            retries = RETRY_MAX_ATTEMPTS if method.upper() in IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            retry_in = breaker.allow()
+            if retry_in:
+                raise ShopifyCircuitOpenError(breaker.name, retry_in)
+            try:
+                response = self._send_paced(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                breaker.record_failure()
+                if attempt < retries:
+                    attempt += 1
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                raise
+            except Exception:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                breaker.cancel()
+                raise
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+                if attempt < retries:
+                    attempt += 1
+                    response.close()
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                return response
+            breaker.record_success()
+            return response
+
+    def _send_paced(self, method, url, **kwargs):
+        bucket = rate_limiter.bucket(url)
+        if bucket is None:
+            return super().request(method, url, **kwargs)
+
+        is_graphql = rate_limiter.classify(url) == 'graphql'
+        attempts = 0
+        while True:
+            bucket.acquire(rate_limiter.request_cost(url))
+            response = super().request(method, url, **kwargs)
+
+            payload = None
+            if is_graphql and response.ok and not kwargs.get('stream'):
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+
+            retry_after = rate_limiter.observe_response(url, response.status_code, response.headers, payload)
+            if retry_after is None or attempts >= MAX_THROTTLE_RETRIES:
+                return response
+            # The bucket is now paused for retry_after, so the next acquire() waits it out
+            attempts += 1
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> ShopifySession:
+    """Process-wide shared session (requests sessions are safe to share for plain calls)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = ShopifySession()
+    return _session
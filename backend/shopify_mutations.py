@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Concurrent Shopify product mutations
+Runs many Admin REST product writes through a bounded worker pool on the
+shared (rate-limited) Shopify sessions, retrying transient failures and
+yielding one result per item as soon as it finishes. Given a lookup of
+the stored product, updates only send the fields that changed and are
+skipped (without a request) when nothing did.
+
+    executor = MutationExecutor(get_session(), admin_url, headers)
+    for result in executor.run(ProductMutation.create(p) for p in payloads):
+        print(result.index, result.ok)
+"""
+
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, Optional
+import requests
+import httpx
+from resilience import backoff_delay, CircuitOpenError
+from content_hash import changed_fields, write_stats
+
+logger = logging.getLogger(__name__)
+
+# Mutations in flight at once (the rate limiter still decides the pace)
+MUTATION_WORKERS = int(os.getenv('SHOPIFY_MUTATION_WORKERS', '4'))
+
+# Retries after the first attempt for transient failures, with jittered exponential backoff
+MUTATION_MAX_RETRIES = int(os.getenv('SHOPIFY_MUTATION_MAX_RETRIES', '3'))
+MUTATION_RETRY_BACKOFF = float(os.getenv('SHOPIFY_MUTATION_RETRY_BACKOFF_SECONDS', '0.5'))
+
+# 429s are already resent by the sessions; these are what's left to retry here
+# (the sessions' own idempotent-call retries are switched off for mutations).
+# Creates are not idempotent, so they only retry statuses Shopify returns
+# before touching the product.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RETRYABLE_CREATE_STATUSES = {429, 503}
+
+
+@dataclass
+class ProductMutation:
+    """One product write: POST /products.json, PUT or DELETE /products/{id}.json"""
+    method: str
+    path: str
+    payload: Optional[Dict[str, Any]] = None
+    # Caller data carried through to the result (e.g. the source folder)
+    context: Any = None
+    product_id: Any = None
+
+    @classmethod
+    def create(cls, product: Dict[str, Any], context: Any = None) -> 'ProductMutation':
+        return cls('POST', '/products.json', {'product': product}, context)
+
+    @classmethod
+    def update(cls, product_id: Any, product: Dict[str, Any], context: Any = None) -> 'ProductMutation':
+        return cls('PUT', f'/products/{product_id}.json', {'product': product}, context, product_id)
+
+    @classmethod
+    def delete(cls, product_id: Any, context: Any = None) -> 'ProductMutation':
+        return cls('DELETE', f'/products/{product_id}.json', None, context, product_id)
+
+    @classmethod
+    def from_payload(cls, product: Dict[str, Any], context: Any = None) -> 'ProductMutation':
+        """Update when the payload carries an id, create otherwise"""
+        if product.get('id'):
+            return cls.update(product['id'], product, context)
+        return cls.create(product, context)
+
+    @property
+    def idempotent(self) -> bool:
+        return self.method != 'POST'
+
+
+@dataclass
+class MutationResult:
+    """Outcome of one mutation, in input order via index"""
+    index: int
+    method: str
+    path: str
+    ok: bool
+    status_code: Optional[int] = None
+    product: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    context: Any = field(default=None, repr=False)
+    product_id: Any = None
+    # Update not sent because nothing differed from the stored product
+    skipped: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'method': self.method,
+            'path': self.path,
+            'ok': self.ok,
+            'skipped': self.skipped,
+            'product_id': self.product_id,
+            'status_code': self.status_code,
+            'product': self.product,
+            'error': self.error,
+            'attempts': self.attempts,
+            'elapsed_ms': round(self.elapsed * 1000, 1),
+        }
+
+
+def _retryable_status(mutation: ProductMutation, status_code: int) -> bool:
+    statuses = RETRYABLE_STATUSES if mutation.idempotent else RETRYABLE_CREATE_STATUSES
+    return status_code in statuses
+
+
+def _result(index: int, mutation: ProductMutation, started: float, attempts: int,
+            status_code: Optional[int] = None, body: Any = None, error: Optional[str] = None) -> MutationResult:
+    ok = error is None and status_code is not None and 200 <= status_code < 300
+    product = body.get('product') if ok and isinstance(body, dict) else None
+    if not ok and error is None:
+        error = str(body)[:500] if body else f"HTTP {status_code}"
+    product_id = product.get('id') if product else mutation.product_id
+    return MutationResult(index, mutation.method, mutation.path, ok, status_code, product, error,
+                          attempts, time.perf_counter() - started, mutation.context, product_id)
+
+
+def detect_changes(mutation: ProductMutation, stored: Optional[Dict[str, Any]]) -> Optional[ProductMutation]:
+    """An update reduced to the fields that differ from stored, or None if none do"""
+    product = (mutation.payload or {}).get('product') or {}
+    changes = changed_fields(stored, product)
+    write_stats.record_outbound(len(product), len(changes))
+    if not changes:
+        return None
+    return replace(mutation, payload={'product': {**changes, 'id': product.get('id', mutation.product_id)}})
+
+
+def _skipped(index: int, mutation: ProductMutation, started: float, stored: Dict[str, Any]) -> MutationResult:
+    return MutationResult(index, mutation.method, mutation.path, True, product=stored,
+                          elapsed=time.perf_counter() - started, context=mutation.context,
+                          product_id=mutation.product_id, skipped=True)
+
+
+def _circuit_open(index: int, mutation: ProductMutation, started: float, attempts: int,
+                  error: CircuitOpenError) -> MutationResult:
+    """Fail fast while the breaker is open: nothing was sent, and short backoffs won't outlast it
+
+    The session's circuit-open errors subclass its transport errors, so
+    this has to be caught before the generic retry handlers.
+    """
+    return _result(index, mutation, started, attempts, error=f"Circuit open, not sent: {str(error)}")
+
+
+def _json_or_text(response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+class MutationExecutor:
+    """Thread-pool executor on a ShopifySession (store scripts, worker threads)
+
+    lookup(product_id) returns the stored product for change detection on
+    updates; without it updates are sent as given.
+    """
+
+    def __init__(self, session, admin_url: str, headers: Dict[str, str], workers: int = MUTATION_WORKERS,
+                 max_retries: int = MUTATION_MAX_RETRIES, backoff: float = MUTATION_RETRY_BACKOFF,
+                 lookup: Optional[Callable[[Any], Optional[Dict[str, Any]]]] = None):
+        self.session = session
+        self.admin_url = admin_url.rstrip('/')
+        self.headers = headers
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.lookup = lookup
+
+    def execute(self, index: int, mutation: ProductMutation) -> MutationResult:
+        """Run one mutation with retries; never raises"""
+        started = time.perf_counter()
+        if mutation.method == 'PUT' and self.lookup is not None:
+            try:
+                stored = self.lookup(mutation.product_id)
+            except Exception as e:
+                logger.warning(f"Stored product lookup failed for {mutation.product_id}, sending full update: {str(e)}")
+                stored = None
+            reduced = detect_changes(mutation, stored)
+            if reduced is None:
+                return _skipped(index, mutation, started, stored)
+            mutation = reduced
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                response = self.session.request(
+                    mutation.method, f"{self.admin_url}{mutation.path}",
+                    headers=self.headers, json=mutation.payload, retries=0
+                )
+            except CircuitOpenError as e:
+                return _circuit_open(index, mutation, started, attempts, e)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # A read timeout may mean Shopify created the product anyway
+                retryable = mutation.idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                if retryable and attempts <= self.max_retries:
+                    time.sleep(backoff_delay(attempts, self.backoff))
+                    continue
+                return _result(index, mutation, started, attempts, error=str(e))
+            except requests.exceptions.RequestException as e:
+                return _result(index, mutation, started, attempts, error=str(e))
+
+            if _retryable_status(mutation, response.status_code) and attempts <= self.max_retries:
+                time.sleep(backoff_delay(attempts, self.backoff))
+                continue
+            return _result(index, mutation, started, attempts, response.status_code, _json_or_text(response))
+
+    def run(self, mutations: Iterable[ProductMutation]) -> Iterator[MutationResult]:
+        """Yield results in completion order
+
+        mutations is consumed lazily, at most two per worker ahead, so a
+        generator that builds large payloads (e.g. base64 images) never
+        has the whole batch in memory.
+        """
+        source = enumerate(mutations)
+        window = self.workers * 2
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < window:
+                    try:
+                        index, mutation = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(pool.submit(self.execute, index, mutation))
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+class AsyncMutationExecutor:
+    """asyncio executor on an AsyncShopifySession (FastAPI routes); lookup is awaited"""
+
+    def __init__(self, session, admin_url: str, headers: Dict[str, str], workers: int = MUTATION_WORKERS,
+                 max_retries: int = MUTATION_MAX_RETRIES, backoff: float = MUTATION_RETRY_BACKOFF,
+                 lookup: Optional[Callable[[Any], Awaitable[Optional[Dict[str, Any]]]]] = None):
+        self.session = session
+        self.admin_url = admin_url.rstrip('/')
+        self.headers = headers
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.lookup = lookup
+
+    async def execute(self, index: int, mutation: ProductMutation) -> MutationResult:
+        """Run one mutation with retries; never raises"""
+        started = time.perf_counter()
+        if mutation.method == 'PUT' and self.lookup is not None:
+            try:
+                stored = await self.lookup(mutation.product_id)
+            except Exception as e:
+                logger.warning(f"Stored product lookup failed for {mutation.product_id}, sending full update: {str(e)}")
+                stored = None
+            reduced = detect_changes(mutation, stored)
+            if reduced is None:
+                return _skipped(index, mutation, started, stored)
+            mutation = reduced
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                response = await self.session.request(
+                    mutation.method, f"{self.admin_url}{mutation.path}",
+                    headers=self.headers, json=mutation.payload, retries=0
+                )
+            except CircuitOpenError as e:
+                return _circuit_open(index, mutation, started, attempts, e)
+            except httpx.TransportError as e:
+                # Only a failed connect proves a create never reached Shopify
+                retryable = mutation.idempotent or isinstance(e, httpx.ConnectError)
+                if retryable and attempts <= self.max_retries:
+                    await asyncio.sleep(backoff_delay(attempts, self.backoff))
+                    continue
+                return _result(index, mutation, started, attempts, error=str(e) or type(e).__name__)
+            except httpx.HTTPError as e:
+                return _result(index, mutation, started, attempts, error=str(e))
+
+            if _retryable_status(mutation, response.status_code) and attempts <= self.max_retries:
+                await asyncio.sleep(backoff_delay(attempts, self.backoff))
+                continue
+            return _result(index, mutation, started, attempts, response.status_code, _json_or_text(response))
+
+    async def run(self, mutations: Iterable[ProductMutation]) -> AsyncIterator[MutationResult]:
+        """Yield results in completion order; pending work is cancelled if the consumer stops early"""
+        source = iter(enumerate(mutations))
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            try:
+                for index, mutation in source:
+                    await results.put(await self.execute(index, mutation))
+            finally:
+                # Sentinel so the consumer knows when every worker is done
+                results.put_nowait(None)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.workers)]
+        try:
+            remaining = len(workers)
+            while remaining:
+                result = await results.get()
+                if result is None:
+                    remaining -= 1
+                    continue
+                yield result
+        finally:
+            for task in workers:
+                task.cancel()
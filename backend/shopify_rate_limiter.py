@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Adaptive Shopify rate limiting
+A client-side model of Shopify's leaky buckets, corrected from every
+response: X-Shopify-Shop-Api-Call-Limit and Retry-After for REST, and
+extensions.cost.throttleStatus for Admin GraphQL.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# REST: 40 request bucket leaking 2/s on standard plans (Plus: 400, 20/s)
+REST_BUCKET_SIZE = float(os.getenv('SHOPIFY_REST_BUCKET_SIZE', '40'))
+REST_LEAK_RATE = float(os.getenv('SHOPIFY_REST_LEAK_RATE', '2'))
+
+# GraphQL: 1000 point bucket restoring 50/s on standard plans
+GRAPHQL_BUCKET_SIZE = float(os.getenv('SHOPIFY_GRAPHQL_BUCKET_SIZE', '1000'))
+GRAPHQL_RESTORE_RATE = float(os.getenv('SHOPIFY_GRAPHQL_RESTORE_RATE', '50'))
+GRAPHQL_DEFAULT_COST = float(os.getenv('SHOPIFY_GRAPHQL_DEFAULT_COST', '50'))
+
+# Headroom kept free for other clients of the same store
+BUCKET_HEADROOM = float(os.getenv('SHOPIFY_BUCKET_HEADROOM', '2'))
+
+
+class LeakyBucket:
+    """Leaky bucket tracking how full Shopify thinks we are"""
+
+    def __init__(self, capacity: float, leak_rate: float, headroom: float = BUCKET_HEADROOM):
+        self.capacity = capacity
+        self.leak_rate = leak_rate
+        self.headroom = headroom
+        self.level = 0.0
+        self.paused_until = 0.0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.throttled = 0
+
+    def _leak(self, now: float) -> None:
+        self.level = max(0.0, self.level - (now - self._updated_at) * self.leak_rate)
+        self._updated_at = now
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Claim room for a request and return how long to wait before sending it"""
+        with self._lock:
+            now = time.monotonic()
+            self._leak(now)
+            wait = max(0.0, self.paused_until - now)
+            limit = max(cost, self.capacity - self.headroom)
+            overflow = self.level + cost - limit
+            if overflow > 0:
+                wait = max(wait, overflow / self.leak_rate)
+            # Count the request as already in the bucket so concurrent callers queue behind it
+            self.level += cost
+            if wait > 0:
+                self.waits += 1
+                self.waited_seconds += wait
+            return wait
+
+    def acquire(self, cost: float = 1.0) -> None:
+        wait = self.reserve(cost)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, cost: float = 1.0) -> None:
+        wait = self.reserve(cost)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observe(self, level: Optional[float] = None, capacity: Optional[float] = None,
+                leak_rate: Optional[float] = None, retry_after: Optional[float] = None) -> None:
+        """Correct the model with what the server reported"""
+        with self._lock:
+            now = time.monotonic()
+            self._leak(now)
+            if capacity:
+                self.capacity = capacity
+            if leak_rate:
+                self.leak_rate = leak_rate
+            if level is not None:
+                # Our estimate already counts requests still in flight, which the
+                # server's figure doesn't include yet, so only ever correct upwards
+                self.level = max(self.level, level)
+            if retry_after is not None:
+                self.throttled += 1
+                self.paused_until = max(self.paused_until, now + retry_after)
+                self.level = self.capacity
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._leak(time.monotonic())
+            return {
+                'level': round(self.level, 2),
+                'capacity': self.capacity,
+                'leak_rate': self.leak_rate,
+                'waits': self.waits,
+                'waited_seconds': round(self.waited_seconds, 3),
+                'throttled': self.throttled,
+            }
+
+
+def parse_call_limit(value: Optional[str]) -> Optional[Tuple[float, float]]:
+    """'32/40' -> (32.0, 40.0)"""
+    if not value or '/' not in value:
+        return None
+    used, _, capacity = value.partition('/')
+    try:
+        return float(used), float(capacity)
+    except ValueError:
+        return None
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+class ShopifyRateLimiter:
+    """Per-store REST and GraphQL buckets"""
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], LeakyBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def classify(url: str) -> Optional[str]:
+        """'rest', 'graphql' or None for URLs the Admin limits don't apply to"""
+        path = urlparse(url).path
+        if '/admin/' not in path:
+            return None
+        return 'graphql' if path.endswith('/graphql.json') else 'rest'
+
+    def bucket(self, url: str) -> Optional[LeakyBucket]:
+        kind = self.classify(url)
+        if kind is None:
+            return None
+        key = (urlparse(url).netloc, kind)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if kind == 'graphql':
+                    bucket = LeakyBucket(GRAPHQL_BUCKET_SIZE, GRAPHQL_RESTORE_RATE, headroom=GRAPHQL_DEFAULT_COST)
+                else:
+                    bucket = LeakyBucket(REST_BUCKET_SIZE, REST_LEAK_RATE)
+                self._buckets[key] = bucket
+            return bucket
+
+    @staticmethod
+    def request_cost(url: str) -> float:
+        return GRAPHQL_DEFAULT_COST if ShopifyRateLimiter.classify(url) == 'graphql' else 1.0
+
+    def observe_response(self, url: str, status_code: int, headers, payload: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """Feed a response back into its bucket; returns a retry delay if the call was throttled"""
+        bucket = self.bucket(url)
+        if bucket is None:
+            return None
+
+        retry_after = None
+        if status_code == 429:
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+
+        if self.classify(url) == 'rest':
+            call_limit = parse_call_limit(headers.get('X-Shopify-Shop-Api-Call-Limit'))
+            if call_limit:
+                bucket.observe(level=call_limit[0], capacity=call_limit[1], retry_after=retry_after)
+            else:
+                bucket.observe(retry_after=retry_after)
+            return retry_after
+
+        # GraphQL reports throttling in the body, usually with a 200
+        throttle = (((payload or {}).get('extensions') or {}).get('cost') or {}).get('throttleStatus') or {}
+        if throttle:
+            maximum = float(throttle.get('maximumAvailable') or bucket.capacity)
+            available = float(throttle.get('currentlyAvailable', maximum))
+            restore = float(throttle.get('restoreRate') or bucket.leak_rate)
+            bucket.observe(level=maximum - available, capacity=maximum, leak_rate=restore)
+            errors = (payload or {}).get('errors') or []
+            if any((e.get('extensions') or {}).get('code') == 'THROTTLED' for e in errors if isinstance(e, dict)):
+                requested = float(((payload.get('extensions') or {}).get('cost') or {}).get('requestedQueryCost') or GRAPHQL_DEFAULT_COST)
+                retry_after = max(0.0, (requested - available) / restore) if restore else 1.0
+                bucket.observe(retry_after=retry_after)
+        elif retry_after is not None:
+            bucket.observe(retry_after=retry_after)
+        return retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {f"{host}:{kind}": bucket.stats() for (host, kind), bucket in buckets.items()}
+
+
+# Global instance
+rate_limiter = ShopifyRateLimiter()
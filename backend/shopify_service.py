@@ -1,11 +1,36 @@
 import os
+import re
 import json
+import queue
 import logging
-from typing import List, Dict, Optional, Any
-from datetime import datetime
+import threading
+import time
+from typing import List, Dict, Optional, Any, AsyncIterator
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, parse_qs
 import requests
-from pymongo import MongoClient
+import httpx
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
+from product_cache import product_cache
+from content_hash import content_hash, changed_fields, write_stats
+from catalog_version import catalog_version
+from shopify_http import get_session
+from shopify_async_http import get_async_session
+from resilience import circuit_breakers, RETRY_MAX_ATTEMPTS
+from repository import (
+    product_repository, LISTED_SYNC_STATUSES, DUPLICATE_KEY,
+    parse_shopify_time, newer_than_stored, placeholder_upsert
+)
+from storefront_cache import storefront_cache, CachedResult
+from shopify_mutations import ProductMutation, MutationResult, AsyncMutationExecutor
+from storefront_queries import products_query, products_variables, DEFAULT_PROFILE
+from shopify_bulk import (
+    BULK_PRODUCTS_QUERY, RUN_BULK_QUERY_MUTATION, CURRENT_BULK_OPERATION_QUERY,
+    iter_bulk_products, batched
+)
 
 # Load environment variables
 load_dotenv()
@@ -13,8 +38,60 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class ShopifyService:
-    """Production-ready Shopify integration service"""
+# Pages buffered between the sync fetcher and the MongoDB writer
+SYNC_QUEUE_PAGES = int(os.getenv('SHOPIFY_SYNC_QUEUE_PAGES', '4'))
+
+# Products per unordered bulk_write during syncs and imports
+SYNC_BATCH_SIZE = int(os.getenv('SHOPIFY_SYNC_BATCH_SIZE', '500'))
+
+# Bulk operation polling
+BULK_POLL_INTERVAL = float(os.getenv('SHOPIFY_BULK_POLL_INTERVAL_SECONDS', '2'))
+BULK_TIMEOUT = float(os.getenv('SHOPIFY_BULK_TIMEOUT_SECONDS', '1800'))
+
+# Sync checkpoints never pass the sync's start (Shopify's clock) minus this margin
+SYNC_CHECKPOINT_SKEW = float(os.getenv('SHOPIFY_SYNC_CHECKPOINT_SKEW_SECONDS', '300'))
+
+_NEXT_LINK = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+def parse_next_page_info(link_header: Optional[str]) -> Optional[str]:
+    """Extract the page_info cursor of the rel="next" entry in a Link header"""
+    if not link_header:
+        return None
+    match = _NEXT_LINK.search(link_header)
+    if not match:
+        return None
+    query = urlparse(match.group(1)).query
+    values = parse_qs(query).get('page_info')
+    return values[0] if values else None
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse an HTTP Date header into a naive UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def cap_sync_checkpoint(high_water_mark: Optional[datetime], started_at: datetime) -> Optional[datetime]:
+    """Limit a sync's updated_at high-water mark to its start time minus SYNC_CHECKPOINT_SKEW
+
+    Pages come in id order, not updated_at order, so a product updated
+    after its page was fetched can be older than the highest updated_at
+    seen; the next sync has to start early enough to pick it up.
+    """
+    if high_water_mark is None:
+        return None
+    return min(high_water_mark, started_at - timedelta(seconds=SYNC_CHECKPOINT_SKEW))
+
+# Returned when the Storefront API is unreachable and nothing is cached
+EMPTY_STOREFRONT_PRODUCTS = {'data': {'products': {'edges': []}}}
+
+class ShopifyClientBase:
+    """Credentials, endpoints and auth headers shared by the sync and async services"""
     
     def __init__(self):
         self.store_domain = os.getenv('SHOPIFY_STORE_DOMAIN')
@@ -25,13 +102,9 @@ class ShopifyService:
         if not all([self.store_domain, self.admin_token]):
             raise ValueError("Missing required Shopify credentials")
             
-        self.admin_url = f"https://{self.store_domain}/admin/api/{self.api_version}"
-        self.storefront_url = f"https://{self.store_domain}/api/{self.api_version}/graphql.json"
-        
-        # MongoDB connection
-        self.mongo_client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/pspk_store'))
-        self.db = self.mongo_client[os.getenv('MONGODB_DB_NAME', 'pspk_store')]
-        self.products_collection = self.db.products
+        # The URL overrides let the service run against a local stand-in server
+        self.admin_url = os.getenv('SHOPIFY_ADMIN_API_URL') or f"https://{self.store_domain}/admin/api/{self.api_version}"
+        self.storefront_url = os.getenv('SHOPIFY_STOREFRONT_API_URL') or f"https://{self.store_domain}/api/{self.api_version}/graphql.json"
         
     def get_admin_headers(self) -> Dict[str, str]:
         """Get headers for Admin API requests"""
@@ -47,11 +120,46 @@ class ShopifyService:
             'Content-Type': 'application/json'
         }
     
+    def verify_webhook(self, data: bytes, signature: str) -> bool:
+        """Verify Shopify webhook signature"""
+        import hmac
+        import hashlib
+        import base64
+        
+        webhook_secret = os.getenv('SHOPIFY_WEBHOOK_SECRET')
+        if not webhook_secret:
+            return False
+            
+        computed_signature = base64.b64encode(
+            hmac.new(
+                webhook_secret.encode('utf-8'),
+                data,
+                hashlib.sha256
+            ).digest()
+        ).decode('utf-8')
+        
+        return hmac.compare_digest(computed_signature, signature)
+
+class ShopifyService(ShopifyClientBase):
+    """Production-ready Shopify integration service"""
+    
+    def __init__(self):
+        super().__init__()
+        
+        # Pooled keep-alive session with default timeouts
+        self.http = get_session()
+        
+        # MongoDB connection
+        self.mongo_client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/pspk_store'))
+        self.db = self.mongo_client[os.getenv('MONGODB_DB_NAME', 'pspk_store')]
+        self.products_collection = self.db.products
+        self.sync_checkpoints = self.db.sync_checkpoints
+        
     def create_product(self, product_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Create a new product in Shopify"""
         try:
             url = f"{self.admin_url}/products.json"
-            response = requests.post(
+            response = self.http.post(
                 url,
                 headers=self.get_admin_headers(),
                 json={'product': product_data}
@@ -65,11 +173,15 @@ class ShopifyService:
                     {'shopify_id': product['id']},
                     {'$set': {
                         **product,
+                        'content_hash': content_hash(product),
+                        'shopify_updated_at': parse_shopify_time(product.get('updated_at')),
                         'updated_at': datetime.utcnow(),
                         'sync_status': 'synced'
                     }},
                     upsert=True
                 )
+                product_cache.invalidate_product(product['id'])
+                catalog_version.bump()
                 logger.info(f"Created product: {product['title']} (ID: {product['id']})")
             
             return product
@@ -78,14 +190,27 @@ class ShopifyService:
             logger.error(f"Failed to create product: {str(e)}")
             return None
     
+    def stored_product(self, product_id: Any) -> Optional[Dict[str, Any]]:
+        """Listed product as stored in MongoDB, for change detection (MutationExecutor lookup=)"""
+        return self.products_collection.find_one(
+            {'shopify_id': int(product_id), 'sync_status': {'$in': LISTED_SYNC_STATUSES}}, {'_id': 0}
+        )
+    
     def update_product(self, product_id: str, product_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update an existing product in Shopify"""
+        """Update an existing product in Shopify, sending only the fields that differ from MongoDB"""
         try:
+            stored = self.stored_product(product_id)
+            changes = changed_fields(stored, product_data)
+            write_stats.record_outbound(len(product_data), len(changes))
+            if not changes:
+                logger.info(f"Skipped no-op update of product {product_id}")
+                return stored
+            
             url = f"{self.admin_url}/products/{product_id}.json"
-            response = requests.put(
+            response = self.http.put(
                 url,
                 headers=self.get_admin_headers(),
-                json={'product': product_data}
+                json={'product': {'id': int(product_id), **changes}}
             )
             response.raise_for_status()
             
@@ -96,10 +221,14 @@ class ShopifyService:
                     {'shopify_id': product['id']},
                     {'$set': {
                         **product,
+                        'content_hash': content_hash(product),
+                        'shopify_updated_at': parse_shopify_time(product.get('updated_at')),
                         'updated_at': datetime.utcnow(),
                         'sync_status': 'synced'
                     }}
                 )
+                product_cache.invalidate_product(product['id'])
+                catalog_version.bump()
                 logger.info(f"Updated product: {product['title']} (ID: {product['id']})")
             
             return product
@@ -112,7 +241,7 @@ class ShopifyService:
         """Delete a product from Shopify"""
         try:
             url = f"{self.admin_url}/products/{product_id}.json"
-            response = requests.delete(url, headers=self.get_admin_headers())
+            response = self.http.delete(url, headers=self.get_admin_headers())
             response.raise_for_status()
             
             # Mark as deleted in MongoDB
@@ -123,6 +252,8 @@ class ShopifyService:
                     'sync_status': 'deleted'
                 }}
             )
+            product_cache.invalidate_product(product_id)
+            catalog_version.bump()
             
             logger.info(f"Deleted product ID: {product_id}")
             return True
@@ -131,63 +262,212 @@ class ShopifyService:
             logger.error(f"Failed to delete product {product_id}: {str(e)}")
             return False
     
+    def _fetch_products_page(self, limit: int = 250, page_info: str = None,
+                             filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Fetch one page of products; raises on HTTP errors
+        
+        filters (updated_at_min, fields, ...) only apply to the first page;
+        Shopify encodes them into page_info for the following ones.
+        """
+        url = f"{self.admin_url}/products.json"
+        params = {'limit': limit}
+        if page_info:
+            params['page_info'] = page_info
+        elif filters:
+            params.update(filters)
+            
+        response = self.http.get(url, headers=self.get_admin_headers(), params=params)
+        response.raise_for_status()
+        
+        data = response.json()
+        data['next_page_info'] = parse_next_page_info(response.headers.get('Link'))
+        data['server_time'] = parse_http_date(response.headers.get('Date'))
+        return data
+    
     def get_products(self, limit: int = 250, page_info: str = None) -> Dict[str, Any]:
         """Get products from Shopify Admin API"""
         try:
-            url = f"{self.admin_url}/products.json"
-            params = {'limit': limit}
-            if page_info:
-                params['page_info'] = page_info
-                
-            response = requests.get(url, headers=self.get_admin_headers(), params=params)
-            response.raise_for_status()
-            
-            return response.json()
+            return self._fetch_products_page(limit=limit, page_info=page_info)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get products: {str(e)}")
-            return {'products': []}
+            return {'products': [], 'next_page_info': None}
     
-    def sync_all_products(self) -> Dict[str, Any]:
-        """Sync all products from Shopify to MongoDB"""
+    def _produce_product_pages(self, pages: queue.Queue, errors: List[Exception], stop: threading.Event,
+                               filters: Optional[Dict[str, Any]] = None,
+                               server_times: Optional[List[datetime]] = None) -> None:
+        """Follow page_info cursors and hand each page to the writer
+
+        The first page's Date header is appended to server_times.
+        """
+        def hand_off(item) -> bool:
+            # Don't block forever on a full queue if the writer has given up
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
         try:
-            all_products = []
             page_info = None
-            
-            while True:
-                data = self.get_products(page_info=page_info)
+            while not stop.is_set():
+                data = self._fetch_products_page(page_info=page_info, filters=filters)
+                if page_info is None and server_times is not None and data.get('server_time'):
+                    server_times.append(data['server_time'])
                 products = data.get('products', [])
-                
-                if not products:
+                if products and not hand_off(products):
+                    return
+                page_info = data.get('next_page_info')
+                if not products or not page_info:
                     break
-                    
-                all_products.extend(products)
-                
-                # Check for pagination
-                link_header = data.get('link')
-                if not link_header or 'rel="next"' not in link_header:
-                    break
-                    
-                # Extract next page info (simplified)
-                page_info = None  # Would need proper link header parsing
-                break  # For now, just get first page
+        except Exception as e:
+            errors.append(e)
+        finally:
+            hand_off(None)
+    
+    def _insert_placeholders(self, product_ids: List[Any]) -> int:
+        """Insert stubs for products not stored yet; returns how many were inserted"""
+        try:
+            result = self.products_collection.bulk_write(
+                [placeholder_upsert(product_id, 'sync_pending') for product_id in product_ids],
+                ordered=False
+            )
+            return result.upserted_count
+        except BulkWriteError as e:
+            # Two writers racing to insert the same stub; the document exists either way
+            if any(error.get('code') != DUPLICATE_KEY for error in e.details.get('writeErrors', [])):
+                raise
+            return e.details.get('nUpserted', 0)
+    
+    def bulk_upsert_products(self, products: List[Dict[str, Any]], sync_status: str = 'synced',
+                             batch_size: int = None) -> Dict[str, int]:
+        """Upsert Admin API products with unordered bulk_write batches
+        
+        Follows the webhook ordering rule: a product is only written when
+        its updated_at is no earlier than the stored shopify_updated_at, so
+        a page fetched before a webhook landed can't overwrite newer data
+        or bring back a product a webhook deleted. Those count as skipped.
+        """
+        batch_size = batch_size or SYNC_BATCH_SIZE
+        counts = {'matched': 0, 'upserted': 0, 'modified': 0, 'skipped': 0}
+        
+        for start in range(0, len(products), batch_size):
+            batch = products[start:start + batch_size]
+            now = datetime.utcnow()
+            inserted = self._insert_placeholders([product['id'] for product in batch])
+            operations = []
+            for product in batch:
+                shopify_updated_at = parse_shopify_time(product.get('updated_at'))
+                query = {'shopify_id': product['id']}
+                if shopify_updated_at is not None:
+                    query.update(newer_than_stored(shopify_updated_at, or_equal=True))
+                operations.append(UpdateOne(query, {'$set': {
+                    **product,
+                    'content_hash': content_hash(product),
+                    'shopify_updated_at': shopify_updated_at,
+                    'updated_at': now,
+                    'sync_status': sync_status
+                }}))
+            result = self.products_collection.bulk_write(operations, ordered=False)
+            counts['upserted'] += inserted
+            counts['matched'] += max(result.matched_count - inserted, 0)
+            counts['modified'] += max(result.modified_count - inserted, 0)
+            counts['skipped'] += len(batch) - result.matched_count
+        
+        return counts
+    
+    def get_sync_checkpoint(self) -> Optional[datetime]:
+        """Shopify updated_at high-water mark of the last successful product sync"""
+        checkpoint = self.sync_checkpoints.find_one({'_id': self.store_domain})
+        return checkpoint.get('products_updated_at') if checkpoint else None
+    
+    def save_sync_checkpoint(self, high_water_mark: datetime) -> None:
+        self.sync_checkpoints.update_one(
+            {'_id': self.store_domain},
+            {'$set': {
+                'products_updated_at': high_water_mark,
+                'last_sync_at': datetime.utcnow()
+            }},
+            upsert=True
+        )
+    
+    def sync_all_products(self, full: bool = False) -> Dict[str, Any]:
+        """Sync products from Shopify to MongoDB
+        
+        Incremental by default: only products updated since the stored
+        checkpoint are fetched (updated_at_min). full=True ignores the
+        checkpoint. Deletions are not visible this way; see
+        reconcile_deleted_products.
+        
+        Pages are fetched on a producer thread and written here as they
+        arrive; the bounded queue keeps at most SYNC_QUEUE_PAGES pages in
+        memory, so fetch and write round-trips overlap.
+        """
+        try:
+            checkpoint = None if full else self.get_sync_checkpoint()
+            # Checkpoints are stored as naive UTC; send an explicit offset
+            filters = {'updated_at_min': checkpoint.replace(tzinfo=timezone.utc).isoformat()} if checkpoint else None
             
-            # Store all products in MongoDB
-            for product in all_products:
-                self.products_collection.update_one(
-                    {'shopify_id': product['id']},
-                    {'$set': {
-                        **product,
-                        'updated_at': datetime.utcnow(),
-                        'sync_status': 'synced'
-                    }},
-                    upsert=True
-                )
+            pages: queue.Queue = queue.Queue(maxsize=SYNC_QUEUE_PAGES)
+            errors: List[Exception] = []
+            server_times: List[datetime] = []
+            local_start = datetime.utcnow()
+            stop = threading.Event()
+            producer = threading.Thread(
+                target=self._produce_product_pages,
+                args=(pages, errors, stop, filters, server_times),
+                name='shopify-sync-producer',
+                daemon=True
+            )
+            producer.start()
+            
+            synced = 0
+            pages_written = 0
+            totals = {'matched': 0, 'upserted': 0, 'modified': 0, 'skipped': 0}
+            high_water_mark = checkpoint
+            try:
+                while True:
+                    products = pages.get()
+                    if products is None:
+                        break
+                    counts = self.bulk_upsert_products(products)
+                    for key, value in counts.items():
+                        totals[key] += value
+                    synced += len(products)
+                    pages_written += 1
+                    for product in products:
+                        updated_at = parse_shopify_time(product.get('updated_at'))
+                        if updated_at and (high_water_mark is None or updated_at > high_water_mark):
+                            high_water_mark = updated_at
+            finally:
+                stop.set()
+                producer.join()
+                product_cache.clear()
+                catalog_version.bump()
+            
+            if errors:
+                raise errors[0]
+            
+            # Only advance the checkpoint once every page has been stored,
+            # and never past what this sync is sure to have seen
+            started_at = server_times[0] if server_times else local_start
+            high_water_mark = cap_sync_checkpoint(high_water_mark, started_at)
+            if high_water_mark and (checkpoint is None or high_water_mark > checkpoint):
+                self.save_sync_checkpoint(high_water_mark)
+            else:
+                high_water_mark = checkpoint
             
-            logger.info(f"Synced {len(all_products)} products")
+            logger.info(f"Synced {synced} products across {pages_written} pages")
             return {
                 'status': 'success',
-                'products_synced': len(all_products),
+                'mode': 'incremental' if checkpoint else 'full',
+                'updated_at_min': checkpoint.isoformat() if checkpoint else None,
+                'checkpoint': high_water_mark.isoformat() if high_water_mark else None,
+                'products_synced': synced,
+                'pages': pages_written,
+                **totals,
                 'timestamp': datetime.utcnow().isoformat()
             }
             
@@ -199,80 +479,174 @@ class ShopifyService:
                 'timestamp': datetime.utcnow().isoformat()
             }
     
-    def get_storefront_products(self, query: str = None) -> Dict[str, Any]:
-        """Get products using Storefront API for frontend display"""
-        graphql_query = """
-        query getProducts($first: Int!, $query: String) {
-            products(first: $first, query: $query) {
-                edges {
-                    node {
-                        id
-                        title
-                        handle
-                        description
-                        productType
-                        vendor
-                        tags
-                        availableForSale
-                        createdAt
-                        updatedAt
-                        images(first: 10) {
-                            edges {
-                                node {
-                                    id
-                                    url
-                                    altText
-                                    width
-                                    height
-                                }
-                            }
-                        }
-                        variants(first: 100) {
-                            edges {
-                                node {
-                                    id
-                                    title
-                                    price {
-                                        amount
-                                        currencyCode
-                                    }
-                                    compareAtPrice {
-                                        amount
-                                        currencyCode
-                                    }
-                                    availableForSale
-                                    selectedOptions {
-                                        name
-                                        value
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-                pageInfo {
-                    hasNextPage
-                    hasPreviousPage
-                    startCursor
-                    endCursor
-                }
-            }
-        }
+    def admin_graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run an Admin GraphQL query; raises on HTTP or GraphQL errors"""
+        response = self.http.post(
+            f"{self.admin_url}/graphql.json",
+            headers=self.get_admin_headers(),
+            json={'query': query, 'variables': variables or {}}
+        )
+        response.raise_for_status()
+        
+        payload = response.json()
+        if payload.get('errors'):
+            raise RuntimeError(f"GraphQL errors: {payload['errors']}")
+        return payload.get('data', {})
+    
+    def start_bulk_product_export(self) -> Dict[str, Any]:
+        """Start a bulkOperationRunQuery over all products"""
+        data = self.admin_graphql(RUN_BULK_QUERY_MUTATION, {'query': BULK_PRODUCTS_QUERY})
+        result = data.get('bulkOperationRunQuery') or {}
+        if result.get('userErrors'):
+            raise RuntimeError(f"Bulk operation rejected: {result['userErrors']}")
+        return result.get('bulkOperation') or {}
+    
+    def wait_for_bulk_operation(self, poll_interval: float = None, timeout: float = None) -> Dict[str, Any]:
+        """Poll currentBulkOperation until it finishes"""
+        poll_interval = poll_interval if poll_interval is not None else BULK_POLL_INTERVAL
+        timeout = timeout if timeout is not None else BULK_TIMEOUT
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            operation = self.admin_graphql(CURRENT_BULK_OPERATION_QUERY).get('currentBulkOperation') or {}
+            status = operation.get('status')
+            if status == 'COMPLETED':
+                return operation
+            if status in ('FAILED', 'CANCELED', 'EXPIRED'):
+                raise RuntimeError(f"Bulk operation {status.lower()}: {operation.get('errorCode')}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Bulk operation still {status} after {timeout}s")
+            time.sleep(poll_interval)
+    
+    def bulk_sync_products(self, batch_size: int = None) -> Dict[str, Any]:
+        """Full resync through a GraphQL bulk operation
+        
+        The result JSONL is streamed line by line, variants and images are
+        folded back into their products, and products are upserted in
+        batches, so memory stays bounded by one batch.
         """
+        batch_size = batch_size or SYNC_BATCH_SIZE
+        try:
+            local_start = datetime.utcnow()
+            operation = self.start_bulk_product_export()
+            # The export snapshots products from createdAt on Shopify's clock
+            started_at = parse_shopify_time(operation.get('createdAt')) or local_start
+            logger.info(f"Started bulk operation {operation.get('id')}")
+            operation = self.wait_for_bulk_operation()
+            
+            synced = 0
+            totals = {'matched': 0, 'upserted': 0, 'modified': 0, 'skipped': 0}
+            high_water_mark = None
+            
+            # No url means the query matched nothing
+            if operation.get('url'):
+                with self.http.get(operation['url'], stream=True) as response:
+                    response.raise_for_status()
+                    products = iter_bulk_products(response.iter_lines())
+                    for batch in batched(products, batch_size):
+                        counts = self.bulk_upsert_products(batch, batch_size=batch_size)
+                        for key, value in counts.items():
+                            totals[key] += value
+                        synced += len(batch)
+                        for product in batch:
+                            updated_at = parse_shopify_time(product.get('updated_at'))
+                            if updated_at and (high_water_mark is None or updated_at > high_water_mark):
+                                high_water_mark = updated_at
+            
+            product_cache.clear()
+            catalog_version.bump()
+            high_water_mark = cap_sync_checkpoint(high_water_mark, started_at)
+            if high_water_mark:
+                self.save_sync_checkpoint(high_water_mark)
+            
+            logger.info(f"Bulk synced {synced} products")
+            return {
+                'status': 'success',
+                'mode': 'bulk',
+                'bulk_operation_id': operation.get('id'),
+                'object_count': operation.get('objectCount'),
+                'products_synced': synced,
+                **totals,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Bulk product sync failed: {str(e)}")
+            return {
+                'status': 'error',
+                'message': str(e),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+    
+    def reconcile_deleted_products(self) -> Dict[str, Any]:
+        """Mark products that no longer exist in Shopify as deleted
         
+        Walks every product id (fields=id keeps pages small) and soft-deletes
+        Mongo products whose id was not seen.
+        """
         try:
-            variables = {
-                'first': 100,
-                'query': query
+            # Read before the walk: products a webhook creates while it runs
+            # are missing from live_ids but must not be marked deleted
+            stored_ids = self.products_collection.distinct(
+                'shopify_id', {'sync_status': {'$nin': ['deleted', 'webhook_deleted']}}
+            )
+            live_ids = set()
+            page_info = None
+            while True:
+                data = self._fetch_products_page(page_info=page_info, filters={'fields': 'id'})
+                live_ids.update(product['id'] for product in data.get('products', []))
+                page_info = data.get('next_page_info')
+                if not page_info:
+                    break
+            
+            missing = [shopify_id for shopify_id in stored_ids if shopify_id not in live_ids]
+            
+            marked = 0
+            if missing:
+                result = self.products_collection.update_many(
+                    {'shopify_id': {'$in': missing}},
+                    {'$set': {
+                        'deleted_at': datetime.utcnow(),
+                        'sync_status': 'deleted'
+                    }}
+                )
+                marked = result.modified_count
+                product_cache.clear()
+                catalog_version.bump()
+            
+            logger.info(f"Reconciled deletions: {marked} products marked deleted")
+            return {
+                'status': 'success',
+                'shopify_products': len(live_ids),
+                'marked_deleted': marked,
+                'timestamp': datetime.utcnow().isoformat()
             }
             
-            response = requests.post(
+        except Exception as e:
+            logger.error(f"Failed to reconcile deleted products: {str(e)}")
+            return {
+                'status': 'error',
+                'message': str(e),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+    
+    def get_storefront_products(self, query: str = None, first: int = None, after: str = None,
+                                profile: str = None) -> Dict[str, Any]:
+        """Get one page of products using Storefront API for frontend display
+        
+        Follow data.products.pageInfo.endCursor with after= for the next page;
+        profile picks the field set (see storefront_queries).
+        """
+        try:
+            response = self.http.post(
                 self.storefront_url,
                 headers=self.get_storefront_headers(),
                 json={
-                    'query': graphql_query,
-                    'variables': variables
-                }
+                    'query': products_query(profile),
+                    'variables': products_variables(first, after, query)
+                },
+                # Read-only query, so safe to retry like a GET
+                retries=RETRY_MAX_ATTEMPTS
             )
             response.raise_for_status()
             
@@ -280,33 +654,242 @@ class ShopifyService:
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get storefront products: {str(e)}")
-            return {'data': {'products': {'edges': []}}}
+            return EMPTY_STOREFRONT_PRODUCTS
     
-    def verify_webhook(self, data: bytes, signature: str) -> bool:
-        """Verify Shopify webhook signature"""
-        import hmac
-        import hashlib
-        import base64
+    def health_check(self) -> Dict[str, Any]:
+        """Check Shopify API connectivity"""
+        try:
+            url = f"{self.admin_url}/shop.json"
+            response = self.http.get(url, headers=self.get_admin_headers())
+            response.raise_for_status()
+            
+            shop_data = response.json().get('shop', {})
+            
+            return {
+                'status': 'healthy',
+                'shop_name': shop_data.get('name'),
+                'shop_domain': shop_data.get('domain'),
+                'circuit_breakers': circuit_breakers.stats(),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            
+        except Exception as e:
+            return {
+                'status': 'unhealthy',
+                'error': str(e),
+                'circuit_breakers': circuit_breakers.stats(),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+
+class AsyncShopifyService(ShopifyClientBase):
+    """Async counterpart of ShopifyService for the FastAPI request path
+    
+    Same request/response methods, but on the shared httpx pool and the
+    Motor repository, so a slow Shopify round-trip only suspends the
+    request waiting on it. Long-running syncs stay on ShopifyService and
+    run in a worker thread.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.products = product_repository
         
-        webhook_secret = os.getenv('SHOPIFY_WEBHOOK_SECRET')
-        if not webhook_secret:
+    @property
+    def http(self):
+        # Resolved per call: the pool is created lazily inside the running event loop
+        return get_async_session()
+    
+    async def create_product(self, product_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create a new product in Shopify"""
+        try:
+            url = f"{self.admin_url}/products.json"
+            response = await self.http.post(
+                url,
+                headers=self.get_admin_headers(),
+                json={'product': product_data}
+            )
+            response.raise_for_status()
+            
+            product = response.json().get('product')
+            if product:
+                if self.products is not None:
+                    await self.products.save_from_shopify(product, upsert=True)
+                product_cache.invalidate_product(product['id'])
+                catalog_version.bump()
+                storefront_cache.expire_all()
+                logger.info(f"Created product: {product['title']} (ID: {product['id']})")
+            
+            return product
+            
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to create product: {str(e)}")
+            return None
+    
+    async def stored_product(self, product_id: Any) -> Optional[Dict[str, Any]]:
+        """Listed product as stored in MongoDB, for change detection"""
+        if self.products is None:
+            return None
+        return await self.products.get_by_shopify_id(int(product_id), {'_id': 0})
+    
+    async def update_product(self, product_id: str, product_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update an existing product in Shopify, sending only the fields that differ from MongoDB"""
+        try:
+            stored = await self.stored_product(product_id)
+            changes = changed_fields(stored, product_data)
+            write_stats.record_outbound(len(product_data), len(changes))
+            if not changes:
+                logger.info(f"Skipped no-op update of product {product_id}")
+                return stored
+            
+            url = f"{self.admin_url}/products/{product_id}.json"
+            response = await self.http.put(
+                url,
+                headers=self.get_admin_headers(),
+                json={'product': {'id': int(product_id), **changes}}
+            )
+            response.raise_for_status()
+            
+            product = response.json().get('product')
+            if product:
+                if self.products is not None:
+                    await self.products.save_from_shopify(product, upsert=False)
+                product_cache.invalidate_product(product['id'])
+                catalog_version.bump()
+                storefront_cache.expire_all()
+                logger.info(f"Updated product: {product['title']} (ID: {product['id']})")
+            
+            return product
+            
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to update product {product_id}: {str(e)}")
+            return None
+    
+    async def delete_product(self, product_id: str) -> bool:
+        """Delete a product from Shopify"""
+        try:
+            url = f"{self.admin_url}/products/{product_id}.json"
+            response = await self.http.delete(url, headers=self.get_admin_headers())
+            response.raise_for_status()
+            
+            if self.products is not None:
+                await self.products.mark_deleted(int(product_id))
+            product_cache.invalidate_product(product_id)
+            catalog_version.bump()
+            storefront_cache.expire_all()
+            
+            logger.info(f"Deleted product ID: {product_id}")
+            return True
+            
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to delete product {product_id}: {str(e)}")
             return False
+    
+    async def mutate_products(self, mutations: List[ProductMutation]) -> AsyncIterator[MutationResult]:
+        """Run many product writes concurrently, yielding each result as it finishes
+        
+        Updates go through change detection like update_product: only
+        changed fields are sent, and unchanged products come back with
+        skipped=True. Successful writes are recorded in MongoDB and
+        invalidate caches exactly like the single-product methods.
+        """
+        executor = AsyncMutationExecutor(
+            self.http, self.admin_url, self.get_admin_headers(), lookup=self.stored_product
+        )
+        async for result in executor.run(mutations):
+            if result.ok and not result.skipped:
+                try:
+                    await self._record_mutation(result)
+                except Exception as e:
+                    logger.error(f"Failed to record {result.method} {result.path} in MongoDB: {str(e)}")
+            yield result
+    
+    async def _record_mutation(self, result: MutationResult) -> None:
+        if self.products is not None:
+            if result.method == 'DELETE':
+                await self.products.mark_deleted(int(result.product_id))
+            elif result.product:
+                await self.products.save_from_shopify(result.product, upsert=result.method == 'POST')
+        product_cache.invalidate_product(result.product_id)
+        catalog_version.bump()
+        storefront_cache.expire_all()
+    
+    async def get_products(self, limit: int = 250, page_info: str = None) -> Dict[str, Any]:
+        """Get products from Shopify Admin API"""
+        try:
+            params = {'limit': limit}
+            if page_info:
+                params['page_info'] = page_info
+            response = await self.http.get(f"{self.admin_url}/products.json", headers=self.get_admin_headers(), params=params)
+            response.raise_for_status()
             
-        computed_signature = base64.b64encode(
-            hmac.new(
-                webhook_secret.encode('utf-8'),
-                data,
-                hashlib.sha256
-            ).digest()
-        ).decode('utf-8')
+            data = response.json()
+            data['next_page_info'] = parse_next_page_info(response.headers.get('Link'))
+            return data
+            
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to get products: {str(e)}")
+            return {'products': [], 'next_page_info': None}
+    
+    async def admin_graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run an Admin GraphQL query; raises on HTTP or GraphQL errors"""
+        response = await self.http.post(
+            f"{self.admin_url}/graphql.json",
+            headers=self.get_admin_headers(),
+            json={'query': query, 'variables': variables or {}}
+        )
+        response.raise_for_status()
         
-        return hmac.compare_digest(computed_signature, signature)
+        payload = response.json()
+        if payload.get('errors'):
+            raise RuntimeError(f"GraphQL errors: {payload['errors']}")
+        return payload.get('data', {})
     
-    def health_check(self) -> Dict[str, Any]:
+    async def _fetch_storefront_products(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """One Storefront API round-trip; raises on HTTP or GraphQL errors so they aren't cached"""
+        response = await self.http.post(
+            self.storefront_url,
+            headers=self.get_storefront_headers(),
+            json={
+                'query': query,
+                'variables': variables
+            },
+            # Read-only query, so safe to retry like a GET
+            retries=RETRY_MAX_ATTEMPTS
+        )
+        response.raise_for_status()
+        
+        payload = response.json()
+        if payload.get('errors'):
+            raise RuntimeError(f"GraphQL errors: {payload['errors']}")
+        return payload
+    
+    async def get_storefront_products_cached(self, query: str = None, first: int = None, after: str = None,
+                                             profile: str = None) -> CachedResult:
+        """One page of Storefront products through the stale-while-revalidate cache
+        
+        Raises ValueError for an unknown profile, and the fetch error if
+        nothing is cached to fall back on.
+        """
+        graphql_query = products_query(profile)
+        variables = products_variables(first, after, query)
+        key = ('products', profile or DEFAULT_PROFILE, variables['query'], variables['first'], variables['after'])
+        return await storefront_cache.get(key, lambda: self._fetch_storefront_products(graphql_query, variables))
+    
+    async def get_storefront_products(self, query: str = None, first: int = None, after: str = None,
+                                      profile: str = None) -> Dict[str, Any]:
+        """Get one page of products using Storefront API for frontend display"""
+        try:
+            return (await self.get_storefront_products_cached(query, first, after, profile)).value
+            
+        except (httpx.HTTPError, RuntimeError) as e:
+            logger.error(f"Failed to get storefront products: {str(e)}")
+            return EMPTY_STOREFRONT_PRODUCTS
+    
+    async def health_check(self) -> Dict[str, Any]:
         """Check Shopify API connectivity"""
         try:
             url = f"{self.admin_url}/shop.json"
-            response = requests.get(url, headers=self.get_admin_headers())
+            response = await self.http.get(url, headers=self.get_admin_headers())
             response.raise_for_status()
             
             shop_data = response.json().get('shop', {})
@@ -315,6 +898,7 @@ class ShopifyService:
                 'status': 'healthy',
                 'shop_name': shop_data.get('name'),
                 'shop_domain': shop_data.get('domain'),
+                'circuit_breakers': circuit_breakers.stats(),
                 'timestamp': datetime.utcnow().isoformat()
             }
             
@@ -322,8 +906,10 @@ class ShopifyService:
             return {
                 'status': 'unhealthy',
                 'error': str(e),
+                'circuit_breakers': circuit_breakers.stats(),
                 'timestamp': datetime.utcnow().isoformat()
             }
 
-# Global instance
-shopify_service = ShopifyService()
\ No newline at end of file
+# Global instances
+shopify_service = ShopifyService()
+async_shopify_service = AsyncShopifyService()
\ No newline at end of file
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Stale-while-revalidate cache for Storefront API responses
+Entries are served fresh for STOREFRONT_CACHE_FRESH_TTL seconds, then
+served stale while a single background refresh runs, up to
+STOREFRONT_CACHE_STALE_TTL seconds old. Concurrent misses for the same key
+share one upstream call.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+STOREFRONT_CACHE_FRESH_TTL = float(os.getenv('STOREFRONT_CACHE_FRESH_TTL_SECONDS', '60'))
+STOREFRONT_CACHE_STALE_TTL = float(os.getenv('STOREFRONT_CACHE_STALE_TTL_SECONDS', '600'))
+STOREFRONT_CACHE_MAX_ENTRIES = int(os.getenv('STOREFRONT_CACHE_MAX_ENTRIES', '256'))
+
+
+@dataclass
+class CachedResult:
+    """A cached value plus how it was served ('fresh', 'stale' or 'miss')"""
+    value: Any
+    state: str
+    age: float
+    # Changes on every refresh of the entry, so it can key ETags and snapshots
+    version: int
+
+
+class _Entry:
+    __slots__ = ('value', 'fetched_at', 'version', 'expired')
+
+    def __init__(self, value: Any, version: int):
+        self.value = value
+        self.fetched_at = time.monotonic()
+        self.version = version
+        self.expired = False
+
+
+class StaleWhileRevalidateCache:
+    """Bounded LRU of upstream responses with single-flight refresh
+
+    Only used from the event loop, so no locking; in-flight refreshes are
+    tracked as tasks per key.
+    """
+
+    def __init__(self, fresh_ttl: float = STOREFRONT_CACHE_FRESH_TTL,
+                 stale_ttl: float = STOREFRONT_CACHE_STALE_TTL,
+                 max_entries: int = STOREFRONT_CACHE_MAX_ENTRIES):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = max(stale_ttl, fresh_ttl)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._versions = 0
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.stale_if_error = 0
+        self.evictions = 0
+        self.max_stale_age_served = 0.0
+        self._stale_age_total = 0.0
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> _Entry:
+        self.refreshes += 1
+        try:
+            value = await loader()
+        except Exception:
+            self.refresh_errors += 1
+            raise
+        self._versions += 1
+        entry = _Entry(value, self._versions)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start a refresh for key, or join the one already running"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.ensure_future(self._load(key, loader))
+        self._inflight[key] = task
+
+        def done(finished: asyncio.Task) -> None:
+            self._inflight.pop(key, None)
+            # Background refresh failures are counted in _load; don't let them go unretrieved
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.warning(f"Storefront cache refresh failed for {key!r}: {finished.exception()}")
+
+        task.add_done_callback(done)
+        return task
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> CachedResult:
+        """Serve key from cache, refreshing in the background or inline as needed
+
+        Raises whatever loader raises when there is nothing cached to fall back on.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = now - entry.fetched_at
+            if not entry.expired and age < self.fresh_ttl:
+                self.fresh_hits += 1
+                return CachedResult(entry.value, 'fresh', age, entry.version)
+            if age < self.stale_ttl:
+                self._refresh(key, loader)
+                self._record_stale(age)
+                return CachedResult(entry.value, 'stale', age, entry.version)
+
+        # Nothing usable: wait for the (shared) upstream call
+        self.misses += 1
+        try:
+            # Shielded so one cancelled request doesn't cancel the load other waiters share
+            fresh = await asyncio.shield(self._refresh(key, loader))
+        except Exception:
+            if entry is None:
+                raise
+            # Too old to serve normally, but better than an error page
+            self.stale_if_error += 1
+            age = time.monotonic() - entry.fetched_at
+            self._record_stale(age)
+            return CachedResult(entry.value, 'stale', age, entry.version)
+        return CachedResult(fresh.value, 'miss', 0.0, fresh.version)
+
+    def _record_stale(self, age: float) -> None:
+        self.stale_hits += 1
+        self._stale_age_total += age
+        self.max_stale_age_served = max(self.max_stale_age_served, age)
+
+    def expire_all(self) -> None:
+        """Mark every entry stale (kept for stale serving) after a catalog change"""
+        for entry in self._entries.values():
+            entry.expired = True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        ages = [now - entry.fetched_at for entry in self._entries.values()]
+        lookups = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'fresh_ttl_seconds': self.fresh_ttl,
+            'stale_ttl_seconds': self.stale_ttl,
+            'fresh_hits': self.fresh_hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.fresh_hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            'coalesced_waits': self.coalesced,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'refreshes_in_flight': len(self._inflight),
+            'stale_if_error': self.stale_if_error,
+            'evictions': self.evictions,
+            'avg_stale_age_served_seconds': round(self._stale_age_total / self.stale_hits, 3) if self.stale_hits else 0.0,
+            'max_stale_age_served_seconds': round(self.max_stale_age_served, 3),
+            'oldest_entry_age_seconds': round(max(ages), 3) if ages else 0.0,
+        }
+
+
+# Global instance
+storefront_cache = StaleWhileRevalidateCache()
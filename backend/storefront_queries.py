@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Storefront API product queries
+Cursor-paginated products query in three cost profiles, so each view only
+asks for the connections it renders:
+
+    listing  - grid cards: featured image and price range, no connections
+    detail   - product page: description, 10 images, 50 variants
+    full     - everything the endpoint used to return (10 images, 100 variants)
+"""
+
+from typing import Any, Dict, Optional
+
+# Storefront connections accept at most 250 nodes per page
+MAX_PAGE_SIZE = 250
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_PROFILE = 'full'
+
+_MONEY = """{
+    amount
+    currencyCode
+}"""
+
+_IMAGE = """{
+    id
+    url
+    altText
+    width
+    height
+}"""
+
+_VARIANT = f"""{{
+    id
+    title
+    price {_MONEY}
+    compareAtPrice {_MONEY}
+    availableForSale
+    selectedOptions {{
+        name
+        value
+    }}
+}}"""
+
+_LISTING_FIELDS = f"""
+id
+title
+handle
+productType
+vendor
+availableForSale
+featuredImage {_IMAGE}
+priceRange {{
+    minVariantPrice {_MONEY}
+    maxVariantPrice {_MONEY}
+}}
+compareAtPriceRange {{
+    minVariantPrice {_MONEY}
+}}
+"""
+
+_DETAIL_FIELDS = f"""
+id
+title
+handle
+description
+productType
+vendor
+tags
+availableForSale
+images(first: 10) {{
+    edges {{
+        node {_IMAGE}
+    }}
+}}
+variants(first: 50) {{
+    edges {{
+        node {_VARIANT}
+    }}
+}}
+"""
+
+_FULL_FIELDS = f"""
+id
+title
+handle
+description
+productType
+vendor
+tags
+availableForSale
+createdAt
+updatedAt
+images(first: 10) {{
+    edges {{
+        node {_IMAGE}
+    }}
+}}
+variants(first: 100) {{
+    edges {{
+        node {_VARIANT}
+    }}
+}}
+"""
+
+PRODUCT_PROFILES = {
+    'listing': _LISTING_FIELDS,
+    'detail': _DETAIL_FIELDS,
+    'full': _FULL_FIELDS,
+}
+
+_QUERY_TEMPLATE = """
+query getProducts($first: Int!, $after: String, $query: String) {
+    products(first: $first, after: $after, query: $query) {
+        edges {
+            cursor
+            node {
+%s
+            }
+        }
+        pageInfo {
+            hasNextPage
+            hasPreviousPage
+            startCursor
+            endCursor
+        }
+    }
+}
+"""
+
+_QUERIES = {
+    name: _QUERY_TEMPLATE % fields.strip()
+    for name, fields in PRODUCT_PROFILES.items()
+}
+
+
+def products_query(profile: Optional[str] = None) -> str:
+    """Query text for a profile name; raises ValueError for unknown profiles"""
+    profile = profile or DEFAULT_PROFILE
+    if profile not in _QUERIES:
+        raise ValueError(f"Unknown profile '{profile}' (expected one of: {', '.join(PRODUCT_PROFILES)})")
+    return _QUERIES[profile]
+
+
+def products_variables(first: Optional[int] = None, after: Optional[str] = None,
+                       query: Optional[str] = None) -> Dict[str, Any]:
+    """Page variables, clamping first to what the Storefront API accepts"""
+    first = DEFAULT_PAGE_SIZE if first is None else max(1, min(int(first), MAX_PAGE_SIZE))
+    return {'first': first, 'after': after or None, 'query': query}
+
+
+def page_info(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """pageInfo of a products response ({} if missing)"""
+    return ((((payload or {}).get('data') or {}).get('products') or {}).get('pageInfo')) or {}
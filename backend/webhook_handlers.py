@@ -10,10 +10,15 @@ import hashlib
 import hmac
 import base64
 import os
-from typing import Optional
-from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 import logging
 from shopify_service import shopify_service
+from repository import product_repository, parse_shopify_time
+from product_cache import product_cache
+from catalog_version import catalog_version
+from storefront_cache import storefront_cache
+from content_hash import write_stats
+from webhook_queue import webhook_queue, recent_webhook_ids, WebhookWorker, InvalidWebhookPayload
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,121 +32,151 @@ def verify_webhook(data: bytes, signature: str) -> bool:
     """Verify Shopify webhook signature using service"""
     return shopify_service.verify_webhook(data, signature)
 
+async def queue_product_webhook(topic: str, request: Request, signature: Optional[str],
+                                webhook_id: Optional[str], shop_domain: Optional[str],
+                                triggered_at: Optional[str]) -> Dict[str, Any]:
+    """Verify a product webhook and persist it for the worker; nothing is parsed or applied here"""
+    body = await request.body()
+
+    # Verify webhook (skip in development)
+    if WEBHOOK_SECRET != 'your_webhook_secret_here':
+        if not verify_webhook(body, signature):
+            logger.warning("Invalid webhook signature")
+            raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    # Anything but a 2xx makes Shopify redeliver, so only acknowledge what was stored
+    if webhook_queue is None:
+        raise HTTPException(status_code=503, detail="Webhook queue unavailable")
+    if webhook_id and not recent_webhook_ids.add(webhook_id):
+        return {"status": "duplicate", "topic": topic}
+    try:
+        event_id = await webhook_queue.enqueue(topic, body, {
+            'webhook_id': webhook_id,
+            'shop_domain': shop_domain,
+            'triggered_at': triggered_at,
+        })
+    except Exception as e:
+        if webhook_id:
+            recent_webhook_ids.discard(webhook_id)
+        logger.error(f"Failed to queue {topic} webhook: {str(e)}")
+        raise HTTPException(status_code=503, detail="Webhook queue unavailable")
+
+    if event_id is None:
+        return {"status": "duplicate", "topic": topic}
+    return {"status": "queued", "topic": topic}
+
 @router.post("/webhooks/products/create")
 async def handle_product_create(
     request: Request,
-    x_shopify_hmac_sha256: Optional[str] = Header(None)
+    x_shopify_hmac_sha256: Optional[str] = Header(None),
+    x_shopify_webhook_id: Optional[str] = Header(None),
+    x_shopify_shop_domain: Optional[str] = Header(None),
+    x_shopify_triggered_at: Optional[str] = Header(None)
 ):
-    """Handle product creation webhook"""
-    try:
-        body = await request.body()
-        
-        # Verify webhook (skip in development)
-        if WEBHOOK_SECRET != 'your_webhook_secret_here':
-            if not verify_webhook(body, x_shopify_hmac_sha256):
-                logger.warning("Invalid webhook signature")
-                raise HTTPException(status_code=401, detail="Invalid webhook signature")
-        
-        product_data = json.loads(body)
-        
-        # Store product in MongoDB via service
-        shopify_service.products_collection.update_one(
-            {'shopify_id': product_data['id']},
-            {'$set': {
-                **product_data,
-                'webhook_received_at': datetime.utcnow(),
-                'sync_status': 'webhook_created'
-            }},
-            upsert=True
-        )
-        
-        # Process new product
-        product_id = product_data.get('id')
-        title = product_data.get('title')
-        
-        logger.info(f"Product created via webhook: {title} (ID: {product_id})")
-        
-        return {"status": "success", "message": f"Product {title} processed"}
-        
-    except Exception as e:
-        logger.error(f"Product creation webhook failed: {str(e)}")
-        return {"status": "error", "message": str(e)}
+    """Handle product creation webhook (applied by the webhook worker)"""
+    return await queue_product_webhook(
+        'products/create', request, x_shopify_hmac_sha256,
+        x_shopify_webhook_id, x_shopify_shop_domain, x_shopify_triggered_at
+    )
 
 @router.post("/webhooks/products/update")
 async def handle_product_update(
     request: Request,
-    x_shopify_hmac_sha256: Optional[str] = Header(None)
+    x_shopify_hmac_sha256: Optional[str] = Header(None),
+    x_shopify_webhook_id: Optional[str] = Header(None),
+    x_shopify_shop_domain: Optional[str] = Header(None),
+    x_shopify_triggered_at: Optional[str] = Header(None)
 ):
-    """Handle product update webhook"""
-    try:
-        body = await request.body()
-        
-        # Verify webhook (skip in development)
-        if WEBHOOK_SECRET != 'your_webhook_secret_here':
-            if not verify_webhook(body, x_shopify_hmac_sha256):
-                logger.warning("Invalid webhook signature")
-                raise HTTPException(status_code=401, detail="Invalid webhook signature")
-        
-        product_data = json.loads(body)
-        
-        # Update product in MongoDB via service
-        shopify_service.products_collection.update_one(
-            {'shopify_id': product_data['id']},
-            {'$set': {
-                **product_data,
-                'webhook_received_at': datetime.utcnow(),
-                'sync_status': 'webhook_updated'
-            }}
-        )
-        
-        product_id = product_data.get('id')
-        title = product_data.get('title')
-        
-        logger.info(f"Product updated via webhook: {title} (ID: {product_id})")
-        
-        return {"status": "success", "message": f"Product {title} updated"}
-        
-    except Exception as e:
-        logger.error(f"Product update webhook failed: {str(e)}")
-        return {"status": "error", "message": str(e)}
+    """Handle product update webhook (applied by the webhook worker)"""
+    return await queue_product_webhook(
+        'products/update', request, x_shopify_hmac_sha256,
+        x_shopify_webhook_id, x_shopify_shop_domain, x_shopify_triggered_at
+    )
 
 @router.post("/webhooks/products/delete")
 async def handle_product_delete(
     request: Request,
-    x_shopify_hmac_sha256: Optional[str] = Header(None)
+    x_shopify_hmac_sha256: Optional[str] = Header(None),
+    x_shopify_webhook_id: Optional[str] = Header(None),
+    x_shopify_shop_domain: Optional[str] = Header(None),
+    x_shopify_triggered_at: Optional[str] = Header(None)
 ):
-    """Handle product deletion webhook"""
-    try:
-        body = await request.body()
-        
-        # Verify webhook (skip in development)
-        if WEBHOOK_SECRET != 'your_webhook_secret_here':
-            if not verify_webhook(body, x_shopify_hmac_sha256):
-                logger.warning("Invalid webhook signature")
-                raise HTTPException(status_code=401, detail="Invalid webhook signature")
-        
-        product_data = json.loads(body)
-        
-        # Mark product as deleted in MongoDB
-        shopify_service.products_collection.update_one(
-            {'shopify_id': product_data['id']},
-            {'$set': {
-                'deleted_at': datetime.utcnow(),
-                'webhook_received_at': datetime.utcnow(),
-                'sync_status': 'webhook_deleted'
-            }}
-        )
-        
-        product_id = product_data.get('id')
-        title = product_data.get('title')
-        
-        logger.info(f"Product deleted via webhook: {title} (ID: {product_id})")
-        
-        return {"status": "success", "message": f"Product {title} deleted"}
-        
-    except Exception as e:
-        logger.error(f"Product deletion webhook failed: {str(e)}")
-        return {"status": "error", "message": str(e)}
+    """Handle product deletion webhook (applied by the webhook worker)"""
+    return await queue_product_webhook(
+        'products/delete', request, x_shopify_hmac_sha256,
+        x_shopify_webhook_id, x_shopify_shop_domain, x_shopify_triggered_at
+    )
+
+def _event_time(topic: str, product_data: Dict[str, Any], event: Dict[str, Any]):
+    """When the change happened in Shopify: updated_at, or the trigger time for deletes"""
+    if topic == 'products/delete':
+        return parse_shopify_time(event.get('triggered_at'))
+    return parse_shopify_time(product_data.get('updated_at'))
+
+async def apply_product_webhooks(events: List[Dict[str, Any]]) -> Dict[Any, Any]:
+    """Apply a batch of queued product webhooks with one bulk write
+
+    Only the newest event per product is written (by Shopify's timestamp,
+    falling back to arrival order), since it carries the full product
+    state; the repository then skips it if the stored product is newer.
+    Returns the ids of events that failed, with their error; unparseable
+    payloads are InvalidWebhookPayload so the worker doesn't retry them.
+    """
+    errors: Dict[Any, Any] = {}
+    latest: Dict[Any, Tuple[str, Dict[str, Any], Any]] = {}
+    created = set()
+    event_ids: Dict[Any, List[Any]] = {}
+    for event in events:
+        try:
+            product_data = json.loads(event['body'])
+            product_id = product_data['id']
+        except (ValueError, KeyError, TypeError) as e:
+            errors[event['_id']] = InvalidWebhookPayload(f"Invalid payload: {str(e)}")
+            continue
+        topic = event['topic']
+        event_ids.setdefault(product_id, []).append(event['_id'])
+        if topic == 'products/create':
+            created.add(product_id)
+        when = _event_time(topic, product_data, event)
+        previous = latest.get(product_id)
+        # Delivered out of order: the newer event already in this batch wins
+        if previous and when and previous[2] and when < previous[2]:
+            continue
+        latest[product_id] = (topic, product_data, when)
+
+    if not latest:
+        return errors
+
+    product_ids = list(latest)
+    changes = []
+    for product_id in product_ids:
+        topic, product_data, when = latest[product_id]
+        # A create plus updates in the same batch still has to insert the product
+        if topic == 'products/update' and product_id in created:
+            topic = 'products/create'
+        changes.append((topic, product_data, when if topic == 'products/delete' else None))
+
+    result = await product_repository.apply_webhook_changes(changes)
+    for index, message in result['failed'].items():
+        for event_id in event_ids[product_ids[index]]:
+            errors[event_id] = message
+
+    superseded = sum(len(ids) for ids in event_ids.values()) - len(product_ids)
+    write_stats.record_inbound_batch(result['written'], result['unchanged'] + superseded)
+    if result['written']:
+        for product_id in product_ids:
+            product_cache.invalidate_product(product_id)
+        catalog_version.bump()
+        storefront_cache.expire_all()
+
+    logger.info(
+        f"Applied {len(events)} product webhooks: {result['written']} written, "
+        f"{result['unchanged']} unchanged, {superseded} superseded, {len(errors)} failed"
+    )
+    return errors
+
+# Drains webhook_queue in the background (started from server.py)
+webhook_worker = WebhookWorker(webhook_queue, apply_product_webhooks) if webhook_queue is not None else None
 
 @router.post("/webhooks/orders/create")
 async def handle_order_create(
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Durable webhook intake queue
+Webhook handlers verify the HMAC, insert the raw delivery into the
+webhook_events collection and acknowledge; WebhookWorker drains pending
+events in batches and hands them to an apply function that uses bulk
+writes. Redeliveries are dropped by X-Shopify-Webhook-Id, in memory via
+RecentIds and durably via a unique index on webhook_id.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from repository import db
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', '100'))
+# Idle poll interval; new events also wake the worker directly
+WEBHOOK_POLL_INTERVAL = float(os.getenv('WEBHOOK_POLL_INTERVAL_SECONDS', '1'))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '5'))
+# Claimed events not completed within this long (e.g. the process died) are retried
+WEBHOOK_CLAIM_TIMEOUT = float(os.getenv('WEBHOOK_CLAIM_TIMEOUT_SECONDS', '300'))
+# Processed events are kept this long (TTL index in indexes.py)
+WEBHOOK_RETENTION_SECONDS = int(os.getenv('WEBHOOK_RETENTION_SECONDS', str(7 * 24 * 3600)))
+# Recently seen X-Shopify-Webhook-Id values; Shopify retries a delivery for up to 48 hours
+WEBHOOK_DEDUP_TTL = float(os.getenv('WEBHOOK_DEDUP_TTL_SECONDS', str(48 * 3600)))
+WEBHOOK_DEDUP_MAX_ENTRIES = int(os.getenv('WEBHOOK_DEDUP_MAX_ENTRIES', '10000'))
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class RecentIds:
+    """Bounded set of recently seen ids; entries expire after ttl seconds, oldest evicted first"""
+
+    def __init__(self, max_entries: int = WEBHOOK_DEDUP_MAX_ENTRIES, ttl: float = WEBHOOK_DEDUP_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._expires: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, key: str) -> bool:
+        """Record key; False if it was already seen within the ttl"""
+        now = time.monotonic()
+        with self._lock:
+            # Insertion order is expiry order, so expired entries sit at the front
+            while self._expires and next(iter(self._expires.values())) <= now:
+                self._expires.popitem(last=False)
+            if key in self._expires:
+                self.hits += 1
+                return False
+            self.misses += 1
+            self._expires[key] = now + self.ttl
+            while len(self._expires) > self.max_entries:
+                self._expires.popitem(last=False)
+            return True
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._expires.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._expires),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'duplicates': self.hits,
+                'first_seen': self.misses,
+            }
+
+
+class InvalidWebhookPayload(ValueError):
+    """An event that no retry can apply (e.g. malformed JSON); it is parked on the first attempt"""
+
+
+class WebhookQueue:
+    """webhook_events collection used as a work queue"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.duplicates = 0
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def wakeup(self) -> asyncio.Event:
+        # Created lazily so it binds to the running loop
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    async def enqueue(self, topic: str, body: bytes, headers: Dict[str, Optional[str]]) -> Any:
+        """Persist one raw delivery; returns its _id, or None if its webhook_id is already queued
+
+        A body that isn't UTF-8 can never be applied, but it is still
+        stored (as raw bytes, parked as failed) so the delivery can be
+        acknowledged instead of being redelivered forever.
+        """
+        now = datetime.utcnow()
+        event = {
+            'topic': topic,
+            'webhook_id': headers.get('webhook_id'),
+            'shop_domain': headers.get('shop_domain'),
+            'triggered_at': headers.get('triggered_at'),
+            'status': PENDING,
+            'attempts': 0,
+            'received_at': now,
+            'available_at': now,
+        }
+        try:
+            event['body'] = body.decode('utf-8')
+        except UnicodeDecodeError as e:
+            event.update({'body': body, 'status': FAILED, 'processed_at': now, 'error': f"Invalid payload: {str(e)}"})
+        try:
+            result = await self.collection.insert_one(event)
+        except DuplicateKeyError:
+            self.duplicates += 1
+            return None
+        self.enqueued += 1
+        if event['status'] == FAILED:
+            self.failed += 1
+            logger.warning(f"Parked {topic} webhook with a body that isn't UTF-8")
+        else:
+            self.wakeup.set()
+        return result.inserted_id
+
+    async def claim_batch(self, limit: int = WEBHOOK_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """Claim up to limit due events, oldest first, for this worker
+
+        Due means pending and past available_at, or claimed longer than
+        WEBHOOK_CLAIM_TIMEOUT ago by a worker that never finished it.
+        """
+        now = datetime.utcnow()
+        claimable = {'$or': [
+            {'status': PENDING, 'available_at': {'$lte': now}},
+            {'status': PROCESSING, 'claimed_at': {'$lt': now - timedelta(seconds=WEBHOOK_CLAIM_TIMEOUT)}},
+        ]}
+        candidates = await self.collection.find(
+            claimable, {'_id': 1}
+        ).sort('received_at', ASCENDING).limit(limit).to_list(length=limit)
+        if not candidates:
+            return []
+
+        # Only events still claimable get our token, so concurrent workers never share one
+        token = uuid.uuid4().hex
+        await self.collection.update_many(
+            {'_id': {'$in': [doc['_id'] for doc in candidates]}, **claimable},
+            {'$set': {'status': PROCESSING, 'claim_token': token, 'claimed_at': now}, '$inc': {'attempts': 1}}
+        )
+        return await self.collection.find({'claim_token': token}).sort('received_at', ASCENDING).to_list(length=limit)
+
+    async def complete(self, event_ids: List[Any]) -> None:
+        if not event_ids:
+            return
+        await self.collection.update_many(
+            {'_id': {'$in': event_ids}},
+            {'$set': {'status': DONE, 'processed_at': datetime.utcnow()}, '$unset': {'claim_token': '', 'error': ''}}
+        )
+        self.processed += len(event_ids)
+
+    async def fail(self, event: Dict[str, Any], error: str, retry: bool = True) -> None:
+        """Put an event back with backoff, or park it as failed after WEBHOOK_MAX_ATTEMPTS (or right away without retry)"""
+        attempts = event.get('attempts', 1)
+        now = datetime.utcnow()
+        if not retry or attempts >= WEBHOOK_MAX_ATTEMPTS:
+            update = {'status': FAILED, 'processed_at': now, 'error': error}
+            self.failed += 1
+        else:
+            update = {'status': PENDING, 'available_at': now + timedelta(seconds=2 ** attempts), 'error': error}
+            self.retried += 1
+        await self.collection.update_one(
+            {'_id': event['_id']}, {'$set': update, '$unset': {'claim_token': ''}}
+        )
+
+    async def release(self, event_ids: List[Any]) -> int:
+        """Hand claimed events that were not finished back to the queue (e.g. on shutdown)"""
+        if not event_ids:
+            return 0
+        result = await self.collection.update_many(
+            {'_id': {'$in': event_ids}, 'status': PROCESSING},
+            {'$set': {'status': PENDING, 'available_at': datetime.utcnow()}, '$unset': {'claim_token': ''}}
+        )
+        return result.modified_count
+
+    async def stats(self) -> Dict[str, Any]:
+        depth = await self.collection.count_documents({'status': PENDING})
+        processing = await self.collection.count_documents({'status': PROCESSING})
+        failed = await self.collection.count_documents({'status': FAILED})
+        oldest = await self.collection.find_one(
+            {'status': {'$in': [PENDING, PROCESSING]}}, {'received_at': 1}, sort=[('received_at', ASCENDING)]
+        )
+        lag = (datetime.utcnow() - oldest['received_at']).total_seconds() if oldest else 0.0
+        return {
+            'depth': depth,
+            'processing': processing,
+            'failed_parked': failed,
+            'lag_seconds': round(lag, 3),
+            'enqueued': self.enqueued,
+            'processed': self.processed,
+            'retried': self.retried,
+            'failed': self.failed,
+            'duplicates': self.duplicates,
+        }
+
+
+# apply_batch(events) -> {event _id: error} for events that failed; the error
+# is a message, or an InvalidWebhookPayload for events not worth retrying
+ApplyBatch = Callable[[List[Dict[str, Any]]], Awaitable[Dict[Any, Union[str, InvalidWebhookPayload]]]]
+
+
+class WebhookWorker:
+    """Background task draining a WebhookQueue in batches"""
+
+    def __init__(self, queue: WebhookQueue, apply_batch: ApplyBatch,
+                 batch_size: int = WEBHOOK_BATCH_SIZE, poll_interval: float = WEBHOOK_POLL_INTERVAL):
+        self.queue = queue
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+        # Events of the batch being applied, released if the worker is stopped mid-batch
+        self._claimed: List[Any] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def drain_once(self) -> int:
+        """Claim and apply one batch; returns how many events it held"""
+        events = await self.queue.claim_batch(self.batch_size)
+        if not events:
+            return 0
+        self._claimed = [event['_id'] for event in events]
+        started = time.perf_counter()
+        try:
+            errors = await self.apply_batch(events)
+        except Exception as e:
+            logger.error(f"Webhook batch of {len(events)} failed: {str(e)}")
+            errors = {event['_id']: str(e) for event in events}
+
+        for event in events:
+            error = errors.get(event['_id'])
+            if error is not None:
+                await self.queue.fail(event, str(error), retry=not isinstance(error, InvalidWebhookPayload))
+        await self.queue.complete([event['_id'] for event in events if event['_id'] not in errors])
+        self._claimed = []
+
+        self.batches += 1
+        self.last_batch_size = len(events)
+        self.last_batch_seconds = time.perf_counter() - started
+        return len(events)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if await self.drain_once() >= self.batch_size:
+                    # Backlog: go straight on to the next batch
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook worker error: {str(e)}")
+            self.queue.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.queue.wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Don't leave an interrupted batch waiting out WEBHOOK_CLAIM_TIMEOUT
+        claimed, self._claimed = self._claimed, []
+        try:
+            released = await self.queue.release(claimed)
+        except Exception as e:
+            logger.error(f"Failed to release {len(claimed)} claimed webhook events: {str(e)}")
+        else:
+            if released:
+                logger.warning(f"Re-queued {released} webhook events from an interrupted batch")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'batches': self.batches,
+            'last_batch_size': self.last_batch_size,
+            'last_batch_ms': round(self.last_batch_seconds * 1000, 1),
+        }
+
+
+# Global instances (the queue is None when MongoDB isn't configured)
+webhook_queue = WebhookQueue(db.webhook_events) if db is not None else None
+recent_webhook_ids = RecentIds()
@@ -0,0 +1,15 @@
+"""
+Puts backend/ on sys.path so the store scripts in this directory can use
+the shared backend modules (pooled Shopify session, mutation executor).
+Import it before any of them:
+
+    import backend_path  # noqa: F401
+    from shopify_http import get_session
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
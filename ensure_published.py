@@ -4,13 +4,14 @@ Ensure all products are published and available for storefront
 """
 import os
 import json
-import requests
-import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('/app/backend/.env')
 
+import backend_path  # noqa: F401
+from shopify_http import get_session
+
 class ProductPublisher:
     def __init__(self):
         self.shopify_domain = os.getenv('SHOPIFY_STORE_DOMAIN')
@@ -24,11 +25,12 @@ class ProductPublisher:
             'X-Shopify-Access-Token': self.admin_api_key,
             'Content-Type': 'application/json'
         }
+        self.http = get_session()
 
     def get_all_products(self):
         """Get all products from the store"""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/products.json?limit=250",
                 headers=self.headers
             )
@@ -56,7 +58,7 @@ class ProductPublisher:
                 }
             }
             
-            response = requests.put(
+            response = self.http.put(
                 f"{self.base_url}/products/{product_id}.json",
                 headers=self.headers,
                 json=payload
@@ -101,8 +103,6 @@ class ProductPublisher:
                 updated_count += 1
             else:
                 failed_count += 1
-                
-            time.sleep(0.5)  # Rate limiting
             
         print(f"\n📊 SUMMARY:")
         print(f"✅ Successfully updated: {updated_count}")
@@ -5,13 +5,14 @@ Creates OG collections and ensures all products are published
 """
 import os
 import json
-import requests
-import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('/app/backend/.env')
 
+import backend_path  # noqa: F401
+from shopify_http import get_session
+
 class CollectionFixer:
     def __init__(self):
         self.shopify_domain = os.getenv('SHOPIFY_STORE_DOMAIN')
@@ -25,6 +26,7 @@ class CollectionFixer:
             'X-Shopify-Access-Token': self.admin_api_key,
             'Content-Type': 'application/json'
         }
+        self.http = get_session()
 
     def create_og_collections(self):
         """Create proper OG collections"""
@@ -119,7 +121,7 @@ class CollectionFixer:
             }
             
             try:
-                response = requests.post(
+                response = self.http.post(
                     f"{self.base_url}/collections.json",
                     headers=self.headers,
                     json=collection_payload
@@ -134,15 +136,13 @@ class CollectionFixer:
                     
             except Exception as e:
                 print(f"❌ Error creating collection {collection_data['title']}: {str(e)}")
-                
-            time.sleep(0.5)
             
         return created_collections
 
     def get_all_products(self):
         """Get all products from the store"""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/products.json?limit=250",
                 headers=self.headers
             )
@@ -169,7 +169,7 @@ class CollectionFixer:
                 }
             }
             
-            response = requests.put(
+            response = self.http.put(
                 f"{self.base_url}/products/{product_id}.json",
                 headers=self.headers,
                 json=payload
@@ -201,7 +201,6 @@ class CollectionFixer:
                 if self.publish_product(product['id']):
                     published_count += 1
                     print(f"✅ Published: {product['title']}")
-                time.sleep(0.3)
             else:
                 print(f"✓ Already published: {product['title']}")
                 
@@ -5,8 +5,6 @@ Handles front/back images and generates cinematic product names
 """
 import os
 import json
-import requests
-import time
 from pathlib import Path
 import hashlib
 from dotenv import load_dotenv
@@ -14,6 +12,10 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv('/app/backend/.env')
 
+import backend_path  # noqa: F401
+from shopify_http import get_session
+from shopify_mutations import MutationExecutor, ProductMutation, MUTATION_WORKERS
+
 class OGProductCreator:
     def __init__(self):
         self.shopify_domain = os.getenv('SHOPIFY_STORE_DOMAIN')
@@ -28,6 +30,7 @@ class OGProductCreator:
             'X-Shopify-Access-Token': self.admin_api_key,
             'Content-Type': 'application/json'
         }
+        self.http = get_session()
         
         # OG-themed product names based on categories
         self.og_names = {
@@ -133,7 +136,7 @@ class OGProductCreator:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/collections.json",
                 headers=self.headers,
                 json=collection_data
@@ -147,9 +150,6 @@ class OGProductCreator:
                 
         except Exception as e:
             print(f"❌ Error creating collection {collection_title}: {str(e)}")
-            
-        # Small delay to prevent rate limiting
-        time.sleep(0.5)
 
     def upload_image_to_shopify(self, image_path):
         """Upload image to Shopify and return the image URL"""
@@ -174,8 +174,8 @@ class OGProductCreator:
             print(f"❌ Error uploading image {image_path}: {str(e)}")
             return None
 
-    def create_product(self, category, product_folder, product_name):
-        """Create a single product with front/back images"""
+    def build_product_payload(self, category, product_folder, product_name):
+        """Build the product payload (with base64 images) for one product folder, or None if it has no images"""
         
         # Find all images in the product folder
         image_paths = []
@@ -216,7 +216,7 @@ class OGProductCreator:
                 product_images.append(image_data)
         
         # Create product data
-        product_data = {
+        return {
             "product": {
                 "title": product_name,
                 "body_html": f"<p><strong>{product_name}</strong> - Premium OG merchandise for true fans. Crafted with precision and designed for warriors.</p><p>Every product is a weapon. Every fan is a soldier.</p>",
@@ -260,9 +260,23 @@ class OGProductCreator:
                 ]
             }
         }
+
+    def record_created_product(self, product, category, product_name):
+        print(f"✅ Created product: {product_name} (ID: {product['id']})")
+        self.created_products.append({
+            'id': product['id'],
+            'title': product_name,
+            'category': category
+        })
+
+    def create_product(self, category, product_folder, product_name):
+        """Create a single product with front/back images"""
+        product_data = self.build_product_payload(category, product_folder, product_name)
+        if product_data is None:
+            return None
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/products.json",
                 headers=self.headers,
                 json=product_data
@@ -270,12 +284,7 @@ class OGProductCreator:
             
             if response.status_code == 201:
                 product = response.json()['product']
-                print(f"✅ Created product: {product_name} (ID: {product['id']})")
-                self.created_products.append({
-                    'id': product['id'],
-                    'title': product_name,
-                    'category': category
-                })
+                self.record_created_product(product, category, product_name)
                 return product
             else:
                 print(f"❌ Failed to create product {product_name}: {response.text}")
@@ -284,9 +293,6 @@ class OGProductCreator:
         except Exception as e:
             print(f"❌ Error creating product {product_name}: {str(e)}")
             return None
-            
-        # Rate limiting delay
-        time.sleep(1)
 
     def get_og_price(self, category):
         """Get OG-themed pricing for categories"""
@@ -321,7 +327,7 @@ class OGProductCreator:
     def delete_existing_products(self):
         """Delete existing products to start fresh"""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/products.json?limit=250",
                 headers=self.headers
             )
@@ -330,14 +336,11 @@ class OGProductCreator:
                 products = response.json().get('products', [])
                 print(f"🗑️ Found {len(products)} existing products to delete")
                 
-                for product in products:
-                    delete_response = requests.delete(
-                        f"{self.base_url}/products/{product['id']}.json",
-                        headers=self.headers
-                    )
-                    if delete_response.status_code == 200:
-                        print(f"🗑️ Deleted: {product['title']}")
-                    time.sleep(0.3)  # Rate limiting
+                executor = MutationExecutor(self.http, self.base_url, self.headers)
+                deletes = (ProductMutation.delete(product['id'], context=product['title']) for product in products)
+                for result in executor.run(deletes):
+                    if result.ok:
+                        print(f"🗑️ Deleted: {result.context}")
                         
         except Exception as e:
             print(f"❌ Error deleting products: {str(e)}")
@@ -357,9 +360,8 @@ class OGProductCreator:
         print(f"🚀 Starting OG Product Creation...")
         print("=" * 60)
         
-        # Track product indices for unique naming
-        category_indices = {}
-        
+        # Collections first (a handful of calls), then every product folder as one batch
+        product_jobs = []
         for category_dir in products_dir.iterdir():
             if not category_dir.is_dir():
                 continue
@@ -370,26 +372,33 @@ class OGProductCreator:
             # Create collection for this category
             self.create_collection_if_not_exists(category)
             
-            category_indices[category] = 0
-            
-            # Process each product in the category
+            # Track product indices for unique naming
+            index = 0
             for product_dir in category_dir.iterdir():
                 if not product_dir.is_dir():
                     continue
-                    
-                # Generate premium OG name
-                product_name = self.get_premium_name(category, category_indices[category])
-                category_indices[category] += 1
-                
-                print(f"  🎯 Creating: {product_name}")
-                
-                # Create the product
-                product = self.create_product(category, product_dir, product_name)
-                
-                if product:
-                    print(f"  ✅ Success: {product_name}")
-                else:
+                product_jobs.append((category, product_dir, self.get_premium_name(category, index)))
+                index += 1
+        
+        print(f"\n🎯 Creating {len(product_jobs)} products with {MUTATION_WORKERS} workers...")
+        
+        def mutations():
+            # Payloads (base64 images) are built as workers free up, not all up front
+            for category, product_dir, product_name in product_jobs:
+                product_data = self.build_product_payload(category, product_dir, product_name)
+                if product_data is None:
                     print(f"  ❌ Failed: {product_name}")
+                    continue
+                yield ProductMutation.create(product_data['product'], context=(category, product_name))
+        
+        executor = MutationExecutor(self.http, self.base_url, self.headers)
+        for result in executor.run(mutations()):
+            category, product_name = result.context
+            if result.ok:
+                self.record_created_product(result.product, category, product_name)
+                print(f"  ✅ Success: {product_name}")
+            else:
+                print(f"  ❌ Failed: {product_name} after {result.attempts} attempt(s): {result.error}")
                     
         print("\n" + "=" * 60)
         print(f"🎉 OG Product Creation Complete!")
@@ -4,13 +4,14 @@ Publish products to Storefront API sales channel
 """
 import os
 import json
-import requests
-import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('/app/backend/.env')
 
+import backend_path  # noqa: F401
+from shopify_http import get_session
+
 class StorefrontPublisher:
     def __init__(self):
         self.shopify_domain = os.getenv('SHOPIFY_STORE_DOMAIN')
@@ -24,11 +25,12 @@ class StorefrontPublisher:
             'X-Shopify-Access-Token': self.admin_api_key,
             'Content-Type': 'application/json'
         }
+        self.http = get_session()
 
     def get_online_store_channel_id(self):
         """Get the Online Store sales channel ID"""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/publications.json",
                 headers=self.headers
             )
@@ -61,7 +63,7 @@ class StorefrontPublisher:
     def get_all_products(self):
         """Get all products from the store"""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/products.json?limit=250",
                 headers=self.headers
             )
@@ -87,7 +89,7 @@ class StorefrontPublisher:
                 }
             }
             
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/products/{product_id}/product_publications.json",
                 headers=self.headers,
                 json=payload
@@ -140,8 +142,6 @@ class StorefrontPublisher:
             else:
                 failed_count += 1
                 print(f"  ❌ Failed: {product_title}")
-                
-            time.sleep(0.3)  # Rate limiting
             
         print(f"\n📊 SUMMARY:")
         print(f"✅ Successfully published: {published_count}")
@@ -0,0 +1,27 @@
+"""
+Shared test setup
+Backend modules import each other as top-level modules, so backend/ (and
+backend/benchmarks/ for the fake Shopify server) go on sys.path. Shopify
+credentials are dummies: the services are pointed at the local stand-in.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+os.environ.setdefault('SHOPIFY_STORE_DOMAIN', 'test-store.myshopify.com')
+os.environ.setdefault('SHOPIFY_ADMIN_ACCESS_TOKEN', 'test-admin-token')
+os.environ.setdefault('SHOPIFY_STOREFRONT_ACCESS_TOKEN', 'test-storefront-token')
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop"""
+    return asyncio.run
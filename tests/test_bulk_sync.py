@@ -0,0 +1,79 @@
+"""
+Bulk and REST product sync against the local fake Shopify server, with
+mongomock standing in for MongoDB
+"""
+
+import threading
+
+import mongomock
+import pytest
+
+from fake_shopify import serve
+from shopify_service import ShopifyService, parse_shopify_time
+
+PRODUCTS = 25
+
+
+@pytest.fixture
+def fake_shopify():
+    server, state = serve(0, PRODUCTS, bucket_size=1000, leak_rate=1000)
+    # Finish the bulk operation on the first poll instead of sleeping between polls
+    state.bulk_polls_until_done = 1
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}", state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(fake_shopify):
+    base_url, _ = fake_shopify
+    service = ShopifyService()
+    service.admin_url = f"{base_url}/admin/api/2024-01"
+    db = mongomock.MongoClient().db
+    service.products_collection = db.products
+    service.sync_checkpoints = db.sync_checkpoints
+    return service
+
+
+def test_bulk_sync_stores_every_product(service, fake_shopify):
+    _, state = fake_shopify
+
+    result = service.bulk_sync_products(batch_size=10)
+
+    assert result['status'] == 'success', result
+    assert result['products_synced'] == PRODUCTS
+    assert result['upserted'] == PRODUCTS
+    assert service.products_collection.count_documents({'sync_status': 'synced'}) == PRODUCTS
+
+    first = state.products[0]
+    stored = service.products_collection.find_one({'shopify_id': 1001})
+    assert stored['title'] == first['title']
+    assert stored['tags'] == 'OG, Test'
+    assert [v['sku'] for v in stored['variants']] == [v['sku'] for v in first['variants']]
+    assert len(stored['images']) == len(first['images'])
+    assert stored['image']['src'] == first['images'][0]['url']
+    assert stored['content_hash']
+
+
+def test_bulk_sync_is_idempotent_and_saves_checkpoint(service, fake_shopify):
+    _, state = fake_shopify
+
+    service.bulk_sync_products(batch_size=10)
+    result = service.bulk_sync_products(batch_size=10)
+
+    assert result['upserted'] == 0
+    assert result['matched'] == PRODUCTS
+    assert service.products_collection.count_documents({}) == PRODUCTS
+    latest = max(parse_shopify_time(p['updatedAt']) for p in state.products)
+    assert service.get_sync_checkpoint() == latest
+
+
+def test_rest_sync_follows_pagination(service):
+    result = service.sync_all_products(full=True)
+
+    assert result['status'] == 'success', result
+    assert result['products_synced'] == PRODUCTS
+    assert service.products_collection.count_documents({}) == PRODUCTS
+    assert result['checkpoint'] is not None
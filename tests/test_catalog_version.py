@@ -0,0 +1,85 @@
+"""
+Catalog version ETags, If-None-Match handling and cross-instance sync
+"""
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from starlette.requests import Request
+
+from catalog_version import CatalogVersion
+from compression import encoded_etag
+
+
+def make_request(path='/api/products', query='', if_none_match=None):
+    headers = [(b'if-none-match', if_none_match.encode('latin-1'))] if if_none_match else []
+    return Request({'type': 'http', 'method': 'GET', 'path': path,
+                    'query_string': query.encode('latin-1'), 'headers': headers})
+
+
+def test_etag_depends_on_version_and_query_but_not_param_order():
+    version = CatalogVersion()
+    etag = version.etag(make_request(query='limit=5&fields=card'))
+
+    assert etag == version.etag(make_request(query='fields=card&limit=5'))
+    assert etag != version.etag(make_request(query='limit=6&fields=card'))
+
+    version.bump()
+    assert etag != version.etag(make_request(query='limit=5&fields=card'))
+
+
+@pytest.mark.parametrize('tag', [
+    lambda etag: etag,
+    lambda etag: f'W/{etag}',
+    lambda etag: encoded_etag(etag, 'br'),
+    lambda etag: encoded_etag(etag, 'gzip'),
+    lambda etag: f'W/{encoded_etag(etag, "gzip")}',
+    lambda etag: f'"something-else", {etag}',
+    lambda etag: '*',
+])
+def test_matching_tags_get_304(tag):
+    version = CatalogVersion()
+    etag = version.etag(make_request())
+    sent = tag(etag)
+
+    response = version.not_modified_response(make_request(if_none_match=sent), etag)
+
+    assert response is not None
+    assert response.status_code == 304
+
+
+def test_304_echoes_the_matched_coding_variant():
+    version = CatalogVersion()
+    etag = version.etag(make_request())
+    br_tag = encoded_etag(etag, 'br')
+
+    response = version.not_modified_response(make_request(if_none_match=f'W/{br_tag}'), etag)
+
+    assert response.headers['etag'] == br_tag
+
+
+def test_tags_from_an_older_version_do_not_match():
+    version = CatalogVersion()
+    old = version.etag(make_request())
+    version.bump()
+    etag = version.etag(make_request())
+
+    assert version.not_modified_response(make_request(if_none_match=old), etag) is None
+    assert version.not_modified_response(make_request(), etag) is None
+
+
+def test_instances_share_the_version_through_mongo(run):
+    collection = AsyncMongoMockClient().db.catalog_meta
+    first, second = CatalogVersion(collection), CatalogVersion(collection)
+    changes = []
+    second.on_remote_change(lambda: changes.append('cleared'))
+
+    async def scenario():
+        first.bump()
+        await first.sync()
+        await second.sync()
+
+    run(scenario())
+
+    assert first.token() == second.token()
+    assert first.etag(make_request()) == second.etag(make_request())
+    assert changes == ['cleared']
@@ -0,0 +1,52 @@
+"""
+Accept-Encoding negotiation and per-coding ETags
+"""
+
+import pytest
+
+import compression
+from compression import encoded_etag, identity_etag, negotiate_encoding
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('', None),
+    ('identity', None),
+    ('gzip, deflate, br', 'br'),
+    ('br;q=0, gzip', 'gzip'),
+    ('br;q=0, gzip;q=0', None),
+    ('*', 'br'),
+    ('*;q=0.5, br;q=0', 'gzip'),
+    ('GZIP;q=0.8', 'gzip'),
+    ('br;q=oops, gzip', 'gzip'),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+
+    assert negotiate_encoding('br, gzip') == 'gzip'
+    assert negotiate_encoding('br') is None
+
+
+def test_encoded_etags_are_distinct_and_reversible():
+    etag = '"abc-3-0123456789abcdef"'
+
+    assert encoded_etag(etag, 'br') == '"abc-3-0123456789abcdef-br"'
+    assert encoded_etag(etag, 'br') != encoded_etag(etag, 'gzip')
+    assert identity_etag(encoded_etag(etag, 'gzip')) == etag
+    assert identity_etag(etag) == etag
+
+
+def test_snapshot_cache_compresses_each_version_once():
+    cache = compression.SnapshotCache(max_entries=2)
+    body = b'{"products": []}' * 100
+
+    first = cache.get_or_compress('"v1"', body, 'gzip')
+    second = cache.get_or_compress('"v1"', body, 'gzip')
+
+    assert first is second
+    assert cache.stats()['compressions'] == 1
+    assert cache.stats()['snapshot_hits'] == 1
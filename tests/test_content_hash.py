@@ -0,0 +1,61 @@
+"""
+Product change detection: content hash, field diff and skipped updates
+"""
+
+from content_hash import changed_fields, content_hash
+from shopify_mutations import MutationExecutor, ProductMutation, detect_changes
+
+STORED = {
+    '_id': 'abc', 'shopify_id': 1, 'sync_status': 'synced', 'content_hash': 'old',
+    'id': 1, 'title': 'Tee', 'updated_at': '2024-01-01T10:00:00Z',
+    'variants': [{'id': 11, 'price': '10.00', 'updated_at': '2024-01-01T10:00:00Z'}],
+}
+
+
+class Session:
+    """Records requests; these tests expect none"""
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs.get('json')))
+        raise AssertionError('unexpected request')
+
+
+def test_hash_ignores_local_fields_and_nested_updated_at():
+    payload = {
+        'variants': [{'price': '10.00', 'id': 11, 'updated_at': '2024-06-01T00:00:00Z'}],
+        'title': 'Tee', 'id': 1, 'updated_at': '2024-06-01T00:00:00Z',
+    }
+
+    assert content_hash(payload) == content_hash(STORED)
+    assert content_hash({**payload, 'title': 'Hoodie'}) != content_hash(STORED)
+
+
+def test_changed_fields_keeps_only_differences():
+    assert changed_fields(STORED, {'id': 1, 'title': 'Tee', 'variants': [{'id': 11, 'price': '10.00'}]}) == {}
+    assert changed_fields(STORED, {'id': 1, 'title': 'Tee', 'variants': [{'id': 11, 'price': '12.00'}]}) == {
+        'variants': [{'id': 11, 'price': '12.00'}],
+    }
+    assert changed_fields(None, {'id': 1, 'title': 'Tee'}) == {'id': 1, 'title': 'Tee'}
+
+
+def test_detect_changes_reduces_the_payload():
+    mutation = ProductMutation.update(1, {'id': 1, 'title': 'Hoodie', 'variants': [{'id': 11, 'price': '10.00'}]})
+
+    reduced = detect_changes(mutation, STORED)
+
+    assert reduced.payload == {'product': {'title': 'Hoodie', 'id': 1}}
+    assert detect_changes(ProductMutation.update(1, {'id': 1, 'title': 'Tee'}), STORED) is None
+
+
+def test_unchanged_update_is_skipped_without_a_request():
+    session = Session()
+    executor = MutationExecutor(session, 'https://shop.example/admin/api/2024-01', {}, lookup=lambda product_id: STORED)
+
+    result = executor.execute(0, ProductMutation.update(1, {'id': 1, 'title': 'Tee'}))
+
+    assert result.ok and result.skipped
+    assert result.product == STORED
+    assert session.requests == []
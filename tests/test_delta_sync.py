@@ -0,0 +1,53 @@
+"""
+Sync checkpoint capping and deletion reconciliation
+"""
+
+from datetime import datetime
+
+import mongomock
+
+import shopify_service
+from shopify_service import ShopifyService, cap_sync_checkpoint, parse_http_date
+
+
+def test_parse_http_date():
+    assert parse_http_date('Mon, 01 Jan 2024 10:00:00 GMT') == datetime(2024, 1, 1, 10, 0)
+    assert parse_http_date(None) is None
+    assert parse_http_date('not a date') is None
+
+
+def test_checkpoint_is_capped_at_sync_start_minus_skew(monkeypatch):
+    monkeypatch.setattr(shopify_service, 'SYNC_CHECKPOINT_SKEW', 300)
+    started_at = datetime(2024, 1, 1, 12, 0)
+
+    assert cap_sync_checkpoint(datetime(2024, 1, 1, 13, 0), started_at) == datetime(2024, 1, 1, 11, 55)
+    assert cap_sync_checkpoint(datetime(2024, 1, 1, 9, 0), started_at) == datetime(2024, 1, 1, 9, 0)
+    assert cap_sync_checkpoint(None, started_at) is None
+
+
+def test_reconcile_spares_products_created_during_the_walk():
+    service = ShopifyService()
+    products = mongomock.MongoClient().db.products
+    service.products_collection = products
+    products.insert_many([
+        {'shopify_id': 1, 'sync_status': 'synced'},
+        {'shopify_id': 2, 'sync_status': 'synced'},
+    ])
+    pages = iter([
+        {'products': [{'id': 1}], 'next_page_info': 'next'},
+        {'products': [], 'next_page_info': None},
+    ])
+
+    def fetch_page(page_info=None, filters=None):
+        # A products/create webhook lands while the walk is running
+        if page_info == 'next':
+            products.insert_one({'shopify_id': 3, 'sync_status': 'webhook_created'})
+        return next(pages)
+
+    service._fetch_products_page = fetch_page
+
+    result = service.reconcile_deleted_products()
+
+    assert result['marked_deleted'] == 1
+    assert products.find_one({'shopify_id': 2})['sync_status'] == 'deleted'
+    assert products.find_one({'shopify_id': 3})['sync_status'] == 'webhook_created'
@@ -0,0 +1,176 @@
+"""
+Concurrent product mutation executors with scripted sessions
+"""
+
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+import shopify_mutations
+from shopify_http import ShopifyCircuitOpenError
+from shopify_async_http import AsyncShopifyCircuitOpenError
+from shopify_mutations import AsyncMutationExecutor, MutationExecutor, ProductMutation
+
+ADMIN_URL = 'https://shop.example/admin/api/2024-01'
+
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body if body is not None else {}
+        self.text = str(self.body)
+
+    def json(self):
+        return self.body
+
+
+class Session:
+    """Plays back one outcome (a Response or an exception) per request"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs.get('json')))
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class AsyncSession(Session):
+    async def request(self, method, url, **kwargs):
+        return Session.request(self, method, url, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(shopify_mutations, 'backoff_delay', lambda attempt, base: 0)
+
+
+@pytest.mark.parametrize('mutation', [
+    ProductMutation.create({'title': 'New'}),
+    ProductMutation.update(1, {'title': 'Changed'}),
+])
+def test_open_circuit_fails_every_mutation_without_retries(mutation):
+    session = Session(ShopifyCircuitOpenError('shop', 12.0))
+
+    result = MutationExecutor(session, ADMIN_URL, {}).execute(0, mutation)
+
+    assert not result.ok
+    assert result.attempts == 1
+    assert result.error.startswith('Circuit open')
+    assert len(session.requests) == 1
+
+
+def test_open_circuit_fails_async_mutations_without_retries(run):
+    session = AsyncSession(AsyncShopifyCircuitOpenError('shop', 12.0))
+
+    result = run(AsyncMutationExecutor(session, ADMIN_URL, {}).execute(0, ProductMutation.delete(1)))
+
+    assert not result.ok
+    assert result.attempts == 1
+    assert result.error.startswith('Circuit open')
+
+
+def test_create_retries_only_statuses_shopify_returns_before_writing():
+    for status in (429, 503):
+        session = Session(Response(status), Response(201, {'product': {'id': 7}}))
+        result = MutationExecutor(session, ADMIN_URL, {}).execute(0, ProductMutation.create({'title': 'New'}))
+        assert result.ok and result.attempts == 2
+        assert result.product_id == 7
+
+    session = Session(Response(500), Response(201, {'product': {'id': 7}}))
+    result = MutationExecutor(session, ADMIN_URL, {}).execute(0, ProductMutation.create({'title': 'New'}))
+    assert not result.ok
+    assert result.status_code == 500
+    assert len(session.requests) == 1
+
+
+def test_update_retries_server_errors():
+    session = Session(Response(500), Response(502), Response(200, {'product': {'id': 1}}))
+
+    result = MutationExecutor(session, ADMIN_URL, {}).execute(0, ProductMutation.update(1, {'title': 'x'}))
+
+    assert result.ok
+    assert result.attempts == 3
+
+
+def test_create_retries_a_failed_connect_but_not_a_read_timeout():
+    session = Session(requests.exceptions.ConnectTimeout('connect'), Response(201, {'product': {'id': 7}}))
+    result = MutationExecutor(session, ADMIN_URL, {}).execute(0, ProductMutation.create({'title': 'New'}))
+    assert result.ok and result.attempts == 2
+
+    # The create may have gone through; retrying could duplicate the product
+    session = Session(requests.exceptions.ReadTimeout('read'), Response(201, {'product': {'id': 7}}))
+    result = MutationExecutor(session, ADMIN_URL, {}).execute(0, ProductMutation.create({'title': 'New'}))
+    assert not result.ok
+    assert len(session.requests) == 1
+
+
+def test_async_create_retries_a_failed_connect_but_not_a_read_timeout(run):
+    executor_for = lambda session: AsyncMutationExecutor(session, ADMIN_URL, {})
+
+    session = AsyncSession(httpx.ConnectError('connect'), Response(201, {'product': {'id': 7}}))
+    result = run(executor_for(session).execute(0, ProductMutation.create({'title': 'New'})))
+    assert result.ok and result.attempts == 2
+
+    session = AsyncSession(httpx.ReadTimeout('read'), Response(201, {'product': {'id': 7}}))
+    result = run(executor_for(session).execute(0, ProductMutation.create({'title': 'New'})))
+    assert not result.ok
+    assert len(session.requests) == 1
+
+
+class Counted:
+    """Mutation source that records how far it has been consumed"""
+
+    def __init__(self, count):
+        self.count = count
+        self.pulled = 0
+
+    def __iter__(self):
+        for i in range(self.count):
+            self.pulled += 1
+            yield ProductMutation.update(i, {'title': f'p{i}'})
+
+
+def test_run_consumes_its_input_in_a_bounded_window():
+    source = Counted(20)
+    executor = MutationExecutor(Session(Response(200, {})), ADMIN_URL, {}, workers=2)
+    pulled_at_first_result = None
+    results = []
+
+    for result in executor.run(source):
+        if pulled_at_first_result is None:
+            pulled_at_first_result = source.pulled
+        results.append(result)
+
+    assert pulled_at_first_result <= 4
+    assert sorted(r.index for r in results) == list(range(20))
+
+
+def test_async_run_consumes_its_input_in_a_bounded_window(run):
+    class SlowSession(AsyncSession):
+        async def request(self, method, url, **kwargs):
+            await asyncio.sleep(0)
+            return Session.request(self, method, url, **kwargs)
+
+    source = Counted(20)
+    executor = AsyncMutationExecutor(SlowSession(Response(200, {})), ADMIN_URL, {}, workers=2)
+
+    async def scenario():
+        pulled_at_first_result = None
+        indexes = []
+        async for result in executor.run(source):
+            if pulled_at_first_result is None:
+                pulled_at_first_result = source.pulled
+            indexes.append(result.index)
+        return pulled_at_first_result, indexes
+
+    pulled_at_first_result, indexes = run(scenario())
+
+    assert pulled_at_first_result <= 4
+    assert sorted(indexes) == list(range(20))
@@ -0,0 +1,71 @@
+"""
+Product response cache: LRU/TTL, invalidation and stale fills
+"""
+
+import product_cache as product_cache_module
+from product_cache import ProductCache
+
+
+def test_invalidate_product_drops_its_keys_and_list_pages():
+    cache = ProductCache()
+    cache.set(cache.product_key(1), b'one')
+    cache.set(cache.product_key(1, 'card'), b'one card')
+    cache.set(cache.product_key(2), b'two')
+    cache.set(cache.list_key(50, None), b'page')
+
+    cache.invalidate_product('1')
+
+    assert cache.get(cache.product_key(1)) is None
+    assert cache.get(cache.product_key(1, 'card')) is None
+    assert cache.get(cache.list_key(50, None)) is None
+    assert cache.get(cache.product_key(2)) == b'two'
+
+
+def test_fill_read_before_an_invalidation_is_dropped():
+    cache = ProductCache()
+    generation = cache.generation
+
+    # A write lands between the database read and the cache fill
+    cache.invalidate_product(1)
+    cache.set(cache.product_key(1), b'stale', generation)
+
+    assert cache.get(cache.product_key(1)) is None
+    assert cache.stats()['stale_fills_dropped'] == 1
+
+    cache.set(cache.product_key(1), b'fresh', cache.generation)
+    assert cache.get(cache.product_key(1)) == b'fresh'
+
+
+def test_clear_bumps_the_generation_and_drops_pages():
+    cache = ProductCache()
+    cache.set(cache.list_key(50, None), b'page')
+    generation = cache.generation
+
+    cache.clear()
+
+    assert cache.generation == generation + 1
+    assert cache.get(cache.list_key(50, None)) is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(product_cache_module.time, 'monotonic', lambda: now[0])
+    cache = ProductCache(ttl=10)
+    cache.set('key', b'value')
+
+    now[0] += 10
+
+    assert cache.get('key') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ProductCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,67 @@
+"""
+Product read endpoints on mongomock-motor
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+from product_cache import product_cache
+from repository import ProductRepository
+
+
+@pytest.fixture
+def products(monkeypatch, run):
+    repo = ProductRepository(AsyncMongoMockClient().db.products)
+    run(repo.collection.insert_many([
+        {'shopify_id': 1, 'handle': 'one', 'title': 'One', 'sync_status': 'synced'},
+        {'shopify_id': 2, 'handle': 'two', 'title': 'Two', 'sync_status': 'webhook_updated'},
+        {'shopify_id': 3, 'handle': 'gone', 'title': 'Gone', 'sync_status': 'webhook_deleted'},
+    ]))
+    monkeypatch.setattr(server, 'product_repository', repo)
+    product_cache.clear()
+    yield repo
+    product_cache.clear()
+
+
+@pytest.fixture
+def client(products):
+    return TestClient(server.app)
+
+
+def test_get_product(client):
+    response = client.get('/api/products/2')
+
+    assert response.status_code == 200
+    assert response.json()['title'] == 'Two'
+
+
+def test_deleted_product_is_not_found_by_either_endpoint(client):
+    assert client.get('/api/products/3').status_code == 404
+
+    response = client.post('/api/products:batchGet', json={'ids': [3]})
+    assert response.json() == {'products': [], 'not_found': [3]}
+
+
+def test_batch_get_keeps_request_order_and_mixes_ids_and_handles(client):
+    response = client.post('/api/products:batchGet', json={'ids': ['two', 1, '2', 'missing', 404]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [p['title'] for p in body['products']] == ['Two', 'One', 'Two']
+    assert body['not_found'] == ['missing', 404]
+
+
+def test_batch_get_applies_field_projections(client):
+    response = client.post('/api/products:batchGet', json={'ids': ['one'], 'fields': 'title'})
+
+    product, = response.json()['products']
+    assert product['title'] == 'One'
+    assert 'sync_status' not in product
+
+
+def test_batch_get_rejects_more_than_250_ids(client):
+    response = client.post('/api/products:batchGet', json={'ids': list(range(251))})
+
+    assert response.status_code == 400
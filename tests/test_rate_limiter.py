@@ -0,0 +1,123 @@
+"""
+Shopify leaky-bucket model: reservations and server feedback
+"""
+
+import pytest
+
+import shopify_rate_limiter
+from shopify_rate_limiter import LeakyBucket, ShopifyRateLimiter, parse_call_limit, parse_retry_after
+
+REST_URL = 'https://shop.myshopify.com/admin/api/2024-01/products.json'
+GRAPHQL_URL = 'https://shop.myshopify.com/admin/api/2024-01/graphql.json'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(shopify_rate_limiter.time, 'monotonic', clock)
+    return clock
+
+
+def test_reserve_queues_callers_once_the_bucket_is_full(clock):
+    bucket = LeakyBucket(capacity=4, leak_rate=2, headroom=0)
+
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0, 0]
+    # Each further caller waits for one more request to leak out
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+
+def test_headroom_is_left_free(clock):
+    bucket = LeakyBucket(capacity=4, leak_rate=2, headroom=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_observe_only_corrects_the_level_upwards(clock):
+    bucket = LeakyBucket(capacity=40, leak_rate=2, headroom=0)
+    bucket.reserve()
+    bucket.reserve()
+
+    bucket.observe(level=1, capacity=40)
+    assert bucket.level == 2
+
+    bucket.observe(level=39, capacity=40)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_retry_after_pauses_the_bucket(clock):
+    bucket = LeakyBucket(capacity=40, leak_rate=2, headroom=0)
+
+    bucket.observe(retry_after=3)
+
+    assert bucket.reserve() >= 3
+    assert bucket.stats()['throttled'] == 1
+
+
+def test_header_parsing():
+    assert parse_call_limit('32/40') == (32.0, 40.0)
+    assert parse_call_limit('garbage') is None
+    assert parse_retry_after('2.5') == 2.5
+    assert parse_retry_after(None) == 1.0
+
+
+def test_rest_429_reports_retry_after_and_reads_the_call_limit(clock):
+    limiter = ShopifyRateLimiter()
+
+    delay = limiter.observe_response(REST_URL, 429, {'Retry-After': '2', 'X-Shopify-Shop-Api-Call-Limit': '40/80'})
+
+    bucket = limiter.bucket(REST_URL)
+    assert delay == 2
+    assert bucket.capacity == 80
+    assert bucket.reserve() >= 2
+
+
+def test_graphql_throttle_status_sets_level_and_restore_rate(clock):
+    limiter = ShopifyRateLimiter()
+    payload = {'extensions': {'cost': {
+        'requestedQueryCost': 100,
+        'throttleStatus': {'maximumAvailable': 2000, 'currentlyAvailable': 1500, 'restoreRate': 100},
+    }}}
+
+    assert limiter.observe_response(GRAPHQL_URL, 200, {}, payload) is None
+
+    bucket = limiter.bucket(GRAPHQL_URL)
+    assert bucket.capacity == 2000
+    assert bucket.leak_rate == 100
+    assert bucket.level == 500
+
+
+def test_graphql_throttled_error_waits_for_the_requested_cost(clock):
+    limiter = ShopifyRateLimiter()
+    payload = {
+        'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+        'extensions': {'cost': {
+            'requestedQueryCost': 300,
+            'throttleStatus': {'maximumAvailable': 1000, 'currentlyAvailable': 100, 'restoreRate': 50},
+        }},
+    }
+
+    delay = limiter.observe_response(GRAPHQL_URL, 200, {}, payload)
+
+    assert delay == pytest.approx(4.0)
+
+
+def test_non_admin_urls_are_not_limited():
+    limiter = ShopifyRateLimiter()
+
+    assert limiter.bucket('https://shop.myshopify.com/api/2024-01/graphql.json') is None
+    assert limiter.observe_response('https://cdn.example.com/a.jpg', 429, {}) is None
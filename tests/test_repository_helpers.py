@@ -0,0 +1,45 @@
+"""
+Page cursors, field projections and Shopify timestamps
+"""
+
+from datetime import datetime
+
+import pytest
+
+from repository import build_projection, decode_cursor, encode_cursor, parse_shopify_time
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(8123456789)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == 8123456789
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', encode_cursor(1)[:-2] + '!!'])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_projection_presets_and_lists():
+    assert build_projection(None) is None
+    assert build_projection('card')['variants.price'] == 1
+    assert build_projection('title, handle') == {'title': 1, 'handle': 1, 'shopify_id': 1}
+
+
+def test_projection_drops_paths_covered_by_a_parent():
+    assert build_projection('variants,variants.price') == {'variants': 1, 'shopify_id': 1}
+
+
+@pytest.mark.parametrize('fields', ['title,$where', 'a..b', ' , '])
+def test_projection_rejects_invalid_fields(fields):
+    with pytest.raises(ValueError):
+        build_projection(fields)
+
+
+def test_parse_shopify_time_normalises_to_naive_utc():
+    assert parse_shopify_time('2024-01-01T10:00:00-05:00') == datetime(2024, 1, 1, 15, 0)
+    assert parse_shopify_time('2024-01-01T10:00:00Z') == datetime(2024, 1, 1, 10, 0)
+    assert parse_shopify_time(None) is None
+    assert parse_shopify_time('yesterday') is None
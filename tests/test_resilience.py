@@ -0,0 +1,102 @@
+"""
+Circuit breaker state machine and retry backoff
+"""
+
+import pytest
+
+import resilience
+from resilience import BreakerRegistry, CircuitBreaker, backoff_delay
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, 'monotonic', clock)
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('shop', failure_threshold=3, recovery_timeout=30)
+
+    for _ in range(2):
+        assert breaker.allow() == 0.0
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() == pytest.approx(30)
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_success_resets_the_failure_streak(clock):
+    breaker = CircuitBreaker('shop', failure_threshold=2)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker('shop', failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.allow() == 0.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() > 0
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() == 0.0
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker('shop', failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() == pytest.approx(10)
+    assert breaker.stats()['times_opened'] == 2
+
+
+def test_cancelled_trial_frees_the_slot(clock):
+    breaker = CircuitBreaker('shop', failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.allow()
+
+    breaker.cancel()
+
+    assert breaker.allow() == 0.0
+
+
+def test_registry_shares_one_breaker_per_host():
+    registry = BreakerRegistry()
+
+    assert registry.get('a.myshopify.com') is registry.get('a.myshopify.com')
+    assert registry.get('a.myshopify.com') is not registry.get('b.myshopify.com')
+    assert set(registry.stats()) == {'a.myshopify.com', 'b.myshopify.com'}
+
+
+def test_backoff_delay_is_capped_full_jitter(monkeypatch):
+    monkeypatch.setattr(resilience.random, 'uniform', lambda low, high: high)
+
+    assert backoff_delay(1, base=0.25, cap=4) == 0.25
+    assert backoff_delay(3, base=0.25, cap=4) == 1.0
+    assert backoff_delay(10, base=0.25, cap=4) == 4
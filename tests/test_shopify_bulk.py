@@ -0,0 +1,51 @@
+"""
+Bulk operation JSONL reassembly
+"""
+
+import json
+
+from fake_shopify import build_products, to_bulk_jsonl
+from shopify_bulk import batched, gid_to_id, iter_bulk_products
+
+
+def test_gid_to_id():
+    assert gid_to_id('gid://shopify/Product/1001') == 1001
+
+
+def test_reassembles_children_under_their_product():
+    source = build_products(3, variants_per_product=2, images_per_product=3)
+
+    products = list(iter_bulk_products(to_bulk_jsonl(source).splitlines()))
+
+    assert [p['id'] for p in products] == [1001, 1002, 1003]
+    for product, node in zip(products, source):
+        assert product['title'] == node['title']
+        assert product['status'] == 'active'
+        assert [v['id'] for v in product['variants']] == [gid_to_id(v['id']) for v in node['variants']]
+        assert [i['position'] for i in product['images']] == [1, 2, 3]
+        assert product['image'] == product['images'][0]
+
+
+def test_product_without_images_has_no_featured_image():
+    source = build_products(1, images_per_product=0)
+
+    product, = iter_bulk_products(to_bulk_jsonl(source).splitlines())
+
+    assert product['images'] == []
+    assert product['image'] is None
+
+
+def test_skips_blank_lines_and_orphaned_children():
+    source = build_products(1, variants_per_product=1, images_per_product=0)
+    orphan = json.dumps({'id': 'gid://shopify/ProductVariant/1', '__parentId': 'gid://shopify/Product/999'})
+    lines = [orphan, ''] + to_bulk_jsonl(source).decode('utf-8').splitlines() + ['  ']
+
+    products = list(iter_bulk_products(lines))
+
+    assert len(products) == 1
+    assert len(products[0]['variants']) == 1
+
+
+def test_batched():
+    assert list(batched(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 3)) == []
@@ -0,0 +1,111 @@
+"""
+Stale-while-revalidate storefront cache
+"""
+
+import asyncio
+
+import pytest
+
+from storefront_cache import StaleWhileRevalidateCache
+
+
+class Loader:
+    """Counts upstream calls; each returns the next value, or raises once failing"""
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.failing = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.failing:
+            raise RuntimeError('storefront down')
+        return f'v{self.calls}'
+
+
+def age(cache, key, seconds):
+    cache._entries[key].fetched_at -= seconds
+
+
+def test_concurrent_misses_share_one_upstream_call(run):
+    cache = StaleWhileRevalidateCache()
+    loader = Loader(delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get('k', loader) for _ in range(5)))
+
+    results = run(scenario())
+
+    assert loader.calls == 1
+    assert {r.value for r in results} == {'v1'}
+    assert {r.state for r in results} == {'miss'}
+    assert cache.stats()['coalesced_waits'] == 4
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(run):
+    cache = StaleWhileRevalidateCache(fresh_ttl=60, stale_ttl=600)
+    loader = Loader(delay=0.01)
+
+    async def scenario():
+        first = await cache.get('k', loader)
+        age(cache, 'k', 120)
+        stale = await asyncio.gather(*(cache.get('k', loader) for _ in range(3)))
+        await asyncio.sleep(0.05)
+        fresh = await cache.get('k', loader)
+        return first, stale, fresh
+
+    first, stale, fresh = run(scenario())
+
+    assert [r.state for r in stale] == ['stale'] * 3
+    assert {r.value for r in stale} == {'v1'}
+    assert loader.calls == 2
+    assert fresh.state == 'fresh'
+    assert fresh.value == 'v2'
+    assert fresh.version != first.version
+
+
+def test_stale_if_error_serves_the_old_entry(run):
+    cache = StaleWhileRevalidateCache(fresh_ttl=60, stale_ttl=600)
+    loader = Loader()
+
+    async def scenario():
+        await cache.get('k', loader)
+        age(cache, 'k', 1000)
+        loader.failing = True
+        return await cache.get('k', loader)
+
+    result = run(scenario())
+
+    assert result.state == 'stale'
+    assert result.value == 'v1'
+    assert cache.stats()['stale_if_error'] == 1
+
+
+def test_error_without_a_cached_entry_is_raised(run):
+    cache = StaleWhileRevalidateCache()
+    loader = Loader()
+    loader.failing = True
+
+    with pytest.raises(RuntimeError):
+        run(cache.get('k', loader))
+
+
+def test_expire_all_makes_entries_stale_but_servable(run):
+    cache = StaleWhileRevalidateCache(fresh_ttl=60, stale_ttl=600)
+    loader = Loader()
+
+    async def scenario():
+        await cache.get('k', loader)
+        cache.expire_all()
+        stale = await cache.get('k', loader)
+        await asyncio.sleep(0.01)
+        return stale, await cache.get('k', loader)
+
+    stale, refreshed = run(scenario())
+
+    assert stale.state == 'stale'
+    assert stale.value == 'v1'
+    assert refreshed.state == 'fresh'
+    assert refreshed.value == 'v2'
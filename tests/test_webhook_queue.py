@@ -0,0 +1,172 @@
+"""
+Webhook intake queue and background worker, on mongomock-motor
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+import webhook_handlers
+import webhook_queue
+from webhook_queue import DONE, FAILED, PENDING, PROCESSING, InvalidWebhookPayload, WebhookQueue, WebhookWorker
+
+
+def make_queue():
+    collection = AsyncMongoMockClient().db.webhook_events
+    return WebhookQueue(collection)
+
+
+async def enqueue(queue, n, topic='products/update'):
+    return [
+        await queue.enqueue(topic, f'{{"id": {i}}}'.encode('utf-8'), {'webhook_id': f'wh-{i}'})
+        for i in range(n)
+    ]
+
+
+def test_claim_complete_and_stats(run):
+    async def scenario():
+        queue = make_queue()
+        await enqueue(queue, 3)
+
+        events = await queue.claim_batch(2)
+        assert [e['webhook_id'] for e in events] == ['wh-0', 'wh-1']
+        assert all(e['status'] == PROCESSING and e['attempts'] == 1 for e in events)
+        assert await queue.claim_batch(5) != []  # the third event
+
+        await queue.complete([e['_id'] for e in events])
+        stats = await queue.stats()
+        assert stats['depth'] == 0
+        assert stats['processing'] == 1
+        assert stats['processed'] == 2
+        assert await queue.collection.count_documents({'status': DONE}) == 2
+
+    run(scenario())
+
+
+def test_stale_claims_are_reclaimed(run):
+    async def scenario():
+        queue = make_queue()
+        await enqueue(queue, 1)
+        claimed, = await queue.claim_batch()
+        assert await queue.claim_batch() == []
+
+        old = datetime.utcnow() - timedelta(seconds=webhook_queue.WEBHOOK_CLAIM_TIMEOUT + 1)
+        await queue.collection.update_one({'_id': claimed['_id']}, {'$set': {'claimed_at': old}})
+
+        reclaimed, = await queue.claim_batch()
+        assert reclaimed['_id'] == claimed['_id']
+        assert reclaimed['claim_token'] != claimed['claim_token']
+        assert reclaimed['attempts'] == 2
+
+    run(scenario())
+
+
+def test_failures_back_off_then_park(monkeypatch, run):
+    monkeypatch.setattr(webhook_queue, 'WEBHOOK_MAX_ATTEMPTS', 2)
+
+    async def scenario():
+        queue = make_queue()
+        await enqueue(queue, 1)
+
+        event, = await queue.claim_batch()
+        await queue.fail(event, 'boom')
+        stored = await queue.collection.find_one({'_id': event['_id']})
+        assert stored['status'] == PENDING
+        assert stored['available_at'] > datetime.utcnow()
+        assert await queue.claim_batch() == []
+
+        await queue.collection.update_one({'_id': event['_id']}, {'$set': {'available_at': datetime.utcnow()}})
+        event, = await queue.claim_batch()
+        await queue.fail(event, 'boom')
+        stored = await queue.collection.find_one({'_id': event['_id']})
+        assert stored['status'] == FAILED
+        assert stored['error'] == 'boom'
+
+    run(scenario())
+
+
+def test_worker_applies_batches_and_retries_failed_events(run):
+    async def scenario():
+        queue = make_queue()
+        ids = await enqueue(queue, 3)
+        seen = []
+
+        async def apply_batch(events):
+            seen.append([e['_id'] for e in events])
+            return {ids[1]: 'bad payload'}
+
+        worker = WebhookWorker(queue, apply_batch, batch_size=10)
+        assert await worker.drain_once() == 3
+
+        assert seen == [ids]
+        assert await queue.collection.count_documents({'status': DONE}) == 2
+        assert (await queue.collection.find_one({'_id': ids[1]}))['status'] == PENDING
+
+    run(scenario())
+
+
+def test_stopping_mid_batch_hands_the_batch_back(run):
+    async def scenario():
+        queue = make_queue()
+        await enqueue(queue, 2)
+        started = asyncio.Event()
+
+        async def apply_batch(events):
+            started.set()
+            await asyncio.sleep(60)
+
+        worker = WebhookWorker(queue, apply_batch, poll_interval=0.01)
+        worker.start()
+        await asyncio.wait_for(started.wait(), timeout=5)
+        await worker.stop()
+
+        assert await queue.collection.count_documents({'status': PENDING}) == 2
+        assert len(await queue.claim_batch()) == 2
+
+    run(scenario())
+
+
+def test_invalid_payload_is_parked_without_retries(run):
+    async def scenario():
+        queue = make_queue()
+        good, bad = await enqueue(queue, 2)
+
+        async def apply_batch(events):
+            return {bad: InvalidWebhookPayload('Invalid payload')}
+
+        await WebhookWorker(queue, apply_batch).drain_once()
+
+        stored = await queue.collection.find_one({'_id': bad})
+        assert stored['status'] == FAILED
+        assert stored['attempts'] == 1
+        assert (await queue.collection.find_one({'_id': good}))['status'] == DONE
+
+    run(scenario())
+
+
+def test_body_that_is_not_utf8_is_stored_parked(run):
+    async def scenario():
+        queue = make_queue()
+
+        event_id = await queue.enqueue('products/update', b'\xff\xfe{"id": 1}', {'webhook_id': 'wh-1'})
+
+        stored = await queue.collection.find_one({'_id': event_id})
+        assert stored['status'] == FAILED
+        assert stored['body'] == b'\xff\xfe{"id": 1}'
+        assert await queue.claim_batch() == []
+
+    run(scenario())
+
+
+def test_handler_acknowledges_a_body_that_is_not_utf8(monkeypatch):
+    queue = make_queue()
+    monkeypatch.setattr(webhook_handlers, 'webhook_queue', queue)
+    client = TestClient(server.app)
+
+    response = client.post('/api/webhooks/products/update', content=b'\xff\xfe',
+                           headers={'X-Shopify-Webhook-Id': 'wh-not-utf8'})
+
+    assert response.status_code == 200
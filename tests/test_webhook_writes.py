@@ -0,0 +1,197 @@
+"""
+Webhook redelivery dedup and conditional product writes (ordering, change
+detection) on mongomock-motor, without the shopify_id unique index
+"""
+
+import json
+from datetime import datetime
+
+import mongomock
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import ASCENDING
+
+import webhook_handlers
+import webhook_queue
+from repository import ProductRepository
+from shopify_service import ShopifyService
+from webhook_queue import RecentIds, WebhookQueue
+
+
+def test_recent_ids_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(webhook_queue.time, 'monotonic', lambda: now[0])
+    ids = RecentIds(max_entries=10, ttl=60)
+
+    assert ids.add('a') is True
+    assert ids.add('a') is False
+    now[0] += 61
+    assert ids.add('a') is True
+    assert ids.stats()['duplicates'] == 1
+
+
+def test_recent_ids_evict_oldest_past_max_entries():
+    ids = RecentIds(max_entries=2, ttl=60)
+    for key in ('a', 'b', 'c'):
+        ids.add(key)
+
+    assert ids.add('a') is True
+    assert ids.add('c') is False
+
+
+def test_duplicate_webhook_id_is_rejected_by_index(run):
+    async def scenario():
+        queue = WebhookQueue(AsyncMongoMockClient().db.webhook_events)
+        await queue.collection.create_index([('webhook_id', ASCENDING)], unique=True, sparse=True)
+
+        first = await queue.enqueue('products/update', b'{"id": 1}', {'webhook_id': 'wh-1'})
+        again = await queue.enqueue('products/update', b'{"id": 1}', {'webhook_id': 'wh-1'})
+
+        assert first is not None
+        assert again is None
+        assert (await queue.stats())['duplicates'] == 1
+
+    run(scenario())
+
+
+def product(title, updated_at, product_id=1):
+    return {'id': product_id, 'title': title, 'updated_at': updated_at}
+
+
+@pytest.fixture
+def repo():
+    return ProductRepository(AsyncMongoMockClient().db.products)
+
+
+async def stored(repo, product_id=1):
+    return await repo.collection.find_one({'shopify_id': product_id}, {'_id': 0})
+
+
+def test_create_then_redelivery_and_stale_create(repo, run):
+    async def scenario():
+        fresh = product('A', '2024-01-01T10:00:00Z')
+        assert (await repo.apply_webhook_changes([('products/create', fresh, None)]))['written'] == 1
+        assert (await repo.apply_webhook_changes([('products/create', fresh, None)]))['unchanged'] == 1
+
+        stale = product('OLD', '2024-01-01T09:00:00Z')
+        assert (await repo.apply_webhook_changes([('products/create', stale, None)]))['unchanged'] == 1
+
+        assert await repo.collection.count_documents({}) == 1
+        doc = await stored(repo)
+        assert doc['title'] == 'A'
+        assert doc['sync_status'] == 'webhook_created'
+
+    run(scenario())
+
+
+def test_newer_payload_with_same_content_only_advances_timestamp(repo, run):
+    async def scenario():
+        await repo.apply_webhook_changes([('products/create', product('A', '2024-01-01T10:00:00Z'), None)])
+
+        result = await repo.apply_webhook_changes([('products/update', product('A', '2024-01-01T11:00:00Z'), None)])
+        assert result == {'written': 0, 'unchanged': 1, 'failed': {}}
+        assert (await stored(repo))['shopify_updated_at'] == datetime(2024, 1, 1, 11, 0)
+
+        # An older, different payload delivered late is now stale
+        late = await repo.apply_webhook_changes([('products/update', product('B', '2024-01-01T10:30:00Z'), None)])
+        assert late['written'] == 0
+        assert (await stored(repo))['title'] == 'A'
+
+    run(scenario())
+
+
+def test_same_second_edit_arriving_later_is_written(repo, run):
+    async def scenario():
+        await repo.apply_webhook_changes([('products/create', product('A', '2024-01-01T10:00:00Z'), None)])
+
+        result = await repo.apply_webhook_changes([('products/update', product('B', '2024-01-01T10:00:00Z'), None)])
+
+        assert result['written'] == 1
+        assert (await stored(repo))['title'] == 'B'
+
+    run(scenario())
+
+
+def test_update_before_delete_cannot_resurrect(repo, run):
+    async def scenario():
+        await repo.apply_webhook_changes([('products/create', product('A', '2024-01-01T10:00:00Z'), None)])
+        deleted = await repo.apply_webhook_changes([('products/delete', {'id': 1}, datetime(2024, 1, 1, 12, 0))])
+        assert deleted['written'] == 1
+
+        late = await repo.apply_webhook_changes([('products/update', product('B', '2024-01-01T11:00:00Z'), None)])
+        assert late['written'] == 0
+        assert (await stored(repo))['sync_status'] == 'webhook_deleted'
+
+    run(scenario())
+
+
+def test_payload_without_updated_at_falls_back_to_content_hash(repo, run):
+    async def scenario():
+        await repo.apply_webhook_changes([('products/create', {'id': 1, 'title': 'A'}, None)])
+
+        same = await repo.apply_webhook_changes([('products/update', {'id': 1, 'title': 'A'}, None)])
+        changed = await repo.apply_webhook_changes([('products/update', {'id': 1, 'title': 'B'}, None)])
+
+        assert same['written'] == 0
+        assert changed['written'] == 1
+
+    run(scenario())
+
+
+def event(event_id, topic, body, triggered_at=None):
+    return {'_id': event_id, 'topic': topic, 'body': json.dumps(body), 'triggered_at': triggered_at}
+
+
+def test_batch_keeps_newest_event_per_product(repo, monkeypatch, run):
+    monkeypatch.setattr(webhook_handlers, 'product_repository', repo)
+
+    async def scenario():
+        errors = await webhook_handlers.apply_product_webhooks([
+            event('e1', 'products/create', product('A', '2024-01-01T10:00:00Z')),
+            event('e2', 'products/update', product('C', '2024-01-01T12:00:00Z')),
+            # Delivered after e2 but older: must not win
+            event('e3', 'products/update', product('B', '2024-01-01T11:00:00Z')),
+            event('e4', 'products/update', '{not json'),
+        ])
+
+        assert set(errors) == {'e4'}
+        doc = await stored(repo)
+        assert doc['title'] == 'C'
+        # The create in the same batch still inserted the product
+        assert doc['sync_status'] == 'webhook_created'
+
+    run(scenario())
+
+
+def test_stale_sync_page_loses_to_webhooks(run):
+    client = mongomock.MongoClient()
+    repo = ProductRepository(AsyncMongoMockClient(mock_mongo_client=client).db.products)
+    service = ShopifyService()
+    service.products_collection = client.db.products
+
+    run(repo.apply_webhook_changes([
+        ('products/create', product('A', '2024-01-01T10:00:00Z', product_id=1), None),
+        ('products/create', product('X', '2024-01-01T10:00:00Z', product_id=2), None),
+    ]))
+    run(repo.apply_webhook_changes([
+        ('products/update', product('B', '2024-01-01T11:00:00Z', product_id=1), None),
+        ('products/delete', {'id': 2}, datetime(2024, 1, 1, 12, 0)),
+    ]))
+
+    # A page fetched before those webhooks landed
+    counts = service.bulk_upsert_products([
+        product('A', '2024-01-01T10:00:00Z', product_id=1),
+        product('X', '2024-01-01T11:00:00Z', product_id=2),
+        product('N', '2024-01-01T10:00:00Z', product_id=3),
+    ])
+
+    assert counts == {'matched': 0, 'upserted': 1, 'modified': 0, 'skipped': 2}
+    assert run(stored(repo, 1))['title'] == 'B'
+    assert run(stored(repo, 2))['sync_status'] == 'webhook_deleted'
+    assert run(stored(repo, 3))['sync_status'] == 'synced'
+    assert client.db.products.count_documents({}) == 3
+
+    # A page as new as the stored data is still written
+    counts = service.bulk_upsert_products([product('B', '2024-01-01T11:00:00Z', product_id=1)])
+    assert counts['matched'] == 1
+    assert run(stored(repo, 1))['sync_status'] == 'synced'